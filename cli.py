@@ -0,0 +1,7 @@
+import sys
+import multiprocessing
+from src.cli import main
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support() # Process pools in a frozen build re-launch this entry point
+    sys.exit(main())
@@ -1,8 +1,10 @@
 import sys
+import multiprocessing
 from PyQt6.QtWidgets import QApplication
 from src.ui.main_window import MainWindow
 
 def main():
+    multiprocessing.freeze_support() # Process pools in the frozen .exe re-launch this entry point
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
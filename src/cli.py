@@ -0,0 +1,181 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+# Headless entry point: must not import PyQt6 (directly or through src.ui / src.utils.workers)
+from src.modules.batch_ops import IMAGE_EXTENSIONS, PDF_EXTENSIONS, expand_inputs, plan_outputs, run_batch
+from src.modules.img_ops import ImageOps
+from src.modules.pdf_ops import PDFOps
+from src.modules.protect_ops import ALGORITHMS, LockKey
+from src.utils import metrics
+
+# Per-file operations: (function, output extension, output name template)
+PER_FILE_OPS = {
+    "split": (PDFOps.split_pdf, "", "{name}"), # Output is a folder per input
+    "compress": (PDFOps.compress_pdf, ".pdf", "{name}_compressed"),
+    "extract": (PDFOps.extract_text, ".txt", "{name}"),
+    "encrypt": (PDFOps.encrypt_pdf, ".pdf", "{name}_locked"),
+    "decrypt": (PDFOps.decrypt_pdf, ".pdf", "{name}_unlocked"),
+    "organize": (PDFOps.organize_pages, ".pdf", "{name}_organized"),
+}
+
+def parse_page_config(spec):
+    # "3,1,2:90,5-7:180" -> [{'index': 2, 'rotate': 0}, ...] (1-based pages, optional :rotation)
+    config = []
+    for part in [p.strip() for p in spec.split(',')]:
+        if not part:
+            continue
+        pages, _, rotate = part.partition(':')
+        rotate = int(rotate) if rotate else 0
+        if rotate % 90:
+            raise ValueError(f"Rotation must be a multiple of 90: {part}")
+        start, _, end = pages.partition('-')
+        for page in range(int(start), int(end or start) + 1):
+            config.append({'index': page - 1, 'rotate': rotate})
+    return config
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cleanpdf",
+        description="Headless PDF toolset. Prints one JSON line per file and exits with 1 if any file failed.")
+    parser.add_argument("--metrics", metavar="FILE", default=None,
+                        help="Append per-operation metrics (spans, bytes, pages, peak memory) to FILE as JSON lines")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def add_inputs(p):
+        p.add_argument("inputs", nargs="*", help="Files, folders or globs (quote globs like 'in/**/*.pdf')")
+        p.add_argument("--manifest", action="append", default=[],
+                       help="Text file listing one input per line (repeatable)")
+
+    def add_batch(p, help_output="Output folder"):
+        add_inputs(p)
+        p.add_argument("-o", "--output", required=True, help=help_output)
+        p.add_argument("--name", help="Output name template, fields {name} and {index}")
+        p.add_argument("-j", "--jobs", type=int, default=None, help="Parallel processes (default: all cores)")
+
+    p = sub.add_parser("merge", help="Merge inputs (in order) into one PDF")
+    add_inputs(p)
+    p.add_argument("-o", "--output", required=True, help="Output PDF")
+    p.add_argument("--dedup", action="store_true", help="Share identical fonts/images between inputs")
+    p.add_argument("--batch-size", type=int, default=None, help="Merge in batches of N files (bounded memory; drops bookmarks and form fields)")
+
+    p = sub.add_parser("img2pdf", help="Convert images (in order) into one PDF")
+    add_inputs(p)
+    p.add_argument("-o", "--output", required=True, help="Output PDF")
+    p.add_argument("--page-size", choices=["A4", "Letter"], default=None)
+    p.add_argument("--dpi", type=int, default=None, help="Downscale images above this resolution")
+    p.add_argument("--quality", type=int, default=75, help="JPEG quality for re-encoded images")
+    p.add_argument("-j", "--jobs", type=int, default=None, help="Parallel processes (default: all cores)")
+
+    p = sub.add_parser("split", help="Split every input into single pages or ranges")
+    add_batch(p, "Output folder (one subfolder per input)")
+    p.add_argument("--range", dest="page_range", default=None, help='Pages to export, e.g. "1-3, 5"')
+    p.add_argument("--chunk-size", type=int, default=None, help="Pages per output file")
+    p.add_argument("--by-range", action="store_true", help="One output file per comma-separated range")
+
+    p = sub.add_parser("compress", help="Compress every input")
+    add_batch(p)
+    p.add_argument("--level", choices=["low", "medium", "high"], default="medium")
+
+    p = sub.add_parser("extract", help="Extract the text of every input")
+    add_batch(p)
+
+    for name, text in (("encrypt", "Password-protect every input"), ("decrypt", "Remove the password from every input")):
+        p = sub.add_parser(name, help=text)
+        add_batch(p)
+        p.add_argument("--password", required=True)
+        if name == "encrypt":
+            p.add_argument("--algorithm", choices=ALGORITHMS, default=None,
+                           help="Default: AES-256 if the cryptography package is installed, else RC4-128")
+            p.add_argument("--current-password", default=None,
+                           help="Re-encrypt inputs that are already locked with this password")
+
+    p = sub.add_parser("organize", help="Reorder/rotate/drop pages of every input")
+    add_batch(p)
+    p.add_argument("--pages", required=True, help='Output pages, e.g. "3,1,2:90,5-7:180" (1-based, :rotation)')
+    return parser
+
+def emit(record):
+    # One JSON object per line, flushed so callers can follow along
+    sys.stdout.write(json.dumps(record) + "\n")
+    sys.stdout.flush()
+
+def run_single(command, func, inputs, output, **kwargs):
+    # merge/img2pdf: many inputs, one output, one result line
+    start = time.perf_counter()
+    try:
+        success, message = func(inputs, output, **kwargs)
+    except Exception as e:
+        success, message = False, str(e)
+    emit({"command": command, "inputs": len(inputs), "output": output, "success": bool(success),
+          "message": message, "seconds": round(time.perf_counter() - start, 3)})
+    return 0 if success else 1
+
+def run_per_file(args, inputs):
+    func, extension, template = PER_FILE_OPS[args.command]
+    os.makedirs(args.output, exist_ok=True)
+    outputs = plan_outputs(inputs, args.output, args.name or template, extension)
+
+    # Each file gets one process; the operations themselves stay single-process
+    options = {"workers": 1} if args.command in ("split", "compress", "extract", "encrypt", "decrypt") else {}
+    if args.command == "split":
+        for input_path, out_dir in zip(inputs, outputs):
+            if os.path.isfile(input_path):
+                os.makedirs(out_dir, exist_ok=True)
+        options.update(page_range=args.page_range, chunk_size=args.chunk_size, by_range=args.by_range)
+    elif args.command == "compress":
+        options["level"] = args.level
+    elif args.command == "encrypt":
+        # The password is hashed once here and the key shared by every file
+        options.update(password=args.password, lock_key=args.lock_key, current_password=args.current_password)
+    elif args.command == "decrypt":
+        options["password"] = args.password
+    elif args.command == "organize":
+        options["page_config"] = parse_page_config(args.pages)
+
+    start = time.perf_counter()
+    failed = 0
+    for result in run_batch(func, zip(inputs, outputs), kwargs=options, workers=args.jobs):
+        failed += not result["success"]
+        emit(dict(command=args.command, **result))
+    emit({"command": args.command, "summary": True, "total": len(inputs), "succeeded": len(inputs) - failed,
+          "failed": failed, "seconds": round(time.perf_counter() - start, 3)})
+    return 1 if failed else 0
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.command == "organize":
+        try:
+            parse_page_config(args.pages)
+        except ValueError as e:
+            parser.error(f"--pages: {e}")
+    if getattr(args, "name", None):
+        try:
+            args.name.format(name="file", index=1)
+        except (KeyError, IndexError, ValueError):
+            parser.error(f"--name: invalid template {args.name!r}, use the fields {{name}} and {{index}}")
+    if args.command == "encrypt":
+        try:
+            args.lock_key = LockKey(args.password, args.algorithm)
+        except RuntimeError as e:
+            parser.error(f"--algorithm: {e}")
+
+    if args.metrics:
+        # Before any pool starts, so worker processes record into the same file
+        metrics.export_jsonl(args.metrics)
+
+    extensions = IMAGE_EXTENSIONS if args.command == "img2pdf" else PDF_EXTENSIONS
+    inputs = expand_inputs(args.inputs, extensions, args.manifest)
+    if not inputs:
+        parser.error("no input files (give files, folders, globs or --manifest)")
+
+    if args.command == "merge":
+        return run_single("merge", PDFOps.merge_pdfs, inputs, args.output,
+                          dedup=args.dedup, batch_size=args.batch_size)
+    if args.command == "img2pdf":
+        return run_single("img2pdf", ImageOps.images_to_pdf, inputs, args.output, stream=True,
+                          page_size=args.page_size, dpi=args.dpi, quality=args.quality, workers=args.jobs)
+    return run_per_file(args, inputs)
@@ -0,0 +1,174 @@
+import glob
+import inspect
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from src.utils.progress import OperationCancelled, report
+from src.utils.scheduler import worker_budget
+
+# Kept free of Qt: used by the headless CLI (src/cli.py) and the GUI batch modes.
+
+PDF_EXTENSIONS = (".pdf",)
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".gif", ".tif", ".tiff", ".webp")
+
+def read_manifest(manifest_path):
+    # One input per line; blank lines and # comments are skipped.
+    # Relative entries are relative to the manifest's folder.
+    base = os.path.dirname(os.path.abspath(manifest_path))
+    paths = []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                paths.append(os.path.join(base, line))
+    return paths
+
+def expand_inputs(patterns, extensions=PDF_EXTENSIONS, manifests=()):
+    """
+    Turn command-line style inputs into a list of files, in order, without duplicates.
+    patterns: Files, directories (their matching files, sorted) or globs ("scans/**/*.pdf").
+    extensions: File types picked up from directories.
+    manifests: Manifest files listing one input (file, directory or glob) per line.
+    Paths that match nothing are kept, so they show up as failures instead of vanishing.
+    """
+    entries = list(patterns)
+    for manifest in manifests:
+        entries.extend(read_manifest(manifest))
+
+    files = []
+    for entry in entries:
+        if os.path.isdir(entry):
+            files.extend(sorted(os.path.join(entry, name) for name in os.listdir(entry)
+                                if name.lower().endswith(extensions)
+                                and os.path.isfile(os.path.join(entry, name))))
+        elif glob.has_magic(entry):
+            files.extend(sorted(path for path in glob.glob(entry, recursive=True) if os.path.isfile(path)))
+        else:
+            files.append(entry)
+
+    seen = set()
+    unique = []
+    for path in files:
+        key = os.path.normcase(os.path.abspath(path))
+        if key not in seen:
+            seen.add(key)
+            unique.append(path)
+    return unique
+
+def plan_outputs(input_paths, output_dir, template="{name}", extension=".pdf"):
+    """
+    Output path for every input: output_dir / template + extension.
+    template: Fields {name} (input file name without extension) and {index} (1-based).
+    Clashing names (same file name in different folders) get _2, _3, ... appended.
+    """
+    outputs = []
+    used = set()
+    for index, path in enumerate(input_paths, 1):
+        name = os.path.splitext(os.path.basename(path))[0]
+        stem = template.format(name=name, index=index)
+        candidate = stem
+        n = 2
+        while candidate.lower() in used:
+            candidate = f"{stem}_{n}"
+            n += 1
+        used.add(candidate.lower())
+        outputs.append(os.path.join(output_dir, candidate + extension))
+    return outputs
+
+def _run_task(func, input_path, output_path, args, kwargs):
+    # Pool entry point: one file, one result record. Never raises.
+    start = time.perf_counter()
+    try:
+        result = func(input_path, output_path, *args, **kwargs)
+        if isinstance(result, tuple) and len(result) == 2:
+            success, message = result
+        else:
+            success, message = True, "Operation completed (No standard return detected)"
+    except Exception as e:
+        success, message = False, str(e)
+    return {"input": input_path, "output": output_path, "success": bool(success),
+            "message": message, "seconds": round(time.perf_counter() - start, 3)}
+
+def run_batch(func, pairs, args=(), kwargs=None, workers=None, pool=None):
+    """
+    Run func(input_path, output_path, *args, **kwargs) for every (input, output) pair
+    and yield one result dict per file as soon as it is done (completion order).
+    workers: Processes to use. None = all cores, 1 = in this process.
+    pool: Process pool to run the files on instead of starting one, e.g. the
+          JobScheduler's, so a batch shares its cores with the other jobs.
+          workers then only limits how many files are queued on it at a time.
+    """
+    kwargs = kwargs or {}
+    pairs = list(pairs)
+    if workers is None:
+        workers = worker_budget()
+    workers = max(1, min(workers, worker_budget(), len(pairs)))
+    if pool is not None:
+        yield from _run_on_pool(pool, func, pairs, args, kwargs, workers)
+    elif workers == 1:
+        for input_path, output_path in pairs:
+            yield _run_task(func, input_path, output_path, args, kwargs)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as own_pool:
+            yield from _run_on_pool(own_pool, func, pairs, args, kwargs, workers)
+
+def _run_on_pool(pool, func, pairs, args, kwargs, workers):
+    # Only a small window is queued, so huge batches don't pile up futures
+    pending = set()
+    try:
+        for input_path, output_path in pairs:
+            pending.add(pool.submit(_run_task, func, input_path, output_path, args, kwargs))
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        for future in as_completed(pending):
+            yield future.result()
+    except GeneratorExit:
+        # Consumer stopped early (e.g. cancelled): drop files that haven't started
+        for future in pending:
+            future.cancel()
+        raise
+
+def summarize(results):
+    # One line for a finished batch, e.g. "12 of 14 files succeeded (2 failed)"
+    failed = sum(1 for r in results if not r["success"])
+    text = f"{len(results) - failed} of {len(results)} files succeeded"
+    return text + (f" ({failed} failed)" if failed else "")
+
+def process_batch(func, input_paths, output_dir, template="{name}", extension=".pdf",
+                  args=(), kwargs=None, workers=None, pool=None, progress=None):
+    """
+    Batch mode for the GUI pages: run func over every input in parallel (see run_batch)
+    and return a single (success, message) summary instead of one result per file.
+    extension: Output file extension; "" gives every input its own output folder (split).
+    pool: See run_batch; JobScheduler passes its process pool to thread jobs.
+    progress: Optional ProgressToken, updated per finished file.
+    success is False only if nothing succeeded; failures are listed in the message.
+    """
+    kwargs = dict(kwargs or {})
+    # Files already run side by side, so each operation stays single-process
+    if "workers" in inspect.signature(func).parameters:
+        kwargs.setdefault("workers", 1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = plan_outputs(input_paths, output_dir, template, extension)
+    if not extension:
+        for input_path, output_path in zip(input_paths, outputs):
+            if os.path.isfile(input_path):
+                os.makedirs(output_path, exist_ok=True)
+
+    results = []
+    try:
+        for result in run_batch(func, zip(input_paths, outputs), args, kwargs, workers, pool):
+            results.append(result)
+            report(progress, len(results), len(input_paths))
+    except OperationCancelled:
+        return False, "Cancelled"
+
+    failed = [r for r in results if not r["success"]]
+    lines = [f"{summarize(results)}. Output folder: {output_dir}"]
+    lines += [f"{os.path.basename(r['input'])}: {r['message']}" for r in failed[:10]]
+    if len(failed) > 10:
+        lines.append(f"... and {len(failed) - 10} more")
+    return len(failed) < len(results), "\n".join(lines)
@@ -0,0 +1,433 @@
+import hashlib
+import io
+import math
+import os
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from src.modules.doc_cache import document_cache
+from src.modules.output_ops import AtomicOutput
+from src.utils import metrics
+from src.utils.progress import OperationCancelled, report
+from src.utils.scheduler import worker_budget
+from pypdf.generic import (ArrayObject, DictionaryObject, IndirectObject, NameObject,
+                           NumberObject, StreamObject)
+
+# Per-level settings. dpi/quality None = raster images are left untouched (lossless only).
+COMPRESSION_LEVELS = {
+    "low": {"dpi": None, "quality": None},
+    "medium": {"dpi": 150, "quality": 75},
+    "high": {"dpi": 96, "quality": 50},
+}
+
+# Images are only resampled when they exceed the target by more than this factor
+DPI_TOLERANCE = 1.1
+
+# Filters we never re-encode: bilevel codecs beat JPEG and JPX decoding is unreliable
+SKIP_FILTERS = {"/JBIG2Decode", "/CCITTFaxDecode", "/JPXDecode"}
+
+# Non-stream objects packed into each object stream
+OBJECTS_PER_STREAM = 100
+
+
+def _mult(m, n):
+    # 2D affine matrix product m x n, matrices as [a, b, c, d, e, f]
+    return [
+        m[0] * n[0] + m[1] * n[2], m[0] * n[1] + m[1] * n[3],
+        m[2] * n[0] + m[3] * n[2], m[2] * n[1] + m[3] * n[3],
+        m[4] * n[0] + m[5] * n[2] + n[4], m[4] * n[1] + m[5] * n[3] + n[5],
+    ]
+
+
+def _image_display_sizes(page):
+    # Walk the content stream and return {xobject name: (width_pt, height_pt)}
+    # for every "Do" drawn on the page (largest placement wins)
+    sizes = {}
+    contents = page.get_contents()
+    if contents is None:
+        return sizes
+    ctm = [1, 0, 0, 1, 0, 0]
+    stack = []
+    for operands, operator in contents.operations:
+        if operator == b"q":
+            stack.append(ctm)
+        elif operator == b"Q":
+            ctm = stack.pop() if stack else [1, 0, 0, 1, 0, 0]
+        elif operator == b"cm" and len(operands) == 6:
+            ctm = _mult([float(x) for x in operands], ctm)
+        elif operator == b"Do" and operands:
+            w = math.hypot(ctm[0], ctm[1])
+            h = math.hypot(ctm[2], ctm[3])
+            prev = sizes.get(operands[0], (0, 0))
+            sizes[operands[0]] = (max(prev[0], w), max(prev[1], h))
+    return sizes
+
+
+def _page_image_refs(page):
+    # [(name, IndirectObject)] for the image XObjects in the page resources
+    resources = page.get("/Resources")
+    if resources is None:
+        return []
+    xobjects = resources.get_object().get("/XObject")
+    if xobjects is None:
+        return []
+    refs = []
+    for name, ref in xobjects.get_object().items():
+        if isinstance(ref, IndirectObject) and ref.get_object().get("/Subtype") == "/Image":
+            refs.append((name, ref))
+    return refs
+
+
+def _reencode_image(xobj, display_size, dpi, quality):
+    # Returns (jpeg_bytes, width, height, colorspace) or None if the image should stay as is
+    if xobj.get("/ImageMask") or "/Decode" in xobj or "/Mask" in xobj or xobj.get("/BitsPerComponent", 8) == 1:
+        return None
+    filters = xobj.get("/Filter", [])
+    filters = [filters] if isinstance(filters, str) else list(filters)
+    if any(f in SKIP_FILTERS for f in filters):
+        return None
+
+    img = xobj.decode_as_image()
+    if img.mode == "CMYK":
+        return None
+    img = img.convert("L" if img.mode in ("1", "L", "LA", "I", "I;16") else "RGB")
+
+    # Effective resolution at the size the image is drawn on the page
+    width, height = img.size
+    scale = 1.0
+    if display_size[0] > 0 and display_size[1] > 0:
+        effective_dpi = max(width / (display_size[0] / 72.0), height / (display_size[1] / 72.0))
+        if effective_dpi > dpi * DPI_TOLERANCE:
+            scale = dpi / effective_dpi
+    if scale < 1.0:
+        width = max(1, round(width * scale))
+        height = max(1, round(height * scale))
+        img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality, optimize=True)
+    data = buf.getvalue()
+
+    # Recompressing an existing JPEG at the same size only pays off if it saves a real amount
+    threshold = len(xobj._data) * (0.9 if scale == 1.0 and "/DCTDecode" in filters else 1.0)
+    if len(data) >= threshold:
+        return None
+    colorspace = "/DeviceGray" if img.mode == "L" else "/DeviceRGB"
+    return data, width, height, colorspace
+
+
+def _reencode_job(job):
+    # Pool entry point: job is (detached xobject, display size, dpi, quality)
+    try:
+        return _reencode_image(*job)
+    except Exception:
+        return None # Undecodable image: leave it untouched
+
+
+def _detach(obj, skip=()):
+    # Deep copy with every indirect reference resolved, so the image can be hashed
+    # and pickled to a pool process without dragging the whole document along
+    if isinstance(obj, IndirectObject):
+        obj = obj.get_object()
+    if isinstance(obj, StreamObject):
+        fields = {NameObject(k): _detach(v) for k, v in obj.items() if k != "/Length" and k not in skip}
+        fields["__streamdata__"] = obj._data
+        return StreamObject.initialize_from_dictionary(fields)
+    if isinstance(obj, DictionaryObject):
+        return DictionaryObject({NameObject(k): _detach(v) for k, v in obj.items()})
+    if isinstance(obj, ArrayObject):
+        return ArrayObject(_detach(v) for v in obj)
+    return obj
+
+
+def _live_objects(writer):
+    return sum(1 for obj in writer._objects if obj is not None)
+
+
+def deduplicate_objects(writer, max_passes=8):
+    """
+    Merge indirect objects with identical content (fonts, images, ICC profiles...)
+    so each unique one is written once. A pass only merges objects whose children
+    were already shared, so repeat until nothing changes. Returns (before, after) counts.
+    """
+    before = _live_objects(writer)
+    count = before
+    for _ in range(max_passes):
+        writer.compress_identical_objects()
+        new_count = _live_objects(writer)
+        if new_count == count:
+            break
+        count = new_count
+    return before, count
+
+
+def _collect_reachable(reader):
+    # Object numbers reachable from the trailer; anything else is unused
+    seen = set()
+    todo = [reader.trailer.get(key) for key in ("/Root", "/Info")]
+    while todo:
+        obj = todo.pop()
+        if isinstance(obj, IndirectObject):
+            if obj.idnum in seen:
+                continue
+            seen.add(obj.idnum)
+            obj = reader.get_object(obj)
+        if isinstance(obj, DictionaryObject):
+            todo.extend(obj.values())
+        elif isinstance(obj, ArrayObject):
+            todo.extend(obj)
+    return seen
+
+
+def _serialize(obj):
+    buf = io.BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+def _pack_object_streams(data):
+    """
+    Rewrite a PDF so all non-stream objects live in compressed object streams,
+    indexed by a cross-reference stream. Unreachable objects are dropped.
+    """
+    reader = PdfReader(io.BytesIO(data))
+    if "/Encrypt" in reader.trailer:
+        return data
+
+    streams, packable = [], []
+    for idnum in sorted(_collect_reachable(reader)):
+        obj = reader.get_object(idnum)
+        if obj is None:
+            continue
+        ref = obj.indirect_reference
+        generation = ref.generation if ref is not None else 0
+        if isinstance(obj, StreamObject) or generation != 0:
+            streams.append((idnum, generation, obj))
+        else:
+            packable.append((idnum, obj))
+
+    next_id = max([n for n, _, _ in streams] + [n for n, _ in packable] + [0]) + 1
+    version = max(reader.pdf_header[5:8] or "1.5", "1.5")
+    out = io.BytesIO()
+    out.write(f"%PDF-{version}\n%\xe2\xe3\xcf\xd3\n".encode("latin-1"))
+    entries = {}  # idnum -> (type, field2, field3)
+
+    def write_object(idnum, generation, body):
+        entries[idnum] = (1, out.tell(), generation)
+        out.write(f"{idnum} {generation} obj\n".encode())
+        out.write(body)
+        out.write(b"\nendobj\n")
+
+    def stream_body(dictionary, payload):
+        compressed = zlib.compress(payload, 9)
+        return (f"<< {dictionary} /Filter /FlateDecode /Length {len(compressed)} >>\nstream\n".encode()
+                + compressed + b"\nendstream")
+
+    for idnum, generation, obj in streams:
+        write_object(idnum, generation, _serialize(obj))
+
+    for start in range(0, len(packable), OBJECTS_PER_STREAM):
+        chunk = packable[start:start + OBJECTS_PER_STREAM]
+        stm_id = next_id
+        next_id += 1
+        header, parts, pos = [], [], 0
+        for index, (idnum, obj) in enumerate(chunk):
+            body = _serialize(obj) + b"\n"
+            header.append(f"{idnum} {pos}")
+            parts.append(body)
+            pos += len(body)
+            entries[idnum] = (2, stm_id, index)
+        header = (" ".join(header) + "\n").encode()
+        write_object(stm_id, 0, stream_body(f"/Type /ObjStm /N {len(chunk)} /First {len(header)}",
+                                            header + b"".join(parts)))
+
+    # Cross-reference stream (describes itself too)
+    xref_id = next_id
+    size = xref_id + 1
+    xref_offset = out.tell()
+    entries[xref_id] = (1, xref_offset, 0)
+    width = max(4, (xref_offset.bit_length() + 7) // 8)
+
+    # Chain the free list: object 0 and every unused number point at the next free one
+    free = [n for n in range(1, size) if n not in entries]
+    entries[0] = (0, free[0] if free else 0, 65535)
+    for i, n in enumerate(free):
+        entries[n] = (0, free[i + 1] if i + 1 < len(free) else 0, 0)
+    rows = bytearray()
+    for n in range(size):
+        kind, f2, f3 = entries[n]
+        rows += bytes([kind]) + f2.to_bytes(width, "big") + f3.to_bytes(2, "big")
+
+    trailer = f"/Type /XRef /Size {size} /W [1 {width} 2]"
+    for key in ("/Root", "/Info", "/ID"):
+        if key in reader.trailer:
+            value = reader.trailer.raw_get(key)
+            trailer += f" {key} " + _serialize(value).decode("latin-1")
+    out.write(f"{xref_id} 0 obj\n".encode())
+    out.write(stream_body(trailer, bytes(rows)))
+    out.write(b"\nendobj\n")
+    out.write(f"startxref\n{xref_offset}\n%%EOF\n".encode())
+    return out.getvalue()
+
+
+class CompressionEngine:
+    """
+    Multi-stage compression pipeline. Stage timings (seconds) are collected in
+    self.timings so callers can report where the time went.
+    """
+    def __init__(self, level="medium", workers=None, progress=None):
+        """
+        workers: Processes used to re-encode images. None = all cores, 1 = in-process.
+        progress: Optional ProgressToken, updated per page and then per image.
+        """
+        if level not in COMPRESSION_LEVELS:
+            raise ValueError(f"Unknown compression level: {level}")
+        self.level = level
+        self.settings = COMPRESSION_LEVELS[level]
+        self.workers = min(workers or worker_budget(), worker_budget())
+        self.progress = progress
+        self.timings = {}
+        self.images_recompressed = 0
+        self.images_shared = 0
+        # Pixel content hash -> re-encode result (or None), so repeated images are encoded once
+        self.image_cache = {}
+
+    def _stage(self, name, func, *args):
+        # Timed for the result message and, as "compress.<name>", for the operation's metrics
+        start = time.perf_counter()
+        with metrics.span(f"compress.{name}"):
+            result = func(*args)
+        self.timings[name] = self.timings.get(name, 0.0) + time.perf_counter() - start
+        return result
+
+    def run(self, input_path, output_path):
+        # Returns (bytes_before, bytes_after)
+        bytes_before = os.path.getsize(input_path)
+        writer = self._stage("parse", self.load, input_path)
+        metrics.count(pages=len(writer.pages))
+        self._stage("content", self.compress_content, writer)
+        if self.settings["dpi"]:
+            self._stage("images", self.recompress_images, writer)
+        self._stage("dedup", deduplicate_objects, writer)
+        data = self._stage("write", self.serialize, writer)
+        data = self._stage("pack", _pack_object_streams, data)
+
+        # Never hand back something bigger than what we were given
+        if len(data) >= bytes_before:
+            with open(input_path, "rb") as f:
+                data = f.read()
+        with AtomicOutput(output_path) as f:
+            f.write(data)
+        return bytes_before, len(data)
+
+    def load(self, input_path):
+        with document_cache.open(input_path) as reader:
+            return PdfWriter(clone_from=reader)
+
+    def compress_content(self, writer):
+        for done, page in enumerate(writer.pages, 1):
+            page.compress_content_streams() # Ensure streams are compressed
+            report(self.progress, done, len(writer.pages))
+
+    def recompress_images(self, writer):
+        # Group image objects by content hash, tracking the largest on-page size of each
+        # group so an image shared by several pages keeps enough pixels for all of them.
+        # The group key includes the soft mask: the same pixels under different masks
+        # stay separate objects, but are re-encoded once (the cache is keyed by pixels).
+        groups = {} # hash -> {"refs": [...], "size": (w, h), "xobj": detached copy, "pixels": hash}
+        hashes = {} # idnum -> hash
+        page_refs = []
+        for page in writer.pages:
+            refs = _page_image_refs(page)
+            if not refs:
+                continue
+            sizes = _image_display_sizes(page)
+            box = page.mediabox
+            fallback = (float(box.width), float(box.height))
+            for name, ref in refs:
+                key = hashes.get(ref.idnum)
+                if key is None:
+                    detached = _detach(ref, skip=("/SMask",))
+                    pixels = hashlib.sha256(_serialize(detached)).hexdigest()
+                    key = pixels
+                    smask = ref.get_object().get("/SMask")
+                    if smask is not None:
+                        key += ":" + hashlib.sha256(_serialize(_detach(smask))).hexdigest()
+                    hashes[ref.idnum] = key
+                    group = groups.setdefault(key, {"refs": [], "size": (0, 0), "xobj": detached,
+                                                    "pixels": pixels})
+                    group["refs"].append(ref)
+                group = groups[key]
+                w, h = sizes.get(name, fallback)
+                group["size"] = (max(group["size"][0], w), max(group["size"][1], h))
+            page_refs.append((page, refs))
+
+        # Re-encode each distinct image once, on a process pool when there is enough work
+        # Same pixels under different masks: one job, at the largest size any of them needs
+        sizes = {}
+        for group in groups.values():
+            w, h = sizes.get(group["pixels"], (0, 0))
+            sizes[group["pixels"]] = (max(w, group["size"][0]), max(h, group["size"][1]))
+        todo, jobs = [], []
+        for group in groups.values():
+            pixels = group["pixels"]
+            if pixels not in self.image_cache and pixels not in todo:
+                todo.append(pixels)
+                jobs.append((group["xobj"], sizes[pixels], self.settings["dpi"], self.settings["quality"]))
+        results = []
+        if self.workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.workers, len(jobs))) as pool:
+                try:
+                    for result in pool.map(_reencode_job, jobs):
+                        results.append(result)
+                        report(self.progress, len(results), len(jobs))
+                except OperationCancelled:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    raise
+        else:
+            for job in jobs:
+                results.append(_reencode_job(job))
+                report(self.progress, len(results), len(jobs))
+        self.image_cache.update(zip(todo, results))
+
+        for key, group in groups.items():
+            canonical = group["refs"][0]
+            result = self.image_cache[group["pixels"]]
+            if result is not None:
+                self._replace_image(writer, canonical, canonical.get_object(), *result)
+                self.images_recompressed += 1
+            self.images_shared += len(group["refs"]) - 1
+
+        # Point every copy of an image at its canonical object; the copies become
+        # unreferenced and are dropped by the dedup/pack stages
+        for page, refs in page_refs:
+            xobjects = page["/Resources"]["/XObject"]
+            for name, ref in refs:
+                canonical = groups[hashes[ref.idnum]]["refs"][0]
+                if canonical.idnum != ref.idnum:
+                    xobjects[NameObject(name)] = canonical
+
+    def _replace_image(self, writer, ref, xobj, data, width, height, colorspace):
+        fields = {
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(width),
+            NameObject("/Height"): NumberObject(height),
+            NameObject("/ColorSpace"): NameObject(colorspace),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+            NameObject("/Filter"): NameObject("/DCTDecode"),
+            "__streamdata__": data,
+        }
+        new = StreamObject.initialize_from_dictionary(fields)
+        # Keep the soft mask (transparency); PDF allows it to differ in resolution
+        for key in ("/SMask", "/Interpolate", "/Intent"):
+            if key in xobj:
+                new[NameObject(key)] = xobj.raw_get(key)
+        writer._replace_object(ref, new)
+
+    def serialize(self, writer):
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
@@ -0,0 +1,157 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from src.modules.input_ops import is_mapped, release
+from src.utils import metrics
+
+# Kept free of Qt. One instance (document_cache) is shared by every PDFOps call
+# and the Visual Editor in this process. It is per process: JobScheduler pool
+# processes each have their own. The GUI runs operations on the file open in the
+# Visual Editor on the scheduler's threads instead (MainWindow.start_worker), so
+# they lease the reader the editor already parsed.
+
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Rough per-object overhead of a parsed pypdf object, for the memory estimate
+OBJECT_COST = 400
+
+# File states remembered so an unchanged file is never hashed twice
+MAX_KNOWN_FILES = 4096
+
+def file_digest(path, chunk_size=1 << 20):
+    # Content hash, for keys that must survive a rename or an unchanged re-save (thumbnails)
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _file_state(path):
+    st = os.stat(path)
+    return (os.path.normcase(os.path.realpath(path)), st.st_mtime_ns, st.st_size)
+
+
+class DocumentCache:
+    """
+    LRU of parsed PdfReaders, bounded by an estimate of their memory (the file
+    bytes pypdf keeps in memory plus the objects parsed so far).
+    Entries are keyed by (real path, mtime, size) and a hash of the password, so
+    a lookup costs one stat() and a rewritten file is a miss; the file is never
+    read before pypdf parses it.
+    A reader is leased with open() and is out of the cache until the lease ends,
+    so two threads never share one. Readers must be treated as read-only: copy
+    pages into a PdfWriter, never modify the reader's objects.
+    Memory-mapped readers (large files, see input_ops) are kept like the others,
+    at the cost of their parsed objects only: the mapped pages belong to the OS
+    cache. Their map is closed as soon as they leave the cache (evicted, forgotten
+    or cleared), and AtomicOutput forgets a file before replacing it, so a cached
+    map never keeps this process from replacing it (Windows refuses while a map
+    is open). Pool processes drop theirs after every job, see release_maps().
+    """
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        """
+        max_bytes: Memory budget. 0 disables caching (every open() parses the file).
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = 0
+        self._entries = OrderedDict() # (file state, password hash) -> (reader, estimated bytes), oldest first
+        self._digests = OrderedDict() # (path, mtime_ns, size) -> content digest, see digest()
+        self._lock = threading.Lock()
+
+    def digest(self, path):
+        # Content hash of path, computed on first request and remembered per (path, mtime, size)
+        state = _file_state(path)
+        with self._lock:
+            digest = self._digests.get(state)
+        if digest is None:
+            digest = file_digest(path)
+            with self._lock:
+                self._digests[state] = digest
+                while len(self._digests) > MAX_KNOWN_FILES:
+                    self._digests.popitem(last=False)
+        return digest
+
+    @contextmanager
+    def open(self, path, password=None):
+        """
+        Lease the reader of path (decrypted with password) for the duration of the
+        with block. Raises PasswordRequired like open_reader.
+        """
+        from src.modules.pdf_ops import open_reader
+        # Only a hash of the password is kept, for as long as the entry lives
+        key = (_file_state(path), hashlib.sha256((password or "").encode("utf-8")).digest())
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.count(bytes_in=os.path.getsize(path), cache_hits=entry is not None)
+        if entry is not None:
+            reader = entry[0]
+        else:
+            with metrics.span("parse"):
+                reader = open_reader(path, password)
+        try:
+            yield reader
+        finally:
+            self._put(key, reader)
+
+    def _put(self, key, reader):
+        cost = OBJECT_COST * len(reader.resolved_objects)
+        if not is_mapped(reader):
+            cost += len(reader.stream.getbuffer())
+        try:
+            replaced = _file_state(key[0][0]) != key[0]
+        except OSError:
+            replaced = True
+        evicted = []
+        with self._lock:
+            if replaced or key in self._entries or cost > self.max_bytes:
+                # Written over during the lease (could never be hit again), parsed
+                # twice by concurrent leases, or too big to keep
+                evicted.append(reader)
+            else:
+                self._entries[key] = (reader, cost)
+                self.total_bytes += cost
+                while self.total_bytes > self.max_bytes:
+                    _, (old, old_cost) = self._entries.popitem(last=False)
+                    self.total_bytes -= old_cost
+                    evicted.append(old)
+        for old in evicted:
+            release(old)
+
+    def _drop(self, match):
+        # Remove the entries whose key matches and close their maps
+        with self._lock:
+            dropped = [self._entries.pop(k) for k in [k for k in self._entries if match(k)]]
+            self.total_bytes -= sum(cost for _, cost in dropped)
+        for reader, _ in dropped:
+            release(reader)
+
+    def forget(self, path):
+        # Drop cached readers of path (about to be replaced, so they could never be hit again)
+        name = os.path.normcase(os.path.realpath(path))
+        self._drop(lambda key: key[0][0] == name)
+
+    def release_maps(self):
+        # Drop the memory-mapped readers only, e.g. in a pool process between jobs:
+        # other processes can't make it forget a file they are about to replace
+        with self._lock:
+            mapped = {k for k, (reader, _) in self._entries.items() if is_mapped(reader)}
+        self._drop(lambda key: key in mapped)
+
+    def clear(self):
+        self._drop(lambda key: True)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "documents": len(self._entries),
+                    "bytes": self.total_bytes}
+
+document_cache = DocumentCache()
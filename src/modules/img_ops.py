@@ -1,22 +1,244 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image
+from PIL import ImageOps as PILImageOps
+from src.modules.output_ops import AtomicOutput
+from src.utils import metrics
+from src.utils.progress import OperationCancelled, report
+from src.utils.scheduler import worker_budget
+
+# Page sizes in points (portrait); pages are turned to match the image orientation
+PAGE_SIZES = {
+    "A4": (595.28, 841.89),
+    "Letter": (612.0, 792.0),
+}
+
+EXIF_ORIENTATION = 0x0112
+
+def _jpeg_passthrough_colorspace(img):
+    # PDF colorspace for a JPEG whose bytes can be embedded untouched, else None.
+    # Only the header has been read at this point (Image.open is lazy).
+    if img.format != "JPEG" or img.info.get("progressive") or img.info.get("progression"):
+        return None
+    # CMYK/YCCK JPEGs often carry Adobe-inverted data; let Pillow normalize those
+    return {"RGB": "/DeviceRGB", "L": "/DeviceGray"}.get(img.mode)
+
+def _fit_scale(width, height, page_size):
+    # Points per pixel that fit the image inside the page, keeping its aspect ratio
+    return min(page_size[0] / width, page_size[1] / height)
+
+def _prepare_image(job):
+    """
+    Pool entry point: turn one input file into a ready-to-embed JPEG.
+    Returns (jpeg_bytes, width, height, colorspace, resolution, page_size, passed_through).
+    """
+    path, options = job
+    with Image.open(path) as img:
+        orientation = img.getexif().get(EXIF_ORIENTATION, 1)
+        width, height = img.size
+        if orientation in (5, 6, 7, 8):
+            width, height = height, width
+
+        # Work out the output pixel size, page size and resolution
+        page_size = PAGE_SIZES.get(options["page_size"]) if options["page_size"] else None
+        resolution = 72.0
+        scale = 1.0
+        if page_size:
+            if (width > height) != (page_size[0] > page_size[1]):
+                page_size = (page_size[1], page_size[0])
+            effective_dpi = 72.0 / _fit_scale(width, height, page_size)
+            if options["dpi"] and effective_dpi > options["dpi"]:
+                scale = options["dpi"] / effective_dpi
+        elif options["dpi"]:
+            # No page size: the physical size comes from the image's own DPI
+            resolution = float((img.info.get("dpi") or (72.0,))[0] or 72.0)
+            if resolution > options["dpi"]:
+                scale = options["dpi"] / resolution
+                resolution = float(options["dpi"])
+
+        colorspace = _jpeg_passthrough_colorspace(img) if options["passthrough"] else None
+        if colorspace and orientation == 1 and scale == 1.0:
+            with open(path, "rb") as f:
+                return f.read(), img.width, img.height, colorspace, resolution, page_size, True
+
+        img = PILImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info):
+            # Flatten transparency onto white paper instead of letting it turn black
+            rgba = img.convert("RGBA")
+            img = Image.new("RGB", rgba.size, "white")
+            img.paste(rgba, mask=rgba.getchannel("A"))
+        img = img.convert("L" if img.mode in ("1", "L") else "RGB")
+        if scale < 1.0:
+            img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))),
+                             Image.Resampling.LANCZOS)
+
+        buf = io.BytesIO()
+        img.save(buf, "JPEG", quality=options["quality"])
+        colorspace = "/DeviceGray" if img.mode == "L" else "/DeviceRGB"
+        return buf.getvalue(), img.width, img.height, colorspace, resolution, page_size, False
+
+def _imap_ordered(func, items, workers):
+    # Like map(), but on a process pool with only a small window of results in flight
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        try:
+            for item in items:
+                pending.append(pool.submit(func, item))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        except GeneratorExit:
+            # Consumer stopped early (e.g. cancelled): drop items that haven't started
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+class ImagePdfWriter:
+    """
+    Minimal incremental PDF writer for image-only documents. Every page is written
+    to disk as soon as it is added, so memory use is bounded by the largest image.
+    """
+    def __init__(self, output_path):
+        # Written behind by a thread while the next image is prepared, renamed into place by close()
+        self.output = AtomicOutput(output_path, write_behind=True)
+        self.file = self.output.open()
+        self.offsets = [] # offsets[n - 1] = byte offset of object n
+        self.page_ids = []
+        self.file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.pages_id = self._reserve() # Page tree is written last, once the kids are known
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.output.discard()
+
+    @property
+    def page_count(self):
+        return len(self.page_ids)
+
+    def _reserve(self):
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def _write_object(self, obj_id, body):
+        self.offsets[obj_id - 1] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode())
+        self.file.write(body)
+        self.file.write(b"\nendobj\n")
+
+    def _write_stream(self, obj_id, dictionary, data):
+        self._write_object(obj_id, f"<< {dictionary} /Length {len(data)} >>\nstream\n".encode()
+                           + data + b"\nendstream")
+
+    def add_jpeg(self, data, width, height, colorspace="/DeviceRGB", resolution=72.0, page_size=None):
+        # Embed already-encoded JPEG bytes as a DCTDecode image on its own page. Without a
+        # page_size the page is the image at `resolution`; otherwise the image is fitted and centered.
+        if page_size:
+            page_w, page_h = page_size
+            scale = _fit_scale(width, height, page_size)
+            img_w, img_h = width * scale, height * scale
+            x, y = (page_w - img_w) / 2, (page_h - img_h) / 2
+        else:
+            page_w = img_w = width * 72.0 / resolution
+            page_h = img_h = height * 72.0 / resolution
+            x = y = 0
+
+        image_id = self._reserve()
+        self._write_stream(image_id, f"/Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                                     f"/ColorSpace {colorspace} /BitsPerComponent 8 /Filter /DCTDecode", data)
+
+        content_id = self._reserve()
+        self._write_stream(content_id, "", f"q {img_w:.4f} 0 0 {img_h:.4f} {x:.4f} {y:.4f} cm /Im0 Do Q".encode())
+
+        page_id = self._reserve()
+        self._write_object(page_id, (f"<< /Type /Page /Parent {self.pages_id} 0 R "
+                                     f"/MediaBox [0 0 {page_w:.4f} {page_h:.4f}] "
+                                     f"/Resources << /XObject << /Im0 {image_id} 0 R >> /ProcSet [/PDF /ImageC] >> "
+                                     f"/Contents {content_id} 0 R >>").encode())
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = " ".join(f"{n} 0 R" for n in self.page_ids)
+        self._write_object(self.pages_id, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        catalog_id = self._reserve()
+        self._write_object(catalog_id, f"<< /Type /Catalog /Pages {self.pages_id} 0 R >>".encode())
+
+        xref_offset = self.file.tell()
+        self.file.write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n".encode())
+        for offset in self.offsets:
+            self.file.write(f"{offset:010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {len(self.offsets) + 1} /Root {catalog_id} 0 R >>\n"
+                        f"startxref\n{xref_offset}\n%%EOF\n".encode())
+        self.output.commit()
 
 class ImageOps:
     @staticmethod
-    def images_to_pdf(image_paths, output_path):
+    @metrics.instrumented
+    def images_to_pdf(image_paths, output_path, stream=False, jpeg_passthrough=True,
+                      page_size=None, dpi=None, quality=75, workers=None, progress=None):
+        """
+        stream: Prepare and write one image at a time instead of holding every decoded
+                image until the end (memory bounded by the largest image). Stream mode also
+                applies EXIF rotation and flattens transparency onto white.
+        jpeg_passthrough: In stream mode, embed baseline RGB/gray JPEGs byte for byte
+                          when no rotation or resampling is needed.
+        page_size: "A4"/"Letter" to fit every image on that page size, None = image size.
+        dpi: Downscale images above this resolution (on the fitted page, or by their own DPI).
+        workers: Processes used to prepare images in stream mode (output order is kept).
+                 None = all cores, 1 = in-process.
+        progress: Optional ProgressToken, updated per image.
+        """
         try:
             if not image_paths:
                 return False, "No images selected"
-            
+
+            if stream:
+                if workers is None:
+                    workers = worker_budget()
+                workers = max(1, min(workers, worker_budget(), len(image_paths)))
+                options = {"page_size": page_size, "dpi": dpi, "quality": quality,
+                           "passthrough": jpeg_passthrough}
+                jobs = ((path, options) for path in image_paths)
+
+                passed_through = 0
+                with ImagePdfWriter(output_path) as pdf:
+                    # Inputs are opened and closed inside _prepare_image, page by page
+                    for data, w, h, colorspace, resolution, size, raw in _imap_ordered(_prepare_image, jobs, workers):
+                        with metrics.span("write"):
+                            pdf.add_jpeg(data, w, h, colorspace, resolution, size)
+                        passed_through += raw
+                        report(progress, pdf.page_count, len(image_paths))
+                metrics.count(bytes_in=sum(os.path.getsize(p) for p in image_paths), pages=pdf.page_count)
+                return True, (f"Converted {pdf.page_count} images to {output_path} "
+                              f"({passed_through} JPEGs embedded without re-encoding)")
+
             images = []
             for path in image_paths:
-                img = Image.open(path)
-                if img.mode != 'RGB':
-                    img = img.convert('RGB')
+                with metrics.span("decode"):
+                    img = Image.open(path)
+                    if img.mode != 'RGB':
+                        img = img.convert('RGB')
                 images.append(img)
-            
+                metrics.count(bytes_in=os.path.getsize(path))
+                report(progress, len(images), len(image_paths))
+
             if images:
-                images[0].save(output_path, save_all=True, append_images=images[1:])
+                with AtomicOutput(output_path) as f, metrics.span("write"):
+                    images[0].save(f, "PDF", save_all=True, append_images=images[1:])
+                metrics.count(pages=len(images))
                 return True, f"Converted {len(image_paths)} images to {output_path}"
             return False, "No valid images processed"
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, str(e)
@@ -0,0 +1,55 @@
+import io
+import mmap
+import os
+
+# Kept free of Qt.
+#
+# pypdf opens a path by reading the whole file into a BytesIO: a 1 GB input costs
+# a 1 GB read and a 1 GB private copy before the first object is parsed, in every
+# process that opens it. Handing PdfReader a read-only memory map instead costs
+# no upfront read; only the byte ranges pypdf actually parses are paged in, and
+# those pages are shared with the OS cache and with every pool process mapping
+# the same file. (pypdf still copies each object's bytes out of the map as it
+# parses them; the whole-file copy is what goes away.)
+
+# Smaller files are read outright: a map isn't faster there
+MMAP_MIN_BYTES = 1024 * 1024
+
+# CLEANPDF_MMAP=0 turns mapping off (e.g. for storage that misbehaves with maps)
+USE_MMAP = os.environ.get("CLEANPDF_MMAP", "1") != "0"
+
+def open_input(path, allow_map=True):
+    """
+    Read-only file-like view of path for PdfReader: a memory map when possible,
+    otherwise the file's bytes in a BytesIO (what pypdf does for a path).
+    Small and empty files, special files and file systems that refuse maps take
+    the fallback. The file handle is closed either way; a map keeps its own.
+    allow_map: False forces the private copy, for a file that is about to be
+    overwritten while it is still being read (a truncated map faults on access).
+    """
+    with open(path, "rb") as f:
+        if allow_map and USE_MMAP and os.fstat(f.fileno()).st_size >= MMAP_MIN_BYTES:
+            try:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (OSError, ValueError, OverflowError):
+                f.seek(0)
+        return io.BytesIO(f.read())
+
+def is_mapped(reader):
+    return isinstance(reader.stream, mmap.mmap)
+
+def release(reader):
+    # Close the map behind a reader that is done with; the file can then be
+    # replaced or deleted (Windows refuses both while any process maps it)
+    if is_mapped(reader):
+        try:
+            reader.stream.close()
+        except BufferError:
+            pass # Still exported somewhere; it closes when that is collected
+
+def same_file(path, other):
+    # True if both paths name one existing file
+    try:
+        return os.path.samefile(path, other)
+    except OSError:
+        return False
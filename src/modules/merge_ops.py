@@ -0,0 +1,187 @@
+import hashlib
+import io
+import os
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NullObject, StreamObject
+from src.modules.compress_ops import deduplicate_objects
+from src.modules.input_ops import open_input, release
+from src.modules.output_ops import AtomicOutput
+from src.utils import metrics
+from src.utils.progress import report
+
+
+def _serialize(obj):
+    buf = io.BytesIO()
+    obj.write_to_stream(buf)
+    return buf.getvalue()
+
+
+def _has_references(obj):
+    if isinstance(obj, IndirectObject):
+        return True
+    if isinstance(obj, DictionaryObject):
+        return any(_has_references(v) for v in obj.values())
+    if isinstance(obj, ArrayObject):
+        return any(_has_references(v) for v in obj)
+    return False
+
+
+def _resolve(writer, idnum):
+    # The object, or None for a reference to an object the input doesn't have
+    try:
+        return writer.get_object(idnum)
+    except (IndexError, KeyError):
+        return None
+
+
+def _remap(obj, mapping, writer):
+    # Rewrite references in place to their final object numbers; references that
+    # can't be resolved become null, which is what a reader makes of them anyway
+    if isinstance(obj, DictionaryObject):
+        items = list(obj.items())
+    elif isinstance(obj, ArrayObject):
+        items = list(enumerate(obj))
+    else:
+        return
+    for key, value in items:
+        if isinstance(value, IndirectObject):
+            target = mapping.get(value.idnum)
+            obj[key] = NullObject() if target is None else IndirectObject(target, 0, writer)
+        else:
+            _remap(value, mapping, writer)
+
+
+class StreamingMerger:
+    """
+    Merges documents batch by batch straight into the output file. Each batch is
+    copied into a throwaway PdfWriter, written out and released, so memory and open
+    handles stay flat no matter how many inputs there are; only object offsets and
+    page numbers are kept until the end. Outlines and forms of the inputs are not carried over.
+    """
+    def __init__(self, output_path, dedup=False):
+        # Written behind by a thread while the next batch is copied, renamed into place by close()
+        self.output = AtomicOutput(output_path, write_behind=True)
+        self.file = self.output.open()
+        self.dedup = dedup
+        self.offsets = [None] # offsets[n - 1] = byte offset of object n; object 1 is the page tree
+        self.page_ids = []
+        self.shared = {} # content hash of self-contained streams -> object number
+        self.objects_seen = 0
+        self.file.write(b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.output.discard()
+
+    @property
+    def objects_written(self):
+        return len(self.offsets)
+
+    def _new_id(self):
+        self.offsets.append(None)
+        return len(self.offsets)
+
+    def _write_object(self, obj_id, body):
+        self.offsets[obj_id - 1] = self.file.tell()
+        self.file.write(f"{obj_id} 0 obj\n".encode())
+        self.file.write(body)
+        self.file.write(b"\nendobj\n")
+
+    def add_batch(self, paths, progress=None, done=0, total=None):
+        # done/total: position of this batch in the whole merge, for progress reports
+        writer = PdfWriter()
+        for path in paths:
+            # The reader (and its map of the file) is released as soon as its pages
+            # have been copied
+            with metrics.span("parse"):
+                reader = PdfReader(open_input(path))
+            with metrics.span("copy"):
+                for page in reader.pages:
+                    writer.add_page(page)
+            metrics.count(bytes_in=os.path.getsize(path), pages=len(reader.pages))
+            release(reader)
+            del reader
+            done += 1
+            report(progress, done, total or len(paths))
+        if self.dedup:
+            with metrics.span("dedup"):
+                copied, _ = deduplicate_objects(writer)
+            self.objects_seen += copied
+        with metrics.span("write"):
+            self._write_batch(writer)
+
+    def _write_batch(self, writer):
+        # Everything the pages reach. Only a page's own /Parent is skipped (it is replaced
+        # by our page tree); /Parent of its annotations and form fields is followed.
+        pages = [page.indirect_reference.idnum for page in writer.pages]
+        page_set = set(pages)
+        reachable = []
+        seen = set(pages)
+        todo = list(pages)
+        while todo:
+            idnum = todo.pop()
+            obj = _resolve(writer, idnum)
+            if obj is None:
+                continue
+            reachable.append(idnum)
+            if idnum in page_set:
+                stack = [v for k, v in obj.items() if k != "/Parent"]
+            else:
+                stack = [obj]
+            while stack:
+                obj = stack.pop()
+                if isinstance(obj, DictionaryObject):
+                    stack.extend(obj.values())
+                elif isinstance(obj, ArrayObject):
+                    stack.extend(obj)
+                elif isinstance(obj, IndirectObject) and obj.idnum not in seen:
+                    seen.add(obj.idnum)
+                    todo.append(obj.idnum)
+        if not self.dedup:
+            self.objects_seen += len(reachable)
+
+        # Self-contained streams (font files, images, ICC profiles) are written right
+        # away and shared with earlier batches when their bytes are identical
+        mapping = {}
+        remaining = []
+        for idnum in sorted(reachable):
+            obj = writer.get_object(idnum)
+            if self.dedup and isinstance(obj, StreamObject) and not _has_references(obj):
+                body = _serialize(obj)
+                key = hashlib.sha256(body).digest()
+                if key not in self.shared:
+                    self.shared[key] = self._new_id()
+                    self._write_object(self.shared[key], body)
+                mapping[idnum] = self.shared[key]
+            else:
+                mapping[idnum] = self._new_id()
+                remaining.append(idnum)
+
+        for idnum in remaining:
+            obj = writer.get_object(idnum)
+            if idnum in page_set:
+                del obj["/Parent"]
+            _remap(obj, mapping, writer)
+            if idnum in page_set:
+                obj[NameObject("/Parent")] = IndirectObject(1, 0, writer)
+            self._write_object(mapping[idnum], _serialize(obj))
+        self.page_ids.extend(mapping[idnum] for idnum in pages)
+
+    def close(self):
+        kids = " ".join(f"{n} 0 R" for n in self.page_ids)
+        self._write_object(1, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+        catalog_id = self._new_id()
+        self._write_object(catalog_id, b"<< /Type /Catalog /Pages 1 0 R >>")
+
+        xref_offset = self.file.tell()
+        self.file.write(f"xref\n0 {len(self.offsets) + 1}\n0000000000 65535 f \n".encode())
+        for offset in self.offsets:
+            self.file.write(f"{offset:010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {len(self.offsets) + 1} /Root {catalog_id} 0 R >>\n"
+                        f"startxref\n{xref_offset}\n%%EOF\n".encode())
+        self.output.commit()
@@ -0,0 +1,195 @@
+from pypdf import PageObject, PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+from src.modules.output_ops import AtomicOutput
+from src.utils import metrics
+from src.utils.progress import report
+
+# Resource categories whose entries are referenced by name from content streams
+PRUNABLE = ("/XObject", "/Font", "/ExtGState", "/Shading", "/Pattern", "/ColorSpace", "/Properties")
+NAME_OPERATORS = {b"Do": "/XObject", b"Tf": "/Font", b"gs": "/ExtGState", b"sh": "/Shading",
+                  b"cs": "/ColorSpace", b"CS": "/ColorSpace"}
+
+def _used_resource_names(page):
+    # {category: names} the page's content stream refers to
+    used = {category: set() for category in PRUNABLE}
+    contents = page.get_contents()
+    if contents is None:
+        return used
+    for operands, operator in contents.operations:
+        if operator == b"INLINE IMAGE":
+            color_space = operands["settings"].get("/CS", operands["settings"].get("/ColorSpace"))
+            if isinstance(color_space, NameObject):
+                used["/ColorSpace"].add(color_space)
+        elif operator in NAME_OPERATORS and operands and isinstance(operands[0], NameObject):
+            used[NAME_OPERATORS[operator]].add(operands[0])
+        elif operator in (b"scn", b"SCN") and operands and isinstance(operands[-1], NameObject):
+            used["/Pattern"].add(operands[-1])
+        elif operator in (b"BDC", b"DP") and len(operands) > 1 and isinstance(operands[1], NameObject):
+            used["/Properties"].add(operands[1])
+    return used
+
+def _pruned_resources(page):
+    """
+    Copy of the page's /Resources with only the named entries its content uses, so
+    a resource dictionary shared by the whole document doesn't drag every font and
+    image into the output. The original is returned when pruning is not safe.
+    """
+    resources = page.get("/Resources")
+    if resources is None:
+        return None
+    resources = resources.get_object()
+    try:
+        used = _used_resource_names(page)
+    except Exception:
+        return resources # Unparsable content: keep everything
+
+    pruned = DictionaryObject()
+    for key in resources:
+        value = resources.raw_get(key)
+        if key not in PRUNABLE or not isinstance(value.get_object(), DictionaryObject):
+            pruned[NameObject(key)] = value
+            continue
+        category = value.get_object()
+        kept = DictionaryObject({NameObject(name): category.raw_get(name) for name in category if name in used[key]})
+        if key == "/XObject":
+            for name in kept:
+                xobj = kept[name].get_object()
+                if xobj.get("/Subtype") == "/Form" and "/Resources" not in xobj:
+                    return resources # Old-style form using the page's resources
+        if kept:
+            pruned[NameObject(key)] = kept
+    return pruned
+
+class PageOrganizer:
+    """
+    Builds a reordered/rotated copy of a document. Every source page is resolved and
+    copied once; a page listed twice becomes a second page dictionary sharing the
+    first copy's contents and resources, with annotations of its own. Rotation is
+    set on the output page (source /Rotate + requested angle), so the source is
+    never modified. Only resources the kept pages' contents use are copied, and
+    links to dropped pages are removed.
+    """
+    def __init__(self, reader):
+        self.reader = reader
+        self.writer = PdfWriter()
+        self.copies = {} # source page index -> ([output pages], source /Rotate)
+        self.out_pages = {} # source page idnum -> first output page (for links)
+
+    def _copy_page(self, index):
+        source = self.reader.pages[index]
+        page = PageObject(self.reader)
+        for key in source:
+            if key not in ("/Parent", "/Resources", "/Annots"):
+                page[NameObject(key)] = source.raw_get(key)
+        resources = _pruned_resources(source)
+        if resources is not None:
+            page[NameObject("/Resources")] = resources
+        out = self.writer.add_page(page)
+        self.out_pages[source.indirect_reference.idnum] = out
+        return out, int(source.get("/Rotate", 0) or 0)
+
+    def _duplicate(self, first):
+        page = PageObject(self.writer)
+        for key in first:
+            if key not in ("/Parent", "/Annots"):
+                page[NameObject(key)] = first.raw_get(key)
+        return self.writer.add_page(page)
+
+    def add(self, index, rotation=0):
+        if index in self.copies:
+            outs, base = self.copies[index]
+            out = self._duplicate(outs[0])
+            outs.append(out)
+        else:
+            out, base = self._copy_page(index)
+            self.copies[index] = ([out], base)
+        angle = (base + rotation) % 360
+        if angle or "/Rotate" in out:
+            out[NameObject("/Rotate")] = NumberObject(angle)
+        return out
+
+    def copy_annotations(self):
+        # After all pages are placed, so links can be pointed at their output pages
+        for index, (outs, _) in self.copies.items():
+            annots = self.reader.pages[index].get("/Annots")
+            if not annots:
+                continue
+            clones = []
+            for ref in annots.get_object():
+                annot = ref.get_object()
+                target = _link_target(annot)
+                if target is not None and target not in self.out_pages:
+                    continue # Link to a page that was dropped
+                # /P and /Parent lead back to source pages and form fields; they are not carried over
+                clone = annot.clone(self.writer, ignore_fields=("/P", "/Parent", "/Popup", "/Dest", "/A"))
+                clone = clone.get_object()
+                for key in ("/Dest", "/A"):
+                    if key in annot:
+                        clone[NameObject(key)] = _remap_destination(annot[key], self.writer, self.out_pages)
+                clones.append(clone)
+            if not clones:
+                continue
+            for n, out in enumerate(outs):
+                copied = ArrayObject()
+                for clone in clones:
+                    if n == 0:
+                        clone[NameObject("/P")] = out.indirect_reference
+                        copied.append(clone.indirect_reference or self.writer._add_object(clone))
+                        continue
+                    # Later copies of the page get their own dictionaries (an annotation
+                    # belongs to one page), still sharing appearance streams
+                    annot = DictionaryObject(clone)
+                    annot[NameObject("/P")] = out.indirect_reference
+                    copied.append(self.writer._add_object(annot))
+                out[NameObject("/Annots")] = copied
+
+    def write(self, output_path):
+        with AtomicOutput(output_path) as f, metrics.span("write"):
+            self.writer.write(f)
+
+def _link_target(annot):
+    # idnum of the page a link annotation points at, or None
+    dest = annot.get("/Dest")
+    action = annot.get("/A")
+    if dest is None and isinstance(action, DictionaryObject) and action.get("/S") == "/GoTo":
+        dest = action.get("/D")
+    if isinstance(dest, ArrayObject) and dest:
+        first = list.__getitem__(dest, 0) # Unresolved, to get at the reference
+        if isinstance(first, IndirectObject):
+            return first.idnum
+    return None
+
+def _remap_destination(value, writer, out_pages):
+    # Copy a /Dest array or /A action, pointing page references at the output pages
+    value = value.get_object()
+    if isinstance(value, ArrayObject):
+        copy = ArrayObject()
+        for item in (list.__getitem__(value, i) for i in range(len(value))):
+            if isinstance(item, IndirectObject) and item.idnum in out_pages:
+                copy.append(out_pages[item.idnum].indirect_reference)
+            else:
+                copy.append(item.clone(writer))
+        return copy
+    if isinstance(value, DictionaryObject):
+        copy = DictionaryObject()
+        for key in value:
+            copy[NameObject(key)] = _remap_destination(value.raw_get(key), writer, out_pages) \
+                if key == "/D" else value.raw_get(key).clone(writer)
+        return copy
+    return value.clone(writer)
+
+def organize(reader, output_path, page_config, progress=None):
+    # page_config: [{'index': int, 'rotate': int}, ...]; returns the number of pages written
+    organizer = PageOrganizer(reader)
+    written = 0
+    with metrics.span("copy"):
+        for done, item in enumerate(page_config, 1):
+            index = item.get('index')
+            if 0 <= index < len(reader.pages):
+                organizer.add(index, item.get('rotate', 0))
+                written += 1
+            report(progress, done, len(page_config))
+        organizer.copy_annotations()
+    metrics.count(pages=written)
+    organizer.write(output_path)
+    return written
@@ -0,0 +1,218 @@
+import os
+import queue
+import tempfile
+import threading
+from src.utils import metrics
+
+# Kept free of Qt.
+#
+# Every output is written to a temporary file next to its destination and only
+# renamed over it once it is complete and flushed to disk. A crash, cancellation
+# or error partway through leaves the previous file (or nothing) at output_path,
+# never a truncated PDF. The rename happens within one directory, so it is atomic.
+
+# Large buffer: fewer, larger writes are much cheaper on network shares
+WRITE_BUFFER = 1 << 20
+
+# Chunks a write-behind thread may have queued before the producer waits for it
+WRITE_BEHIND_DEPTH = 4
+
+def _read_umask():
+    # The process umask, for giving new outputs the permissions open() would have.
+    # Read from /proc where possible: os.umask() can only be read by setting it,
+    # which would briefly change it for files other threads are creating.
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError):
+        pass
+    # No /proc (macOS, Windows): a throwaway file shows what the umask does to 0o666
+    try:
+        fd, path = tempfile.mkstemp()
+    except OSError:
+        return 0o022
+    try:
+        os.close(fd)
+        os.remove(path)
+        fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666)
+        os.close(fd)
+        return 0o666 & ~os.stat(path).st_mode & 0o777
+    except OSError:
+        return 0o022
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+_UMASK = _read_umask()
+
+class _WriteBehind:
+    """
+    File-like front for a binary file: writes are gathered into chunks that a
+    background thread writes out, so serializing the next objects overlaps the
+    (disk or network) write of the previous ones. tell() counts bytes accepted.
+    Write errors surface on a later write() or on finish().
+    """
+    def __init__(self, raw, chunk_size=WRITE_BUFFER):
+        self.raw = raw
+        self.chunk_size = chunk_size
+        self.buffer = bytearray()
+        self.position = raw.tell()
+        self.error = None
+        self.chunks = queue.Queue(maxsize=WRITE_BEHIND_DEPTH)
+        self.thread = threading.Thread(target=self._drain, name="write-behind", daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        while True:
+            chunk = self.chunks.get()
+            try:
+                if chunk is None:
+                    return
+                if self.error is None:
+                    self.raw.write(chunk)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.chunks.task_done()
+
+    def _hand_off(self):
+        if self.error is not None:
+            raise self.error
+        if self.buffer:
+            self.chunks.put(bytes(self.buffer))
+            self.buffer.clear()
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= self.chunk_size:
+            self._hand_off()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        # Everything written so far has reached the file
+        self._hand_off()
+        self.chunks.join()
+        if self.error is not None:
+            raise self.error
+        self.raw.flush()
+
+    def finish(self):
+        # Stop the thread; the buffer is dropped if a write already failed
+        try:
+            if self.error is None:
+                self.flush()
+        finally:
+            self.chunks.put(None)
+            self.thread.join()
+
+class AtomicOutput:
+    """
+    Output sink for one file. open() returns a buffered file object writing to a
+    temporary file in the target directory; commit() flushes and fsyncs it and
+    renames it over output_path, discard() deletes it. As a context manager the
+    file is committed when the block succeeds and discarded when it raises.
+    text: Open in text mode (UTF-8) instead of binary.
+    write_behind: Hand full buffers to a writer thread (binary only), for large
+                  outputs that are produced while they are written.
+    """
+    def __init__(self, output_path, text=False, write_behind=False, buffer_size=WRITE_BUFFER):
+        self.output_path = output_path
+        self.text = text
+        self.write_behind = write_behind and not text
+        self.buffer_size = buffer_size
+        self.temp_path = None
+        self.raw = None
+        self.file = None
+
+    def open(self):
+        directory = os.path.dirname(os.path.abspath(self.output_path))
+        fd, self.temp_path = tempfile.mkstemp(prefix=f".{os.path.basename(self.output_path)}.",
+                                              suffix=".part", dir=directory)
+        try:
+            if self.text:
+                self.raw = open(fd, "w", encoding="utf-8", buffering=self.buffer_size)
+            else:
+                self.raw = open(fd, "wb", buffering=self.buffer_size)
+        except Exception:
+            os.close(fd)
+            self.discard()
+            raise
+        self.file = _WriteBehind(self.raw, self.buffer_size) if self.write_behind else self.raw
+        return self.file
+
+    def commit(self):
+        try:
+            with metrics.span("sync"):
+                if self.file is not self.raw:
+                    self.file.finish()
+                self.raw.flush()
+                os.fsync(self.raw.fileno())
+                metrics.count(bytes_out=os.fstat(self.raw.fileno()).st_size)
+                self.raw.close()
+            _copy_mode(self.output_path, self.temp_path)
+            # Cached readers of the file being replaced could never be hit again
+            from src.modules.doc_cache import document_cache
+            document_cache.forget(self.output_path)
+            os.replace(self.temp_path, self.output_path)
+        except BaseException:
+            self.discard()
+            raise
+        self.temp_path = None
+        _sync_directory(os.path.dirname(os.path.abspath(self.output_path)))
+
+    def discard(self):
+        try:
+            if self.file is not None and self.file is not self.raw:
+                self.file.finish()
+        except Exception:
+            pass # The output is being thrown away
+        finally:
+            if self.raw is not None:
+                self.raw.close()
+            if self.temp_path is not None:
+                try:
+                    os.remove(self.temp_path)
+                except OSError:
+                    pass
+                self.temp_path = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.discard()
+
+def _copy_mode(output_path, temp_path):
+    # mkstemp creates files only the owner can read: keep the replaced file's mode,
+    # or use what open() would have given a new file
+    try:
+        mode = os.stat(output_path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(temp_path, mode)
+
+def _sync_directory(directory):
+    # Makes the rename itself durable; directories can't be opened on Windows
+    if os.name != "posix":
+        return
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -1,171 +1,480 @@
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from pypdf import PdfReader, PdfWriter
+from pypdf._encryption import PasswordType
+from src.modules.doc_cache import document_cache
+from src.modules.input_ops import open_input
+from src.modules.output_ops import AtomicOutput
+from src.utils import metrics
+from src.utils.progress import OperationCancelled, report
+from src.utils.scheduler import worker_budget
+
+# Documents shorter than this are extracted in-process; spawning a pool costs more than it saves.
+PARALLEL_MIN_PAGES = 64
+
+# Per-process reader used by the page pools (opened once by _init_worker_reader).
+# pypdf caches every object it resolves, so shared fonts/XObjects are parsed once per process.
+_worker_reader = None
+
+def _init_worker_reader(input_path):
+    global _worker_reader
+    _worker_reader = PdfReader(open_input(input_path))
+
+def _extract_page_range(page_range):
+    # Runs inside a pool process: returns [(index, text), ...] for one shard
+    start, end = page_range
+    return [(i, _worker_reader.pages[i].extract_text()) for i in range(start, end)]
+
+def _shard_pages(total_pages, workers):
+    # Several shards per worker so a slow (dense) region doesn't stall one core
+    shard_size = max(1, -(-total_pages // (workers * 4)))
+    return [(s, min(s + shard_size, total_pages)) for s in range(0, total_pages, shard_size)]
+
+class PasswordRequired(Exception):
+    # The PDF is encrypted and no password (or a wrong one) was given
+    pass
+
+# (sha256 of the password, security handler values) -> file key, least recently
+# used first. Files locked together (a batch) share these values, so the slow
+# password check runs once for all of them. Only a hash of the password is kept.
+MAX_UNLOCK_KEYS = 256
+_unlock_cache = OrderedDict()
+_unlock_lock = threading.Lock()
+
+def open_reader(input_path, password=None, key=None, allow_map=True):
+    """
+    PdfReader, decrypted if needed; raises PasswordRequired instead of failing later.
+    Most callers want document_cache.open() instead, which reuses parsed files.
+    key: File key already derived by the caller (pool processes), skips the password check.
+    allow_map: See open_input; False reads the file into memory.
+    """
+    reader = PdfReader(open_input(input_path, allow_map))
+    if not reader.is_encrypted:
+        return reader
+    encryption = reader._encryption
+    if encryption.is_decrypted():
+        return reader # Files with only an owner password open with an empty user password
+    if key is None:
+        values = encryption.values
+        cache_key = (hashlib.sha256((password or "").encode("utf-8")).digest(), encryption.R,
+                     values.O, values.U, values.OE, values.UE, encryption.id1_entry)
+        with _unlock_lock:
+            key = _unlock_cache.get(cache_key)
+            if key is not None:
+                _unlock_cache.move_to_end(cache_key)
+        if key is None:
+            if not reader.decrypt(password or ""):
+                raise PasswordRequired("Incorrect password." if password else "This PDF is password protected.")
+            with _unlock_lock:
+                _unlock_cache[cache_key] = encryption._key
+                while len(_unlock_cache) > MAX_UNLOCK_KEYS:
+                    _unlock_cache.popitem(last=False)
+            return reader
+    encryption._key = key
+    encryption._password_type = PasswordType.OWNER_PASSWORD
+    return reader
+
+def iter_page_info(input_path, password=None, batch_size=200, progress=None):
+    """
+    Yields lists of (rotation, width, height) for consecutive pages, in page order.
+    Only the trailer and the page tree are read (with /Rotate and /MediaBox inherited
+    from parent nodes); page contents and resources are never parsed.
+    progress: Optional ProgressToken, updated per batch against the tree's /Count.
+    """
+    with document_cache.open(input_path, password) as reader:
+        yield from _iter_page_tree(reader, batch_size, progress)
+
+def _iter_page_tree(reader, batch_size, progress):
+    root = reader.trailer["/Root"]["/Pages"].get_object()
+    total = int(root.get("/Count", 0))
+    batch = []
+    done = 0
+    seen = set()
+    stack = [(root, 0, None)] # node, inherited rotation, inherited media box
+    while stack:
+        node, rotation, box = stack.pop()
+        rotation = node.get("/Rotate", rotation)
+        box = node.get("/MediaBox", box)
+        kids = node.get("/Kids")
+        if kids is None or node.get("/Type") == "/Page":
+            if box is None:
+                box = (0, 0, 612, 792) # Letter, the usual viewer default
+            width, height = abs(float(box[2]) - float(box[0])), abs(float(box[3]) - float(box[1]))
+            batch.append((int(rotation or 0) % 360, width, height))
+            if len(batch) >= batch_size:
+                done += len(batch)
+                report(progress, done, max(total, done))
+                yield batch
+                batch = []
+            continue
+        # Kids pushed in reverse so pages come off the stack in order
+        for kid in reversed(kids):
+            ref = getattr(kid, "idnum", None)
+            if ref is not None:
+                if ref in seen:
+                    continue # Broken tree with a cycle
+                seen.add(ref)
+            stack.append((kid.get_object(), rotation, box))
+    if batch:
+        done += len(batch)
+        report(progress, done, max(total, done))
+        yield batch
+
+def _format_size(num_bytes):
+    for unit in ("B", "KB", "MB"):
+        if num_bytes < 1024:
+            return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GB"
+
+def _parse_page_range(page_range, total_pages):
+    # Parse "1-3,5, 8-10" into one list of 0-based pages per comma-separated part
+    groups = []
+    for part in [p.strip() for p in page_range.split(',')]:
+        if not part:
+            continue
+        if '-' in part:
+            start, end = map(int, part.split('-'))
+            # Adjust to 0-based, handle inclusive range
+            pages = [p for p in range(start - 1, end) if 0 <= p < total_pages]
+        else:
+            p = int(part) - 1
+            pages = [p] if 0 <= p < total_pages else []
+        if pages:
+            groups.append(pages)
+    return groups
+
+def _page_label(pages):
+    # "1-3_7_9-10" for 0-based pages [0, 1, 2, 6, 8, 9]: names what a file actually holds
+    runs = []
+    for p in pages:
+        if runs and p == runs[-1][1] + 1:
+            runs[-1][1] = p
+        else:
+            runs.append([p, p])
+    labels = [f"{a + 1}" if a == b else f"{a + 1}-{b + 1}" for a, b in runs]
+    if len(labels) > 4:
+        labels = [labels[0], labels[1], "...", labels[-1]] # Keep file names short
+    return "_".join(labels)
+
+def _write_split_jobs(reader, jobs, progress=None):
+    # jobs: [(output_path, [page indices]), ...]
+    for done, (output_path, indices) in enumerate(jobs, 1):
+        writer = PdfWriter()
+        with metrics.span("copy"):
+            for i in indices:
+                writer.add_page(reader.pages[i])
+        with AtomicOutput(output_path) as out_file, metrics.span("write"):
+            writer.write(out_file)
+        report(progress, done, len(jobs))
+    return len(jobs)
+
+def _write_split_shard(jobs):
+    # Runs inside a pool process
+    return _write_split_jobs(_worker_reader, jobs)
+
+def _iter_page_text(reader, input_path, workers):
+    # Yields (index, text) in page order. The pool only keeps a small window of
+    # shards in flight so results never pile up faster than they are consumed.
+    if workers <= 1:
+        for i, page in enumerate(reader.pages):
+            with metrics.span("extract"):
+                text = page.extract_text()
+            yield i, text
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_reader,
+                             initargs=(input_path,)) as pool:
+        pending = deque()
+        try:
+            for shard in _shard_pages(len(reader.pages), workers):
+                pending.append(pool.submit(_extract_page_range, shard))
+                if len(pending) >= workers * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        except GeneratorExit:
+            # Consumer stopped early (e.g. cancelled): drop shards that haven't started
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
 
 class PDFOps:
     @staticmethod
-    def merge_pdfs(input_paths, output_path):
+    @metrics.instrumented
+    def merge_pdfs(input_paths, output_path, dedup=False, batch_size=None, progress=None):
+        """
+        dedup: Store fonts, images and other objects shared across the inputs only once
+               (e.g. invoices generated from one template) and report the savings.
+        batch_size: Merge this many inputs at a time straight into the output file and
+                    release them, so memory and open handles stay flat for huge input
+                    sets. Only pages are kept (no outlines/forms). None = merge in memory.
+        progress: Optional ProgressToken, updated per input file (and checked for cancellation).
+        """
         try:
+            if batch_size:
+                from src.modules.merge_ops import StreamingMerger
+                start = time.perf_counter()
+                with StreamingMerger(output_path, dedup=dedup) as merger:
+                    for i in range(0, len(input_paths), batch_size):
+                        merger.add_batch(input_paths[i:i + batch_size], progress, i, len(input_paths))
+                elapsed = time.perf_counter() - start
+                stats = ""
+                if dedup:
+                    seen, written = merger.objects_seen, merger.objects_written
+                    ratio = seen / written if written else 1.0
+                    stats = f" (deduplicated {seen} -> {written} objects, {ratio:.2f}x, in {elapsed:.2f}s)"
+                return True, f"Merged {len(input_paths)} files to {output_path}{stats}"
+            
             merger = PdfWriter()
-            for path in input_paths:
-                merger.append(path)
-            merger.write(output_path)
+            for done, path in enumerate(input_paths, 1):
+                with document_cache.open(path) as reader, metrics.span("copy"):
+                    merger.append(reader)
+                report(progress, done, len(input_paths))
+            metrics.count(pages=len(merger.pages))
+            
+            stats = ""
+            if dedup:
+                from src.modules.compress_ops import deduplicate_objects
+                start = time.perf_counter()
+                with metrics.span("dedup"):
+                    before, after = deduplicate_objects(merger)
+                elapsed = time.perf_counter() - start
+                ratio = before / after if after else 1.0
+                stats = f" (deduplicated {before} -> {after} objects, {ratio:.2f}x, in {elapsed:.2f}s)"
+            
+            with AtomicOutput(output_path) as f, metrics.span("write"):
+                merger.write(f)
             merger.close()
-            return True, f"Merged {len(input_paths)} files to {output_path}"
+            return True, f"Merged {len(input_paths)} files to {output_path}{stats}"
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, str(e)
 
     @staticmethod
-    def split_pdf(input_path, output_dir, page_range=None):
+    @metrics.instrumented
+    def split_pdf(input_path, output_dir, page_range=None, chunk_size=None, by_range=False, workers=None,
+                  progress=None):
+        """
+        chunk_size: Put every N selected pages into one file instead of one file per page.
+        by_range: Write each comma-separated part of page_range ("1-3, 5") as its own file.
+        workers: Number of processes writing outputs. None = all cores for large splits.
+        progress: Optional ProgressToken, updated per output file written.
+        """
         try:
-            reader = PdfReader(input_path)
-            base_name = os.path.splitext(os.path.basename(input_path))[0]
-            total_pages = len(reader.pages)
-            
-            # Determine pages to export
-            pages_to_export = set()
-            if page_range:
-                # Parse range "1-3,5, 8-10"
-                parts = [p.strip() for p in page_range.split(',')]
-                for part in parts:
-                    if '-' in part:
-                        start, end = map(int, part.split('-'))
-                        # Adjust to 0-based, handle inclusive range
-                        for p in range(start - 1, end):
-                            if 0 <= p < total_pages:
-                                pages_to_export.add(p)
-                    else:
-                        p = int(part) - 1
-                        if 0 <= p < total_pages:
-                            pages_to_export.add(p)
-            else:
-                # All pages
-                pages_to_export = set(range(total_pages))
-            
-            if not pages_to_export:
-                 return False, "No valid pages to split."
+            with document_cache.open(input_path) as reader:
+                base_name = os.path.splitext(os.path.basename(input_path))[0]
+                total_pages = len(reader.pages)
+                
+                # Determine pages to export, grouped by output file
+                if page_range:
+                    ranges = _parse_page_range(page_range, total_pages)
+                else:
+                    # All pages
+                    ranges = [list(range(total_pages))] if total_pages else []
+                
+                if by_range and page_range:
+                    groups = ranges
+                else:
+                    pages_to_export = sorted(set(p for r in ranges for p in r))
+                    step = max(1, chunk_size or 1)
+                    groups = [pages_to_export[k:k + step] for k in range(0, len(pages_to_export), step)]
+                
+                if not groups:
+                     return False, "No valid pages to split."
 
-            count = 0
-            for i in sorted(list(pages_to_export)):
-                writer = PdfWriter()
-                writer.add_page(reader.pages[i])
-                output_filename = f"{base_name}_page_{i+1}.pdf"
-                output_path = os.path.join(output_dir, output_filename)
+                jobs = []
+                used = set()
+                for group in groups:
+                    if len(group) == 1:
+                        stem = f"{base_name}_page_{group[0]+1}"
+                    else:
+                        stem = f"{base_name}_pages_{_page_label(group)}"
+                    # A range given twice ("1-3, 1-3") gets its own numbered file
+                    output_filename = f"{stem}.pdf"
+                    copy = 1
+                    while output_filename.lower() in used:
+                        copy += 1
+                        output_filename = f"{stem}_{copy}.pdf"
+                    used.add(output_filename.lower())
+                    jobs.append((os.path.join(output_dir, output_filename), group))
                 
-                with open(output_path, "wb") as out_file:
-                    writer.write(out_file)
-                count += 1
-            
-            return True, f"Split into {count} files in {output_dir}"
+                page_count = sum(len(g) for g in groups)
+                if workers is None:
+                    workers = worker_budget() if page_count >= PARALLEL_MIN_PAGES else 1
+                workers = max(1, min(workers, worker_budget(), len(jobs)))
+                
+                if workers > 1:
+                    # Each process parses the source once and writes its own slice of outputs
+                    shard_size = -(-len(jobs) // (workers * 4))
+                    shards = [jobs[k:k + shard_size] for k in range(0, len(jobs), shard_size)]
+                    count = 0
+                    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker_reader,
+                                             initargs=(input_path,)) as pool:
+                        try:
+                            for written in pool.map(_write_split_shard, shards):
+                                count += written
+                                report(progress, count, len(jobs))
+                        except OperationCancelled:
+                            pool.shutdown(wait=False, cancel_futures=True)
+                            raise
+                else:
+                    count = _write_split_jobs(reader, jobs, progress)
+                metrics.count(pages=page_count)
+                
+                return True, f"Split into {count} files in {output_dir}"
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, f"Error: {str(e)}"
 
     @staticmethod
-    def compress_pdf(input_path, output_path, level="medium"):
+    @metrics.instrumented
+    def compress_pdf(input_path, output_path, level="medium", workers=None, progress=None):
+        """
+        level: "low" = lossless (content streams, duplicate/unused objects, object streams),
+               "medium"/"high" additionally downsample and JPEG-recompress raster images.
+        workers: Processes used for image re-encoding. None = all cores.
+        progress: Optional ProgressToken, updated per page and then per image.
+        """
         try:
-            # Reverting to pypdf because pymupdf causes PyInstaller issues in this env.
-            # pypdf compresses by default on write.
-            # We can also attempt to reduce file size by removing duplication.
-            
-            reader = PdfReader(input_path)
-            writer = PdfWriter()
-            
-            for page in reader.pages:
-                writer.add_page(page)
-            
-            # Additional optimization flags if available in newer pypdf
-            for page in writer.pages:
-                page.compress_content_streams() # Ensure streams are compressed
+            # Pure pypdf/Pillow pipeline: Ghostscript or pymupdf would need an external
+            # install or break the PyInstaller build.
+            from src.modules.compress_ops import CompressionEngine
             
-            # Level handling: pypdf is limited. We just do standard compression.
-            # (In a real scenario, we might use Ghostscript but that requires external install)
+            engine = CompressionEngine(level, workers, progress)
+            before, after = engine.run(input_path, output_path)
             
-            with open(output_path, "wb") as f:
-                writer.write(f)
-                
-            return True, f"Compressed (Standard) and saved to {output_path}"
+            saved = 100 * (before - after) / before if before else 0
+            stages = ", ".join(f"{name} {secs:.2f}s" for name, secs in engine.timings.items())
+            return True, (f"Compressed ({level.capitalize()}): {_format_size(before)} -> {_format_size(after)} "
+                          f"({saved:.1f}% smaller, {engine.images_recompressed} images recompressed, "
+                          f"{engine.images_shared} duplicates shared) "
+                          f"and saved to {output_path}\nStages: {stages}")
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, f"Compression error: {str(e)}"
 
     @staticmethod
-    def extract_text(input_path, output_path):
+    @metrics.instrumented
+    def extract_text(input_path, output_path, workers=None, stream=False, flush_every=50, progress=None):
+        """
+        workers: Number of processes to shard pages across.
+                 None = all cores for large documents, 1 = in-process.
+        stream: Write each page to disk as soon as it is extracted instead of
+                joining everything at the end (same bytes, bounded memory).
+        flush_every: In stream mode, flush the file after this many pages.
+        progress: Optional ProgressToken, updated per page.
+        """
         try:
-            reader = PdfReader(input_path)
-            text_content = []
-            
-            for i, page in enumerate(reader.pages):
-                text = page.extract_text()
-                if text:
-                    text_content.append(f"--- Page {i+1} ---\n{text}\n")
-            
-            total_chars = sum(len(t) for t in text_content)
-            
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write("\n".join(text_content))
-            
-            if total_chars < 10:
-                return True, f"Warning: Only {total_chars} chars extracted. Document might be an image. Saved to {output_path}"
+            with document_cache.open(input_path) as reader:
+                total_pages = len(reader.pages)
                 
-            return True, f"Extracted text from {len(text_content)} pages to {output_path}"
+                if workers is None:
+                    workers = worker_budget() if total_pages >= PARALLEL_MIN_PAGES else 1
+                workers = max(1, min(workers, worker_budget(), total_pages))
+                
+                def tracked_pages():
+                    for done, (i, text) in enumerate(_iter_page_text(reader, input_path, workers), 1):
+                        report(progress, done, total_pages)
+                        yield i, text
+                
+                blocks = (f"--- Page {i+1} ---\n{text}\n" for i, text in tracked_pages() if text)
+                metrics.count(pages=total_pages)
+                
+                page_count = 0
+                total_chars = 0
+                if stream:
+                    # Nothing appears at output_path until the last page is written
+                    with AtomicOutput(output_path, text=True) as f:
+                        for block in blocks:
+                            # Same layout as "\n".join(): separator before every block but the first
+                            if page_count:
+                                f.write("\n")
+                            f.write(block)
+                            page_count += 1
+                            total_chars += len(block)
+                            if flush_every and page_count % flush_every == 0:
+                                f.flush()
+                else:
+                    text_content = list(blocks)
+                    page_count = len(text_content)
+                    total_chars = sum(len(t) for t in text_content)
+                    
+                    with AtomicOutput(output_path, text=True) as f:
+                        f.write("\n".join(text_content))
+                
+                if total_chars < 10:
+                    return True, f"Warning: Only {total_chars} chars extracted. Document might be an image. Saved to {output_path}"
+                    
+                return True, f"Extracted text from {page_count} pages to {output_path}"
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, f"Extraction error: {str(e)}"
 
     @staticmethod
-    def encrypt_pdf(input_path, output_path, password):
+    @metrics.instrumented
+    def encrypt_pdf(input_path, output_path, password, progress=None, algorithm=None,
+                    current_password=None, lock_key=None, workers=None):
+        """
+        algorithm: "AES-256", "AES-128" or "RC4-128". None = AES-256 if the
+                   cryptography package is installed, RC4-128 otherwise.
+        current_password: Opens an input that is already encrypted; it is re-encrypted
+                          with the new password without decoding any content.
+        lock_key: LockKey(password, algorithm) shared by a batch, so the password
+                  is only hashed once for all files (password/algorithm are then ignored).
+        workers: Processes that encrypt chunks of objects. None = all cores for large files.
+        progress: Optional ProgressToken, updated per chunk of objects.
+        """
         try:
-            reader = PdfReader(input_path)
-            writer = PdfWriter()
-            
-            for page in reader.pages:
-                writer.add_page(page)
-            
-            writer.encrypt(password)
-            
-            with open(output_path, "wb") as f:
-                writer.write(f)
-            return True, f"Encrypted and saved to {output_path}"
+            from src.modules.protect_ops import LockKey, protect
+            lock = lock_key or LockKey(password, algorithm)
+            protect(input_path, output_path, current_password, lock, workers, progress)
+            return True, f"Encrypted ({lock.algorithm}) and saved to {output_path}"
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, f"Encryption failed: {str(e)}"
 
     @staticmethod
-    def decrypt_pdf(input_path, output_path, password):
+    @metrics.instrumented
+    def decrypt_pdf(input_path, output_path, password, progress=None, workers=None):
+        """
+        Files in a batch that were locked together are unlocked with a single
+        password check per process (see open_reader).
+        workers: Processes that copy chunks of objects. None = all cores for large files.
+        progress: Optional ProgressToken, updated per chunk of objects.
+        """
         try:
-            reader = PdfReader(input_path)
-            
-            if reader.is_encrypted:
-                reader.decrypt(password)
-            
-            writer = PdfWriter()
-            for page in reader.pages:
-                writer.add_page(page)
-                
-            with open(output_path, "wb") as f:
-                writer.write(f)
+            from src.modules.protect_ops import protect
+            protect(input_path, output_path, password, None, workers, progress)
             return True, f"Decrypted and saved to {output_path}"
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, f"Decryption failed: {str(e)}"
     
     @staticmethod
-    def organize_pages(input_path, output_path, page_config):
+    @metrics.instrumented
+    def organize_pages(input_path, output_path, page_config, progress=None, password=None):
         """
         page_config: List of dicts [{'index': int, 'rotate': int}]
+        progress: Optional ProgressToken, updated per output page.
+        password: Needed for encrypted inputs; the output is written unencrypted.
         """
         try:
-            reader = PdfReader(input_path)
-            writer = PdfWriter()
-            
-            # Reorder and Rotate
-            for item in page_config:
-                idx = item.get('index')
-                rotation = item.get('rotate', 0)
-                
-                if 0 <= idx < len(reader.pages):
-                    page = reader.pages[idx]
-                    if rotation != 0:
-                        page.rotate(rotation)
-                    writer.add_page(page)
-            
-            with open(output_path, "wb") as f:
-                writer.write(f)
+            from src.modules.organize_ops import organize
+            with document_cache.open(input_path, password) as reader:
+                # Each page is copied once, rotation goes on the output page, unused resources are dropped
+                organize(reader, output_path, page_config, progress)
             return True, f"Organized PDF saved to {output_path}"
+        except OperationCancelled:
+            return False, "Cancelled"
         except Exception as e:
             return False, f"Organize failed: {str(e)}"
@@ -0,0 +1,260 @@
+import io
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pypdf._encryption import EncryptAlgorithm, Encryption
+from pypdf.constants import UserAccessPermissions
+from pypdf.generic import ArrayObject, ByteStringObject, DictionaryObject, IndirectObject, NameObject, NumberObject
+from src.modules.doc_cache import document_cache
+from src.modules.input_ops import same_file
+from src.modules.output_ops import AtomicOutput
+from src.utils import metrics
+from src.modules.pdf_ops import open_reader
+from src.utils.progress import report
+from src.utils.scheduler import worker_budget
+
+# Kept free of Qt: used from pool processes and the headless CLI.
+#
+# Locking/unlocking rewrites the file object by object with the same object
+# numbers: every object is read (decrypted if needed), given the new crypt layer
+# and written straight to the output. Streams keep their filters, so content is
+# never decoded, and nothing but the current chunk of objects is held in memory.
+
+# Strongest first. AES needs pypdf's optional crypto backend (the cryptography package).
+ALGORITHMS = ("AES-256", "AES-128", "RC4-128")
+
+# Lowest PDF version that defines each algorithm
+MIN_VERSION = {"AES-256": "1.7", "AES-128": "1.6", "RC4-128": "1.4"}
+
+# Files smaller than this are rewritten in-process; a pool costs more than it saves.
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+# Objects per pool job
+CHUNK_OBJECTS = 256
+
+# Structural objects that are rebuilt, never copied
+SKIP_TYPES = ("/XRef", "/ObjStm")
+
+def aes_available():
+    from pypdf._crypt_providers import crypt_provider
+    return crypt_provider[0] != "local_crypt_fallback"
+
+def default_algorithm():
+    # AES-256 where the backend is installed; RC4-128 (what older builds wrote) otherwise
+    return "AES-256" if aes_available() else "RC4-128"
+
+class LockKey:
+    """
+    Encryption settings for one password, derived once and reused for every file
+    of a batch. Picklable, so pool processes reuse the derivation as well.
+    AES-256 uses a random file key wrapped by a slow salted password hash, which
+    is computed here; files locked with the same LockKey share that key and
+    encryption dictionary. The older algorithms mix each file's /ID into the key,
+    so their (cheap) derivation is done per file.
+    """
+    def __init__(self, password, algorithm=None, owner_password=None, permissions=None):
+        """
+        algorithm: One of ALGORITHMS. None = default_algorithm().
+        owner_password: Password that lifts the permissions. None = same as password.
+        permissions: UserAccessPermissions flags. None = everything allowed.
+        """
+        algorithm = algorithm or default_algorithm()
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm}; use one of {', '.join(ALGORITHMS)}")
+        if algorithm.startswith("AES") and not aes_available():
+            raise RuntimeError(f"{algorithm} needs the 'cryptography' package (pip install cryptography)")
+        self.algorithm = algorithm
+        self.password = password
+        self.owner_password = owner_password or password
+        self.permissions = UserAccessPermissions.all() if permissions is None else permissions
+        self.key = None
+        self.entry = None
+        if self._algorithm()[0] >= 5:
+            encryption = Encryption.make(self._algorithm(), self.permissions, b"")
+            self.entry = encryption.write_entry(self.password, self.owner_password)
+            self.key = encryption._key
+
+    def _algorithm(self):
+        return getattr(EncryptAlgorithm, self.algorithm.replace("-", "_"))
+
+    def encryption_for(self, file_id):
+        # (Encryption, /Encrypt dictionary) for a file whose first /ID entry is file_id
+        encryption = Encryption.make(self._algorithm(), self.permissions, file_id)
+        if self.key is None:
+            return encryption, encryption.write_entry(self.password, self.owner_password)
+        encryption._key = self.key
+        return encryption, self.entry
+
+def _file_id(reader):
+    ids = reader.trailer.get("/ID")
+    if ids:
+        return [ids[0].get_object().original_bytes, ids[-1].get_object().original_bytes]
+    first = os.urandom(16)
+    return [first, first]
+
+def _object_refs(reader):
+    # Sorted (idnum, generation) of every object in the file, except the old /Encrypt
+    refs = {}
+    for generation, table in reader.xref.items():
+        for idnum in table:
+            if not reader.xref_free_entry.get(generation, {}).get(idnum, False):
+                refs[idnum] = max(generation, refs.get(idnum, generation))
+    for idnum in reader.xref_objStm:
+        refs.setdefault(idnum, 0)
+    old_entry = reader.trailer.raw_get("/Encrypt") if "/Encrypt" in reader.trailer else None
+    if isinstance(old_entry, IndirectObject):
+        refs.pop(old_entry.idnum, None)
+    refs.pop(0, None)
+    return sorted(refs.items())
+
+def _header(reader, lock):
+    version = reader.pdf_header[5:8] or "1.4"
+    if lock is not None:
+        version = max(version, MIN_VERSION[lock.algorithm])
+    return f"%PDF-{version}\n".encode() + b"%\xE2\xE3\xCF\xD3\n"
+
+def _serialize(obj, idnum, generation, encryption):
+    if encryption is not None:
+        obj = encryption.encrypt_object(obj, idnum, generation)
+    buf = io.BytesIO()
+    buf.write(f"{idnum} {generation} obj\n".encode())
+    obj.write_to_stream(buf)
+    buf.write(b"\nendobj\n")
+    return buf.getvalue()
+
+class ObjectCopier:
+    # Serializes objects of an opened reader with the output's crypt layer (None = plain)
+    def __init__(self, reader, encryption=None):
+        self.reader = reader
+        self.encryption = encryption
+
+    def serialize(self, refs):
+        # [(idnum, generation), ...] -> [(idnum, generation, bytes or None)]; None = not carried over
+        records = []
+        with metrics.span("copy"):
+            for idnum, generation in refs:
+                obj = self.reader.get_object(IndirectObject(idnum, generation, self.reader))
+                if obj is None or (isinstance(obj, DictionaryObject) and obj.get("/Type") in SKIP_TYPES):
+                    records.append((idnum, generation, None))
+                    continue
+                records.append((idnum, generation, _serialize(obj, idnum, generation, self.encryption)))
+        # Every object is visited once, so nothing is worth keeping parsed
+        self.reader.resolved_objects.clear()
+        return records
+
+_worker_copier = None
+
+def _init_copier(input_path, key, encryption):
+    global _worker_copier
+    _worker_copier = ObjectCopier(open_reader(input_path, key=key), encryption)
+
+def _serialize_chunk(refs):
+    # Runs inside a pool process
+    return _worker_copier.serialize(refs)
+
+def _serialized_chunks(copier, input_path, key, chunks, workers):
+    # Yields the records of every chunk, in order, keeping a small window in flight
+    if workers <= 1:
+        for chunk in chunks:
+            yield copier.serialize(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_copier,
+                             initargs=(input_path, key, copier.encryption)) as pool:
+        pending = deque()
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(_serialize_chunk, chunk))
+                if len(pending) >= workers * 2:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        except GeneratorExit:
+            # Consumer stopped early (e.g. cancelled): drop chunks that haven't started
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+def _write_xref(f, offsets, size):
+    # Classic cross-reference table; unused numbers are chained as free entries
+    free = [idnum for idnum in range(1, size) if idnum not in offsets]
+    next_free = dict(zip(free, free[1:] + [0]))
+    position = f.tell()
+    f.write(f"xref\n0 {size}\n".encode())
+    f.write(f"{free[0] if free else 0:010} 65535 f \n".encode())
+    for idnum in range(1, size):
+        if idnum in offsets:
+            offset, generation = offsets[idnum]
+            f.write(f"{offset:010} {generation:05} n \n".encode())
+        else:
+            f.write(f"{next_free[idnum]:010} 00000 f \n".encode())
+    return position
+
+def protect(input_path, output_path, password=None, lock=None, workers=None, progress=None):
+    """
+    Rewrite input_path with a new crypt layer: lock, unlock or re-encrypt.
+    password: Opens an encrypted input.
+    lock: LockKey for the output. None writes it unencrypted.
+    workers: Processes that encrypt chunks of objects. None = all cores for large files.
+    progress: Optional ProgressToken, updated per chunk of objects.
+    Returns the number of objects written.
+    """
+    if same_file(input_path, output_path):
+        # In place: Windows can't rename over a file that is still mapped, so read from a private copy
+        reader = open_reader(input_path, password, allow_map=False)
+        key = reader._encryption._key if reader.is_encrypted else None
+        return _rewrite(reader, key, input_path, output_path, lock, workers, progress)
+    with document_cache.open(input_path, password) as reader:
+        key = reader._encryption._key if reader.is_encrypted else None
+        return _rewrite(reader, key, input_path, output_path, lock, workers, progress)
+
+def _rewrite(reader, key, input_path, output_path, lock, workers, progress):
+    file_id = _file_id(reader)
+    encryption, entry = lock.encryption_for(file_id[0]) if lock is not None else (None, None)
+
+    refs = _object_refs(reader)
+    chunks = [refs[i:i + CHUNK_OBJECTS] for i in range(0, len(refs), CHUNK_OBJECTS)]
+    if workers is None:
+        workers = worker_budget() if os.path.getsize(input_path) >= PARALLEL_MIN_BYTES else 1
+    workers = max(1, min(workers, worker_budget(), len(chunks)))
+
+    trailer = reader.trailer
+    size = (refs[-1][0] if refs else 0) + 1
+    offsets = {}
+    with AtomicOutput(output_path, write_behind=workers > 1) as f:
+        f.write(_header(reader, lock))
+        done = 0
+        copier = ObjectCopier(reader, encryption)
+        for records in _serialized_chunks(copier, input_path, key, chunks, workers):
+            with metrics.span("write"):
+                for idnum, generation, data in records:
+                    if data is not None:
+                        offsets[idnum] = (f.tell(), generation)
+                        f.write(data)
+            done += len(records)
+            report(progress, done, len(refs))
+
+        new_trailer = DictionaryObject({NameObject("/Root"): trailer.raw_get("/Root")})
+        info = trailer.raw_get("/Info") if "/Info" in trailer else None
+        if isinstance(info, IndirectObject):
+            new_trailer[NameObject("/Info")] = info
+        elif isinstance(info, DictionaryObject):
+            # Direct /Info: give it an object of its own
+            offsets[size] = (f.tell(), 0)
+            f.write(_serialize(info, size, 0, encryption))
+            new_trailer[NameObject("/Info")] = IndirectObject(size, 0, reader)
+            size += 1
+        if entry is not None:
+            # The encryption dictionary itself is never encrypted
+            offsets[size] = (f.tell(), 0)
+            f.write(_serialize(entry, size, 0, None))
+            new_trailer[NameObject("/Encrypt")] = IndirectObject(size, 0, reader)
+            size += 1
+        new_trailer[NameObject("/ID")] = ArrayObject(ByteStringObject(i) for i in file_id)
+        new_trailer[NameObject("/Size")] = NumberObject(size)
+
+        xref = _write_xref(f, offsets, size)
+        f.write(b"trailer\n")
+        new_trailer.write_to_stream(f)
+        f.write(f"\nstartxref\n{xref}\n%%EOF\n".encode())
+    metrics.count(objects=len(offsets))
+    return len(offsets)
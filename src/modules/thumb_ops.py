@@ -0,0 +1,256 @@
+import io
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from PIL import Image, ImageDraw
+from src.modules.doc_cache import file_digest
+from src.modules.pdf_ops import open_reader
+from src.utils.scheduler import worker_budget
+
+# Kept free of Qt: thumbnails are rendered in pool processes and cached on disk.
+#
+# There is no PDF rasterizer among our dependencies, so a "render" is drawn from
+# what pypdf can tell us: the page's largest embedded image (what a scanned page
+# is) on a page-shaped white card, else grey bars where its lines of text are,
+# else a card labelled as a placeholder with the page number.
+
+THUMB_SIZE = 160 # Longest side in pixels
+THUMB_QUALITY = 80
+CACHE_MAX_BYTES = 200 * 1024 * 1024
+
+def default_cache_dir():
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "CleanPDF", "thumbnails")
+
+def _largest_image(page):
+    largest = None
+    try:
+        for image_file in page.images:
+            img = image_file.image
+            if largest is None or img.width * img.height > largest.width * largest.height:
+                largest = img
+    except Exception:
+        return None # Unsupported filters: fall back to the text outline
+    return largest
+
+def _draw_text_outline(page, card, scale):
+    # Grey bars where the page's text runs are, like a page zoomed far out.
+    # Returns False if the page has no text to draw.
+    left, bottom = float(page.mediabox.left), float(page.mediabox.bottom)
+    draw = ImageDraw.Draw(card)
+    drawn = False
+
+    def visit(text, cm, tm, font_dict, font_size):
+        nonlocal drawn
+        # Text space -> page space: tm x cm
+        a, b, c, d = (tm[0] * cm[0] + tm[1] * cm[2], tm[0] * cm[1] + tm[1] * cm[3],
+                      tm[2] * cm[0] + tm[3] * cm[2], tm[2] * cm[1] + tm[3] * cm[3])
+        x = tm[4] * cm[0] + tm[5] * cm[2] + cm[4] - left
+        y = tm[4] * cm[1] + tm[5] * cm[3] + cm[5] - bottom
+        size = (font_size or 1) * max(abs(d), abs(b), 1e-3)
+        width = (font_size or 1) * max(abs(a), abs(c), 1e-3) * 0.5 # Average glyph width
+        for line in text.split("\n"):
+            line = line.strip()
+            if line:
+                top = card.height - (y + size * 0.7) * scale
+                draw.rectangle([x * scale, top, (x + width * len(line)) * scale, top + max(1, size * 0.5 * scale)],
+                               fill="#bbbbbb")
+                drawn = True
+            y -= size * 1.2
+
+    try:
+        page.extract_text(visitor_text=visit)
+    except Exception:
+        return False # Broken content stream: placeholder card
+    return drawn
+
+def render_page_thumbnail(page, page_number, size=THUMB_SIZE):
+    # JPEG bytes of the page at rotation 0 (the page's own /Rotate applied)
+    box = page.mediabox
+    width, height = float(box.width), float(box.height)
+    scale = size / max(width, height, 1)
+    card = Image.new("RGB", (max(1, round(width * scale)), max(1, round(height * scale))), "white")
+
+    largest = _largest_image(page)
+    if largest is not None:
+        largest = largest.convert("RGB")
+        largest.thumbnail(card.size, Image.Resampling.LANCZOS)
+        card.paste(largest, ((card.width - largest.width) // 2, (card.height - largest.height) // 2))
+        placeholder = False
+    else:
+        placeholder = not _draw_text_outline(page, card, scale)
+
+    # Drawn unrotated, in page space; turned like a viewer would show it
+    rotate = (page.get("/Rotate", 0) or 0) % 360
+    if rotate:
+        card = card.rotate(-rotate, expand=True)
+    if placeholder:
+        draw = ImageDraw.Draw(card)
+        draw.rectangle([0, 0, card.width - 1, card.height - 1], outline="#999999")
+        draw.text((card.width // 2, card.height // 2 - 8), str(page_number), fill="#666666", anchor="mm")
+        draw.text((card.width // 2, card.height // 2 + 8), "no preview", fill="#999999", anchor="mm")
+
+    buf = io.BytesIO()
+    card.save(buf, "JPEG", quality=THUMB_QUALITY)
+    return buf.getvalue()
+
+_worker_reader = None
+
+def _init_thumb_reader(input_path, password):
+    global _worker_reader
+    _worker_reader = open_reader(input_path, password)
+
+def _render_job(job):
+    # Pool entry point: (page index, size) -> (page index, jpeg bytes)
+    index, size = job
+    return index, render_page_thumbnail(_worker_reader.pages[index], index + 1, size)
+
+class ThumbnailCache:
+    """
+    Size-bounded on-disk LRU cache of page thumbnails, keyed by
+    (file content hash, page index, rotation). Rotated entries are made from the
+    rotation-0 entry, so rotating a page never needs a re-render. Recency is the
+    file modification time, bumped on every hit.
+    """
+    def __init__(self, cache_dir=None, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._sizes = {}
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".jpg"):
+                self._sizes[name] = os.path.getsize(os.path.join(self.cache_dir, name))
+        self.total_bytes = sum(self._sizes.values())
+
+    def _name(self, digest, index, rotation):
+        return f"{digest}_{index}_{rotation % 360}.jpg"
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _touch(self, name):
+        try:
+            os.utime(self._path(name))
+            return True
+        except OSError:
+            # Deleted behind our back (another instance evicted it)
+            self.total_bytes -= self._sizes.pop(name, 0)
+            return False
+
+    def _store(self, name, data):
+        tmp = self._path(name) + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(name))
+        self.total_bytes += len(data) - self._sizes.get(name, 0)
+        self._sizes[name] = len(data)
+        self._evict(keep=name)
+
+    def _evict(self, keep=None):
+        if self.total_bytes <= self.max_bytes:
+            return
+        by_age = []
+        for name in self._sizes:
+            try:
+                by_age.append((os.path.getmtime(self._path(name)), name))
+            except OSError:
+                by_age.append((0, name))
+        for _, name in sorted(by_age):
+            if self.total_bytes <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+            self.total_bytes -= self._sizes.pop(name)
+
+    def put(self, digest, index, data):
+        # data: JPEG bytes of the page at rotation 0
+        with self._lock:
+            self._store(self._name(digest, index, 0), data)
+
+    def get(self, digest, index, rotation=0):
+        # Path of the cached thumbnail, or None if the page was never rendered
+        with self._lock:
+            name = self._name(digest, index, rotation)
+            if name in self._sizes and self._touch(name):
+                return self._path(name)
+            base = self._name(digest, index, 0)
+            if rotation % 360 == 0 or base not in self._sizes or not self._touch(base):
+                return None
+            with Image.open(self._path(base)) as img:
+                rotated = img.rotate(-(rotation % 360), expand=True) # PDF rotation is clockwise
+            buf = io.BytesIO()
+            rotated.save(buf, "JPEG", quality=THUMB_QUALITY)
+            self._store(name, buf.getvalue())
+            return self._path(name)
+
+class ThumbnailRenderer:
+    """
+    Renders thumbnails of one PDF on a process pool, on demand. request() is called
+    with the pages currently in view; pages that scrolled away before a worker got
+    to them are dropped. on_ready(index) is called from a pool thread once a page's
+    rotation-0 thumbnail is in the cache.
+    """
+    def __init__(self, input_path, cache, on_ready, workers=None, size=THUMB_SIZE, digest=None, password=None):
+        """
+        digest: file_digest(input_path) if the caller already has it (hashing reads the whole file).
+        password: For encrypted inputs.
+        """
+        self.input_path = input_path
+        self.password = password
+        self.digest = digest or file_digest(input_path)
+        self.cache = cache
+        self.on_ready = on_ready
+        self.size = size
+        # Half the budget by default: the scheduler's pool needs the other cores
+        self.workers = max(1, min(workers or worker_budget() // 2, worker_budget()))
+        self._pool = None
+        self._pending = {} # page index -> future
+        # _pending is shared with pool callback threads. Reentrant: cancel() and
+        # add_done_callback() on a finished future run the callback right here.
+        self._lock = threading.RLock()
+
+    def cached(self, index, rotation=0):
+        return self.cache.get(self.digest, index, rotation)
+
+    def request(self, indices):
+        indices = set(indices)
+        ready = []
+        with self._lock:
+            for index, future in list(self._pending.items()):
+                if index not in indices and future.cancel():
+                    del self._pending[index]
+            for index in sorted(indices):
+                if index in self._pending:
+                    continue
+                if self.cached(index) is not None:
+                    ready.append(index)
+                    continue
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_thumb_reader,
+                                                     initargs=(self.input_path, self.password))
+                future = self._pool.submit(_render_job, (index, self.size))
+                self._pending[index] = future
+                future.add_done_callback(lambda f, index=index: self._on_done(index, f))
+        for index in ready:
+            self.on_ready(index)
+
+    def _on_done(self, index, future):
+        with self._lock:
+            if self._pending.get(index) is future:
+                del self._pending[index]
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, data = future.result()
+        self.cache.put(self.digest, index, data)
+        self.on_ready(index)
+
+    def close(self, wait=False):
+        # wait: Until the workers have exited (and released their map of the file)
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
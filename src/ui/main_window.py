@@ -1,12 +1,28 @@
 from PyQt6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout, 
-                             QListWidget, QListWidgetItem, QStackedWidget, QStatusBar, QMessageBox, QPushButton)
-from PyQt6.QtCore import Qt, QSize
+                             QListWidget, QListWidgetItem, QStackedWidget, QStatusBar, QMessageBox, QPushButton,
+                             QDockWidget)
+from PyQt6.QtCore import Qt, QSize, QTimer
 from PyQt6.QtGui import QIcon
 from src.ui.styles import Theme
-from src.ui.pages import HomePage, MergePage, SplitPage, CompressPage, ConvertPage, ExtractPage
-from src.utils.workers import WorkerThread
+from src.utils.workers import JobSignals, LogSignals
+from src.utils.scheduler import JobScheduler, warm_up_imports
 from src.utils.logger import logger
 import os
+import queue
+import threading
+
+# Sidebar entries and the src.ui.pages class behind each one. Pages are built the
+# first time their row is selected, so startup only pays for the Home page.
+PAGE_REGISTRY = [
+    ("Home", "HomePage"),
+    ("Merge PDF", "MergePage"),
+    ("Split PDF", "SplitPage"),
+    ("Compress PDF", "CompressPage"),
+    ("Images to PDF", "ConvertPage"),
+    ("Protection", "ProtectionPage"),
+    ("Visual Editor", "VisualPage"),
+    ("Extract Text", "ExtractPage"),
+]
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -61,13 +77,36 @@ class MainWindow(QMainWindow):
         self.status_bar.showMessage("Ready.")
         
         # Worker Bridge
-        # We pass a callback to pages so they can start workers in MainWindow context
+        # We pass a callback to pages so they can start workers in MainWindow context.
+        # Jobs run on the scheduler's pools, so several operations can run at once.
+        self.scheduler = JobScheduler(initializer=warm_up_imports)
+        self.job_outputs = {} # job id -> created_file for the "Open Folder" button
+        self.job_signals = JobSignals()
+        self.job_signals.job_finished.connect(self.on_worker_finished)
+        self.job_signals.job_progress.connect(self.on_job_progress)
+        self.scheduler.add_listener(lambda job: self.job_signals.job_finished.emit(job.id, *job.result))
+        self.scheduler.add_progress_listener(
+            lambda job, done, total: self.job_signals.job_progress.emit(job.id, done, total))
+        
+        self.btn_cancel = QPushButton("Cancel All")
+        self.btn_cancel.setVisible(False)
+        self.btn_cancel.clicked.connect(self.cancel_jobs)
+        self.status_bar.addPermanentWidget(self.btn_cancel)
+        
+        # Optional panel of per-operation metrics (time, pages, bytes, memory, spans)
+        self.metrics_dock = None
+        self.btn_metrics = QPushButton("Metrics")
+        self.btn_metrics.setCheckable(True)
+        self.btn_metrics.toggled.connect(self.toggle_metrics)
+        self.status_bar.addPermanentWidget(self.btn_metrics)
         
         # Theme Toggle (Bottom of sidebar via trick or just an item?)
         # For simplicity in listwidget, we'll add it as a regular item for now or a button below sidebar
         # Let's actually put Sidebar in a VBox to spawn a toggle button at bottom
         
-        logger.signaller.log_signal.connect(self.on_log_message)
+        self.log_signals = LogSignals()
+        self.log_signals.message.connect(self.on_log_message)
+        logger.add_listener(self.log_signals.message.emit)
         
         self.apply_theme()
         
@@ -75,51 +114,83 @@ class MainWindow(QMainWindow):
         self.sidebar.setCurrentRow(0)
 
     def init_pages(self):
-        # Define Navigation Items
-        from src.ui.pages import HomePage, MergePage, SplitPage, CompressPage, ConvertPage, ExtractPage, ProtectionPage, VisualPage
-        
-        items = [
-            ("Home", HomePage),
-            ("Merge PDF", MergePage),
-            ("Split PDF", SplitPage),
-            ("Compress PDF", CompressPage),
-            ("Images to PDF", ConvertPage),
-            ("Protection", ProtectionPage),
-            ("Visual Editor", VisualPage),
-            ("Extract Text", ExtractPage)
-        ]
-        
-        for name, PageClass in items:
+        # Sidebar rows and empty placeholders; the real pages are built by ensure_page
+        for name, _ in PAGE_REGISTRY:
             item = QListWidgetItem(name)
             item.setSizeHint(QSize(200, 50))
             self.sidebar.addItem(item)
             
-            if PageClass == HomePage:
+            self.content_stack.addWidget(QWidget())
+            self.pages.append(None)
+
+    def ensure_page(self, index):
+        if self.pages[index] is None:
+            import src.ui.pages as pages
+            PageClass = getattr(pages, PAGE_REGISTRY[index][1])
+            if PageClass is pages.HomePage:
                 page = PageClass(self.change_page)
             else:
                 page = PageClass(self.start_worker) # Inject worker starter
             
-            self.content_stack.addWidget(page)
-            self.pages.append(page)
+            placeholder = self.content_stack.widget(index)
+            self.content_stack.insertWidget(index, page)
+            self.content_stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+            self.pages[index] = page
+        return self.pages[index]
 
     def change_page(self, index):
+        if index < 0: return
+        self.ensure_page(index)
         self.content_stack.setCurrentIndex(index)
         self.sidebar.setCurrentRow(index) # Sync sidebar
 
     def start_worker(self, func, *args, **kwargs):
-        self.status_bar.showMessage("Processing...")
-        self.centralWidget().setEnabled(False) # Lock UI
-        
         # Extract output path for UI usage, remove from kwargs so it doesn't break PDFOps
-        self.last_output = kwargs.pop('created_file', None)
+        created_file = kwargs.pop('created_file', None)
+        from src.modules.input_ops import same_file
+        editor_file = self.editor_file()
+        if (editor_file and args and isinstance(args[0], str) and "in_process" not in kwargs
+                and same_file(args[0], editor_file)):
+            # The Visual Editor has this file parsed in our document_cache: a thread job
+            # leases that reader, a pool process would parse the whole file again
+            kwargs["in_process"] = False
         
-        self.worker = WorkerThread(func, *args, **kwargs)
-        self.worker.finished.connect(self.on_worker_finished)
-        self.worker.start()
+        try:
+            job_id = self.scheduler.submit(func, *args, **kwargs)
+        except queue.Full as e:
+            QMessageBox.warning(self, "Busy", str(e))
+            return
+        self.job_outputs[job_id] = created_file
+        self.update_job_status()
+
+    def editor_file(self):
+        # Path open in the Visual Editor, if that page was built and has one loaded
+        index = next(i for i, (_, name) in enumerate(PAGE_REGISTRY) if name == "VisualPage")
+        return getattr(self.pages[index], "input_file", None)
+
+    def update_job_status(self):
+        active = self.scheduler.active_count()
+        self.btn_cancel.setVisible(active > 0)
+        if active:
+            self.status_bar.showMessage(f"Processing... ({active} job{'s' if active != 1 else ''} running)")
+        return active
 
-    def on_worker_finished(self, success, msg):
-        self.centralWidget().setEnabled(True)
-        self.status_bar.clearMessage()
+    def on_job_progress(self, job_id, done, total):
+        active = self.scheduler.active_count()
+        others = f" (+{active - 1} more)" if active > 1 else ""
+        self.status_bar.showMessage(f"Processing... {done}/{total}{others}")
+
+    def cancel_jobs(self):
+        # Queued jobs are dropped, running ones stop at their next page
+        cancelled = self.scheduler.cancel_all()
+        logger.log(f"Cancelled {cancelled} job(s).")
+
+    def on_worker_finished(self, job_id, success, msg):
+        output = self.job_outputs.pop(job_id, None)
+        self.scheduler.forget_finished()
+        if not self.update_job_status():
+            self.status_bar.clearMessage()
         
         if success:
             # Create a custom success dialog
@@ -131,9 +202,9 @@ class MainWindow(QMainWindow):
             btn_ok = dlg.addButton("OK", QMessageBox.ButtonRole.AcceptRole)
             btn_open = None
             
-            if self.last_output:
+            if output:
                 # Determine what to open
-                target = self.last_output
+                target = output
                 target_label = "Open File"
                 if os.path.isdir(target):
                     target_label = "Open Folder"
@@ -145,16 +216,24 @@ class MainWindow(QMainWindow):
             dlg.exec()
             
             if dlg.clickedButton() == btn_open:
+                # Dialogs of other jobs may have opened meanwhile; open this job's output
+                self.last_output = output
                 self.open_last_output()
                 
-            self.status_bar.showMessage("Ready.", 5000)
+            if not self.scheduler.active_count():
+                self.status_bar.showMessage("Ready.", 5000)
+        elif msg == "Cancelled":
+            self.status_bar.showMessage("Job cancelled.", 5000)
         else:
             QMessageBox.critical(self, "Error", msg)
             self.status_bar.showMessage("Error occurred.", 5000)
 
     def open_last_output(self):
-        if hasattr(self, 'last_output') and os.path.exists(os.path.dirname(self.last_output)):
-            folder = os.path.dirname(self.last_output)
+        if not hasattr(self, 'last_output'):
+            return
+        # Batch jobs report their output folder itself
+        folder = self.last_output if os.path.isdir(self.last_output) else os.path.dirname(self.last_output)
+        if os.path.exists(folder):
             if os.name == 'nt':
                 os.startfile(folder)
             else:
@@ -162,13 +241,41 @@ class MainWindow(QMainWindow):
                 subprocess.Popen(['xdg-open', folder])
 
 
-    def on_log_message(self, msg):
-        # Also catch logger output to status bar for debug
-        # But prioritize success/fail messages
-        if "Error" in msg or "Success" in msg:
-            return 
+    def on_log_message(self, msg, level):
+        # Failures are reported by the page or the job dialog itself
+        if level == "error":
+            return
         self.status_bar.showMessage(msg, 3000)
 
+    def toggle_metrics(self, checked):
+        if self.metrics_dock is None:
+            from src.ui.widgets import MetricsPanel
+            self.metrics_dock = QDockWidget("Metrics", self)
+            self.metrics_dock.setWidget(MetricsPanel())
+            self.metrics_dock.visibilityChanged.connect(self.btn_metrics.setChecked)
+            self.addDockWidget(Qt.DockWidgetArea.BottomDockWidgetArea, self.metrics_dock)
+        self.metrics_dock.setVisible(checked)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not getattr(self, '_warmed_up', False):
+            self._warmed_up = True
+            # Zero-delay timer: fires once the event loop has painted the window
+            QTimer.singleShot(0, lambda: threading.Thread(target=self.warm_up, daemon=True).start())
+
+    def warm_up(self):
+        # Background thread: imports for the editor and thumbnails in this process, then
+        # the operation pool (its processes start fresh, with nothing imported)
+        warm_up_imports()
+        try:
+            self.scheduler.start_workers()
+        except Exception as e:
+            logger.log(f"Could not start worker processes early: {e}", level="warning")
+
+    def closeEvent(self, event):
+        self.scheduler.shutdown(wait=False)
+        super().closeEvent(event)
+
     def apply_theme(self):
         theme = self.current_theme
         
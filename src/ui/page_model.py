@@ -0,0 +1,187 @@
+from array import array
+from PyQt6.QtCore import QAbstractListModel, QByteArray, QMimeData, QModelIndex, Qt
+
+ROWS_MIME = "application/x-cleanpdf-page-rows"
+
+def _runs(rows):
+    # Sorted rows -> [(first, last), ...] of contiguous runs
+    runs = []
+    for row in rows:
+        if runs and row == runs[-1][1] + 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return [tuple(run) for run in runs]
+
+class PageListModel(QAbstractListModel):
+    """
+    Pages of the Visual Editor as two compact arrays: the original page index and
+    the rotation of every row. Edits only signal the rows they touch, so rotating,
+    moving or deleting a selection costs O(changed rows) on the view side no matter
+    how long the document is.
+    decoration: Optional callable (page index, rotation) -> QIcon or None (thumbnails).
+    """
+    def __init__(self, decoration=None):
+        super().__init__()
+        self.indices = array('i')
+        self.rotations = array('h')
+        self.decoration = decoration
+        # Per original page, as read from the page tree (see append_pages)
+        self.page_rotations = array('h')
+        self.page_widths = array('f')
+        self.page_heights = array('f')
+
+    def load(self, page_count):
+        self.beginResetModel()
+        self.indices = array('i', range(page_count))
+        self.rotations = array('h', [0]) * page_count
+        self.page_rotations = array('h')
+        self.page_widths = array('f')
+        self.page_heights = array('f')
+        self.endResetModel()
+
+    def append_pages(self, info):
+        # Progressive loading: info = [(rotation, width, height), ...] of the next pages
+        if not info:
+            return
+        first_page = len(self.page_rotations)
+        first_row = len(self.indices)
+        self.beginInsertRows(QModelIndex(), first_row, first_row + len(info) - 1)
+        self.indices.extend(range(first_page, first_page + len(info)))
+        self.rotations.extend([0] * len(info))
+        for rotation, width, height in info:
+            self.page_rotations.append(rotation)
+            self.page_widths.append(width)
+            self.page_heights.append(height)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.indices)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        if role == Qt.ItemDataRole.DisplayRole:
+            rotate = self.rotations[row]
+            rot_text = f" [Rotated {rotate}°]" if rotate != 0 else ""
+            return f"Page {self.indices[row] + 1}{rot_text}"
+        if role == Qt.ItemDataRole.DecorationRole and self.decoration is not None:
+            return self.decoration(self.indices[row], self.rotations[row])
+        if role == Qt.ItemDataRole.ToolTipRole and self.indices[row] < len(self.page_widths):
+            page = self.indices[row]
+            text = f"{self.page_widths[page]:.0f} × {self.page_heights[page]:.0f} pt"
+            if self.page_rotations[page]:
+                text += f", stored rotated {self.page_rotations[page]}°"
+            return text
+        return None
+
+    def flags(self, index):
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsDragEnabled
+        if not index.isValid():
+            flags |= Qt.ItemFlag.ItemIsDropEnabled # Drops go between rows, never onto one
+        return flags
+
+    def page_config(self):
+        # Input for PDFOps.organize_pages
+        return [{'index': i, 'rotate': r} for i, r in zip(self.indices, self.rotations)]
+
+    def refresh_rows(self, rows):
+        for first, last in _runs(sorted(set(rows))):
+            self.dataChanged.emit(self.index(first), self.index(last))
+
+    def rotate_rows(self, rows, angle):
+        for row in rows:
+            self.rotations[row] = (self.rotations[row] + angle) % 360
+        self.refresh_rows(rows)
+
+    def remove_rows(self, rows):
+        for first, last in reversed(_runs(sorted(set(rows)))):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.indices[first:last + 1]
+            del self.rotations[first:last + 1]
+            self.endRemoveRows()
+
+    def moveRows(self, source_parent, source_row, count, destination_parent, destination_child):
+        # Qt API (also used by QListView's internal drag-move); destination is in pre-move rows
+        if source_parent.isValid() or destination_parent.isValid() or count <= 0:
+            return False
+        last = source_row + count - 1
+        if source_row <= destination_child <= last + 1:
+            return False # Onto itself
+        if not self.beginMoveRows(QModelIndex(), source_row, last, QModelIndex(), destination_child):
+            return False
+        target = destination_child - count if destination_child > last else destination_child
+        for values in (self.indices, self.rotations):
+            block = values[source_row:last + 1]
+            del values[source_row:last + 1]
+            values[target:target] = block
+        self.endMoveRows()
+        return True
+
+    def shift_rows(self, rows, step):
+        """
+        Move the selected rows one place up (step=-1) or down (step=1). Runs already
+        at the edge, or stuck behind such a run, stay put. Returns the new rows.
+        """
+        runs = _runs(sorted(set(rows)))
+        if step > 0:
+            runs.reverse()
+        limit = -1 if step < 0 else self.rowCount() # First row a run may not cross into
+        moved = []
+        for first, last in runs:
+            count = last - first + 1
+            if step < 0:
+                if first - 1 <= limit:
+                    limit = last
+                    moved.extend(range(first, last + 1))
+                    continue
+                self.moveRows(QModelIndex(), first, count, QModelIndex(), first - 1)
+                limit = last - 1
+                moved.extend(range(first - 1, last))
+            else:
+                if last + 1 >= limit:
+                    limit = first
+                    moved.extend(range(first, last + 1))
+                    continue
+                self.moveRows(QModelIndex(), first, count, QModelIndex(), last + 2)
+                limit = first + 1
+                moved.extend(range(first + 1, last + 2))
+        return sorted(moved)
+
+    def move_rows_to(self, rows, destination):
+        # Drag-reorder: put the selected rows, in order, before `destination` (pre-move row)
+        rows = sorted(set(rows))
+        target = destination - sum(1 for r in rows if r < destination)
+        indices = array('i', (self.indices[r] for r in rows))
+        rotations = array('h', (self.rotations[r] for r in rows))
+        self.remove_rows(rows)
+        self.beginInsertRows(QModelIndex(), target, target + len(rows) - 1)
+        self.indices[target:target] = indices
+        self.rotations[target:target] = rotations
+        self.endInsertRows()
+        return list(range(target, target + len(rows)))
+
+    # Drag and drop between rows of the same view
+    def supportedDropActions(self):
+        return Qt.DropAction.MoveAction
+
+    def mimeTypes(self):
+        return [ROWS_MIME]
+
+    def mimeData(self, indexes):
+        data = QMimeData()
+        rows = sorted(set(index.row() for index in indexes))
+        data.setData(ROWS_MIME, QByteArray(",".join(map(str, rows)).encode()))
+        return data
+
+    def dropMimeData(self, data, action, row, column, parent):
+        if action != Qt.DropAction.MoveAction or not data.hasFormat(ROWS_MIME):
+            return False
+        rows = [int(r) for r in bytes(data.data(ROWS_MIME)).decode().split(",") if r]
+        if not rows:
+            return False
+        self.move_rows_to(rows, row if row >= 0 else self.rowCount())
+        # The move is complete; returning False keeps the view from also removing
+        # the source rows as it would after an accepted move drop
+        return False
@@ -1,5 +1,5 @@
 from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-                             QPushButton, QFileDialog, QInputDialog, QFrame, QListWidget)
+                             QPushButton, QFileDialog, QInputDialog, QFrame)
 from PyQt6.QtCore import Qt
 from src.ui.widgets import FileListWidget
 from src.utils.logger import logger
@@ -92,6 +92,36 @@ class BasePage(QWidget):
             for f in files:
                 self.file_list.add_file_item(f)
 
+    def browse_pdfs(self):
+        # Adds to the list, so several PDFs can be processed in one batch
+        files, _ = QFileDialog.getOpenFileNames(self, "Select PDFs", "", "PDF (*.pdf)")
+        for f in files:
+            self.file_list.add_file_item(f)
+
+    def add_name_template(self, default):
+        # Output names used when several files are processed at once
+        from PyQt6.QtWidgets import QLineEdit
+        self.content_layout.addWidget(QLabel("Output Names (multiple files):"))
+        self.inp_template = QLineEdit()
+        self.inp_template.setPlaceholderText(default)
+        self.inp_template.setToolTip("{name} = input file name, {index} = position in the list")
+        self.content_layout.addWidget(self.inp_template)
+
+    def start_batch(self, func, files, extension, *args, **kwargs):
+        # Many files: one output folder, names from the template, one summary at the end
+        template = self.inp_template.text().strip() or self.inp_template.placeholderText()
+        try:
+            template.format(name="file", index=1)
+        except (KeyError, IndexError, ValueError):
+            logger.log("Invalid output name template. Use {name} and {index}.")
+            return
+        out_dir = QFileDialog.getExistingDirectory(self, "Output Folder")
+        if not out_dir: return
+        from src.modules.batch_ops import process_batch
+        # Runs on a thread: process_batch spreads the files over the scheduler's process pool
+        self.worker_callback(process_batch, func, files, out_dir, template, extension, args, kwargs,
+                             in_process=False, created_file=out_dir)
+
 class HomePage(BasePage):
     def __init__(self, switcher_callback):
         super().__init__("Welcome", "Manage your PDF documents with professional tools.")
@@ -135,6 +165,15 @@ class MergePage(BasePage):
         super().__init__("Merge PDF", "Combine multiple PDF files into a single document.")
         self.worker_callback = worker_callback
         self.add_staging_area()
+        
+        from PyQt6.QtWidgets import QCheckBox
+        self.chk_dedup = QCheckBox("Store shared fonts and images once (smaller output)")
+        self.chk_dedup.setToolTip("For files made from one template, e.g. invoices. Takes longer.")
+        self.content_layout.addWidget(self.chk_dedup)
+        self.chk_batched = QCheckBox("Low-memory mode for very large sets (drops bookmarks and form fields)")
+        self.chk_batched.setToolTip("Merges 200 files at a time straight into the output file. "
+                                    "Only pages are kept: bookmarks and form fields are lost.")
+        self.content_layout.addWidget(self.chk_batched)
         self.add_action_button("Merge Files", self.run)
 
     def run(self):
@@ -145,20 +184,29 @@ class MergePage(BasePage):
         out, _ = QFileDialog.getSaveFileName(self, "Save Merged PDF", "", "PDF (*.pdf)")
         if out:
             from src.modules.pdf_ops import PDFOps
-            self.worker_callback(PDFOps.merge_pdfs, files, out)
+            # Batches keep memory and file handles flat, but only on request: they drop outlines and forms
+            batch_size = None
+            if self.chk_batched.isChecked():
+                batch_size = 200
+                logger.log("Low-memory merge: bookmarks and form fields of the inputs will not be kept.")
+            elif len(files) > 500:
+                logger.log(f"Merging {len(files)} files in memory. If memory runs short, "
+                           "turn on low-memory mode (drops bookmarks and form fields).")
+            self.worker_callback(PDFOps.merge_pdfs, files, out, dedup=self.chk_dedup.isChecked(),
+                                 batch_size=batch_size)
 
 class SplitPage(BasePage):
     def __init__(self, worker_callback):
         super().__init__("Split PDF", "Split a PDF into separate pages or ranges.")
         self.worker_callback = worker_callback
         
-        self.content_layout.addWidget(QLabel("Select PDF to Split:"))
+        self.content_layout.addWidget(QLabel("Select PDFs to Split:"))
         self.file_list = FileListWidget()
         self.file_list.setMinimumHeight(150) 
         self.content_layout.addWidget(self.file_list)
         
         # Browse Button (Styled like staging buttons)
-        btn_browse = QPushButton("Browse PDF")
+        btn_browse = QPushButton("Browse PDFs")
         btn_browse.setCursor(Qt.CursorShape.PointingHandCursor)
         btn_browse.setFixedWidth(150)
         btn_browse.setStyleSheet("""
@@ -175,25 +223,27 @@ class SplitPage(BasePage):
         self.inp_range = QLineEdit()
         self.inp_range.setPlaceholderText("e.g. 1-5, 8, 11-13 (Leave empty for all)")
         self.content_layout.addWidget(self.inp_range)
+        self.add_name_template("{name}") # One subfolder per file
         
         self.content_layout.addSpacing(10)
         self.add_action_button("Split PDF", self.run)
     
     def browse(self):
-        self.file_list.clear() # Single file mode
-        f, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF (*.pdf)")
-        if f: self.file_list.add_file_item(f)
+        self.browse_pdfs()
 
     def run(self):
         items = self.file_list.get_all_files()
         if not items: 
             logger.log("Please select a PDF first.")
             return
+        range_str = self.inp_range.text().strip()
+        from src.modules.pdf_ops import PDFOps
+        if len(items) > 1:
+            self.start_batch(PDFOps.split_pdf, items, "", range_str if range_str else None)
+            return
         input_file = items[0]
         out_dir = QFileDialog.getExistingDirectory(self, "Output Folder")
         if not out_dir: return
-        range_str = self.inp_range.text().strip()
-        from src.modules.pdf_ops import PDFOps
         self.worker_callback(PDFOps.split_pdf, input_file, out_dir, range_str if range_str else None)
 
 class CompressPage(BasePage):
@@ -201,12 +251,12 @@ class CompressPage(BasePage):
         super().__init__("Compress PDF", "Reduce PDF file size.")
         self.worker_callback = worker_callback
         
-        self.content_layout.addWidget(QLabel("Select PDF:"))
+        self.content_layout.addWidget(QLabel("Select PDFs:"))
         self.file_list = FileListWidget()
         self.file_list.setMinimumHeight(150)
         self.content_layout.addWidget(self.file_list)
         
-        btn_browse = QPushButton("Browse PDF")
+        btn_browse = QPushButton("Browse PDFs")
         btn_browse.setCursor(Qt.CursorShape.PointingHandCursor)
         btn_browse.setFixedWidth(150)
         btn_browse.setStyleSheet("""
@@ -224,25 +274,27 @@ class CompressPage(BasePage):
         self.combo_level.addItems(["Low", "Medium", "High"])
         self.combo_level.setCurrentIndex(1) # Default Medium
         self.content_layout.addWidget(self.combo_level)
+        self.add_name_template("{name}_compressed")
         
         self.content_layout.addSpacing(10)
         self.add_action_button("Compress PDF", self.run)
 
     def browse(self):
-        self.file_list.clear()
-        f, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF (*.pdf)")
-        if f: self.file_list.add_file_item(f)
+        self.browse_pdfs()
 
     def run(self):
         items = self.file_list.get_all_files()
         if not items:
             logger.log("Please select a PDF first.")
             return
+        lvl = self.combo_level.currentText().lower()
+        from src.modules.pdf_ops import PDFOps
+        if len(items) > 1:
+            self.start_batch(PDFOps.compress_pdf, items, ".pdf", lvl)
+            return
         input_file = items[0]
         out, _ = QFileDialog.getSaveFileName(self, "Save Compressed", "", "PDF (*.pdf)")
         if not out: return
-        lvl = self.combo_level.currentText().lower()
-        from src.modules.pdf_ops import PDFOps
         self.worker_callback(PDFOps.compress_pdf, input_file, out, lvl)
 
 class ConvertPage(BasePage):
@@ -250,6 +302,13 @@ class ConvertPage(BasePage):
         super().__init__("Images to PDF", "Convert JPG/PNG images into a PDF.")
         self.worker_callback = worker_callback
         self.add_staging_area()
+        
+        from PyQt6.QtWidgets import QComboBox
+        self.content_layout.addWidget(QLabel("Page Size:"))
+        self.combo_page = QComboBox()
+        self.combo_page.addItems(["Original", "A4", "Letter"])
+        self.content_layout.addWidget(self.combo_page)
+        
         self.add_action_button("Convert Images", self.run)
 
     def run(self):
@@ -260,19 +319,23 @@ class ConvertPage(BasePage):
         out, _ = QFileDialog.getSaveFileName(self, "Save PDF", "", "PDF (*.pdf)")
         if out:
             from src.modules.img_ops import ImageOps
-            self.worker_callback(ImageOps.images_to_pdf, files, out)
+            page = self.combo_page.currentText()
+            page_size = None if page == "Original" else page
+            # Fitted pages are normalized to print resolution; originals keep their pixels
+            self.worker_callback(ImageOps.images_to_pdf, files, out, stream=True,
+                                 page_size=page_size, dpi=300 if page_size else None, workers=None)
 
 class ExtractPage(BasePage):
     def __init__(self, worker_callback):
         super().__init__("Extract Text", "Extract plain text from PDF.")
         self.worker_callback = worker_callback
         
-        self.content_layout.addWidget(QLabel("Select PDF:"))
+        self.content_layout.addWidget(QLabel("Select PDFs:"))
         self.file_list = FileListWidget()
         self.file_list.setMinimumHeight(150) 
         self.content_layout.addWidget(self.file_list)
         
-        btn_browse = QPushButton("Browse PDF")
+        btn_browse = QPushButton("Browse PDFs")
         btn_browse.setCursor(Qt.CursorShape.PointingHandCursor)
         btn_browse.setFixedWidth(150)
         btn_browse.setStyleSheet("""
@@ -281,21 +344,23 @@ class ExtractPage(BasePage):
         """)
         btn_browse.clicked.connect(self.browse)
         self.content_layout.addWidget(btn_browse)
+        self.add_name_template("{name}")
         
         self.add_action_button("Extract Text", self.run)
 
     def browse(self):
-        self.file_list.clear()
-        f, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF (*.pdf)")
-        if f: self.file_list.add_file_item(f)
+        self.browse_pdfs()
 
     def run(self):
         items = self.file_list.get_all_files()
         if not items: return
+        from src.modules.pdf_ops import PDFOps
+        if len(items) > 1:
+            self.start_batch(PDFOps.extract_text, items, ".txt")
+            return
         input_file = items[0]
         out, _ = QFileDialog.getSaveFileName(self, "Save Text", "", "Text (*.txt)")
         if out:
-            from src.modules.pdf_ops import PDFOps
             self.worker_callback(PDFOps.extract_text, input_file, out)
 
 class ProtectionPage(BasePage):
@@ -303,12 +368,12 @@ class ProtectionPage(BasePage):
         super().__init__("Protection", "Encrypt (Lock) or Decrypt (Unlock) your PDFs.")
         self.worker_callback = worker_callback
         
-        self.content_layout.addWidget(QLabel("Select PDF:"))
+        self.content_layout.addWidget(QLabel("Select PDFs:"))
         self.file_list = FileListWidget()
         self.file_list.setMinimumHeight(120)
         self.content_layout.addWidget(self.file_list)
         
-        btn_browse = QPushButton("Browse PDF")
+        btn_browse = QPushButton("Browse PDFs")
         btn_browse.setCursor(Qt.CursorShape.PointingHandCursor)
         btn_browse.setFixedWidth(150)
         btn_browse.setStyleSheet("""
@@ -349,14 +414,13 @@ class ProtectionPage(BasePage):
         self.inp_password.setPlaceholderText("Enter password")
         self.inp_password.setEchoMode(QLineEdit.EchoMode.Password)
         self.content_layout.addWidget(self.inp_password)
+        self.add_name_template("{name}_result")
         
         self.content_layout.addSpacing(20)
         self.add_action_button("Run Operation", self.run)
 
     def browse(self):
-        self.file_list.clear() # Single file
-        f, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF (*.pdf)")
-        if f: self.file_list.add_file_item(f)
+        self.browse_pdfs()
 
     def run(self):
         items = self.file_list.get_all_files()
@@ -369,12 +433,20 @@ class ProtectionPage(BasePage):
         if not password:
             logger.log("Please enter a password.")
             return
-            
-        out, _ = QFileDialog.getSaveFileName(self, "Save Result", "", "PDF (*.pdf)")
-        if not out: return
         
         is_encrypt = self.rb_encrypt.isChecked()
         from src.modules.pdf_ops import PDFOps
+        if len(items) > 1:
+            if is_encrypt:
+                # Hash the password once for the whole batch
+                from src.modules.protect_ops import LockKey
+                self.start_batch(PDFOps.encrypt_pdf, items, ".pdf", password, lock_key=LockKey(password))
+            else:
+                self.start_batch(PDFOps.decrypt_pdf, items, ".pdf", password)
+            return
+            
+        out, _ = QFileDialog.getSaveFileName(self, "Save Result", "", "PDF (*.pdf)")
+        if not out: return
         
         if is_encrypt:
             self.worker_callback(PDFOps.encrypt_pdf, input_file, out, password)
@@ -387,7 +459,18 @@ class VisualPage(BasePage):
         super().__init__("Visual Editor", "Organize pages: Rotate, Delete, Reorder.")
         self.worker_callback = worker_callback
         self.input_file = None
-        self.page_data = [] # List of {'index': original_idx, 'rotate': 0, 'label': 'Page 1'}
+        self.password = None # Of the loaded file, if it is encrypted
+        self.loader = None # DocumentLoader reading the current file's page tree
+        self.loaders = set() # Keeps running loaders alive until their thread ends
+        
+        # Thumbnails: rendered off the GUI thread, only for rows in view
+        from src.utils.workers import ThumbSignals
+        self.thumbs = None # ThumbnailRenderer of the loaded file
+        self.thumb_cache = None # Created on first load
+        self.thumb_icons = {} # (page index, rotation) -> QIcon
+        self.thumb_generation = 0 # Drops late results from a previously loaded file
+        self.thumb_signals = ThumbSignals()
+        self.thumb_signals.thumbnail_ready.connect(self.on_thumbnail_ready)
 
         # Top Toolbar
         top_bar = QHBoxLayout()
@@ -414,14 +497,25 @@ class VisualPage(BasePage):
         main_area = QHBoxLayout()
         main_area.setSpacing(20)
         
-        # Page List
-        self.page_list = QListWidget()
+        # Page List: a view over PageListModel (index/rotation arrays), drag to reorder
+        from PyQt6.QtWidgets import QListView, QAbstractItemView
+        from PyQt6.QtCore import QSize
+        from src.ui.page_model import PageListModel
+        self.page_model = PageListModel(decoration=self.thumbnail_icon)
+        self.page_list = QListView()
+        self.page_list.setModel(self.page_model)
         self.page_list.setStyleSheet("""
-            QListWidget { background-color: #252525; border: 2px solid #333; border-radius: 8px; font-size: 16px; padding: 10px; }
-            QListWidget::item { padding: 10px; border-bottom: 1px solid #333; }
-            QListWidget::item:selected { background-color: #0066CC; color: white; }
+            QListView { background-color: #252525; border: 2px solid #333; border-radius: 8px; font-size: 16px; padding: 10px; }
+            QListView::item { padding: 10px; border-bottom: 1px solid #333; }
+            QListView::item:selected { background-color: #0066CC; color: white; }
         """)
-        self.page_list.setSelectionMode(QListWidget.SelectionMode.ExtendedSelection)
+        self.page_list.setSelectionMode(QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.page_list.setUniformItemSizes(True) # Layout stays O(1) per row on huge documents
+        self.page_list.setDragDropMode(QAbstractItemView.DragDropMode.InternalMove)
+        self.page_list.setDefaultDropAction(Qt.DropAction.MoveAction)
+        self.page_list.setDropIndicatorShown(True)
+        self.page_list.setIconSize(QSize(90, 120))
+        self.page_list.verticalScrollBar().valueChanged.connect(self.request_visible_thumbnails)
         main_area.addWidget(self.page_list, stretch=1)
         
         # Controls Sidebar
@@ -465,75 +559,146 @@ class VisualPage(BasePage):
     def load_pdf(self):
         f, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF (*.pdf)")
         if f:
-            self.input_file = f
-            self.lbl_file.setText(os.path.basename(f))
-            self.lbl_file.setStyleSheet("color: #EEE; font-weight: bold;")
-            
-            # Read PDF and populate list
-            from pypdf import PdfReader
-            try:
-                reader = PdfReader(f)
-                count = len(reader.pages)
-                self.page_data = [] # Reset
-                self.page_list.clear()
-                
-                for i in range(count):
-                    self.page_data.append({'index': i, 'rotate': 0, 'label': f"Page {i+1}"})
-                    self.page_list.addItem(f"Page {i+1}")
-                
-                self.btn_save.setEnabled(True)
-            except Exception as e:
-                logger.log(f"Error reading PDF: {e}")
-
-    def refresh_list(self):
-        # Re-render list based on page_data
-        # Preserve selection if possible? Hard with reorder.
-        # Just repaint names
-        for i in range(self.page_list.count()):
-            data = self.page_data[i]
-            rot_text = f" [Rotated {data['rotate']}°]" if data['rotate'] != 0 else ""
-            self.page_list.item(i).setText(f"{data['label']}{rot_text}")
+            self.open_document(f)
+
+    def open_document(self, path, password=None):
+        # Page list fills in batch by batch while the page tree is read in the background
+        from src.utils.workers import DocumentLoader
+        if self.loader is not None:
+            self.loader.cancel()
+        if self.thumbs is not None:
+            self.thumbs.close() # Its thumbnails belong to the previous file
+            self.thumbs = None
+        self.thumb_icons = {}
+        self.input_file = path
+        self.password = password
+        self.page_model.load(0)
+        self.btn_save.setEnabled(False)
+        self.lbl_file.setText(f"{os.path.basename(path)} (loading...)")
+        self.lbl_file.setStyleSheet("color: #EEE; font-weight: bold;")
+        
+        loader = DocumentLoader(path, password)
+        loader.pages_found.connect(lambda batch, loader=loader: self.on_pages_found(loader, batch))
+        loader.password_needed.connect(lambda reason, loader=loader: self.on_password_needed(loader, reason))
+        loader.loaded.connect(lambda ok, msg, loader=loader: self.on_document_loaded(loader, ok, msg))
+        loader.finished.connect(lambda loader=loader: self.loaders.discard(loader))
+        self.loader = loader
+        self.loaders.add(loader)
+        loader.start()
+
+    def on_pages_found(self, loader, batch):
+        if loader is not self.loader: return
+        self.page_model.append_pages(batch)
+        self.btn_save.setEnabled(True)
+
+    def on_password_needed(self, loader, reason):
+        if loader is not self.loader: return
+        from PyQt6.QtWidgets import QLineEdit
+        name = os.path.basename(loader.path)
+        password, ok = QInputDialog.getText(self, "Password Required", f"{reason}\nPassword for {name}:",
+                                            QLineEdit.EchoMode.Password)
+        if ok and password:
+            self.open_document(loader.path, password)
+        else:
+            self.loader = None
+            self.input_file = None
+            self.lbl_file.setText("No file loaded")
+            self.lbl_file.setStyleSheet("color: #888; font-style: italic;")
+
+    def on_document_loaded(self, loader, success, msg):
+        if loader is not self.loader: return
+        if success:
+            self.lbl_file.setText(os.path.basename(loader.path))
+            self.start_thumbnails(loader.path, digest=msg)
+        else:
+            self.lbl_file.setText(f"{os.path.basename(loader.path)} (could not be read)")
+            logger.log(f"Error reading PDF: {msg}", level="error")
+
+    def start_thumbnails(self, path, digest=None):
+        from src.modules.thumb_ops import ThumbnailCache, ThumbnailRenderer
+        from PyQt6.QtCore import QTimer
+        if self.thumb_cache is None:
+            self.thumb_cache = ThumbnailCache()
+        self.thumb_generation += 1
+        emit = self.thumb_signals.thumbnail_ready.emit
+        self.thumbs = ThumbnailRenderer(path, self.thumb_cache,
+                                        lambda index, gen=self.thumb_generation: emit(gen, index),
+                                        digest=digest, password=self.password)
+        # After the list has been laid out, so the visible rows are known
+        QTimer.singleShot(0, self.request_visible_thumbnails)
+
+    def request_visible_thumbnails(self):
+        if self.thumbs is None or not self.page_model.rowCount(): return
+        self.thumbs.request(self.page_model.indices[r] for r in self.visible_rows())
+
+    def visible_rows(self):
+        count = self.page_model.rowCount()
+        viewport = self.page_list.viewport().rect()
+        first = self.page_list.indexAt(viewport.topLeft()).row()
+        last = self.page_list.indexAt(viewport.bottomLeft()).row()
+        first = max(0, first)
+        last = last if last >= 0 else count - 1
+        # A few rows of margin so short scrolls don't show empty icons
+        return range(max(0, first - 5), min(count, last + 6))
+
+    def on_thumbnail_ready(self, generation, index):
+        if generation != self.thumb_generation: return
+        # Only rows in view need repainting; the rest pick the icon up when shown
+        rows = [r for r in self.visible_rows() if self.page_model.indices[r] == index]
+        self.page_model.refresh_rows(rows)
+
+    def thumbnail_icon(self, index, rotation):
+        # Rotation comes from the cached thumbnail, never from a re-render
+        icon = self.thumb_icons.get((index, rotation))
+        if icon is None and self.thumbs is not None:
+            path = self.thumbs.cached(index, rotation)
+            if path:
+                from PyQt6.QtGui import QIcon
+                icon = self.thumb_icons[(index, rotation)] = QIcon(path)
+        return icon
+
+    def selected_rows(self):
+        return sorted(index.row() for index in self.page_list.selectionModel().selectedRows())
+
+    def select_rows(self, rows):
+        from PyQt6.QtCore import QItemSelection, QItemSelectionModel
+        selection = QItemSelection()
+        for row in rows:
+            selection.select(self.page_model.index(row), self.page_model.index(row))
+        self.page_list.selectionModel().select(selection, QItemSelectionModel.SelectionFlag.ClearAndSelect)
+        if rows:
+            self.page_list.scrollTo(self.page_model.index(rows[0]))
 
     def rotate_page(self, angle):
-        rows = [x.row() for x in self.page_list.selectedIndexes()]
+        rows = self.selected_rows()
         if not rows: return
-        for r in rows:
-            self.page_data[r]['rotate'] = (self.page_data[r]['rotate'] + angle) % 360
-        self.refresh_list()
+        self.page_model.rotate_rows(rows, angle)
 
     def delete_page(self):
-        rows = sorted([x.row() for x in self.page_list.selectedIndexes()], reverse=True)
+        rows = self.selected_rows()
         if not rows: return
-        for r in rows:
-            self.page_data.pop(r)
-            self.page_list.takeItem(r)
+        self.page_model.remove_rows(rows)
 
     def move_up(self):
-        row = self.page_list.currentRow()
-        if row <= 0: return
-        # Swap data
-        self.page_data[row], self.page_data[row-1] = self.page_data[row-1], self.page_data[row]
-        # Swap list widget items
-        cur_item = self.page_list.takeItem(row)
-        self.page_list.insertItem(row-1, cur_item)
-        self.page_list.setCurrentRow(row-1)
+        rows = self.selected_rows()
+        if not rows: return
+        self.select_rows(self.page_model.shift_rows(rows, -1))
         
     def move_down(self):
-        row = self.page_list.currentRow()
-        if row < 0 or row >= self.page_list.count() - 1: return
-        # Swap data
-        self.page_data[row], self.page_data[row+1] = self.page_data[row+1], self.page_data[row]
-        # Swap list items
-        cur_item = self.page_list.takeItem(row)
-        self.page_list.insertItem(row+1, cur_item)
-        self.page_list.setCurrentRow(row+1)
+        rows = self.selected_rows()
+        if not rows: return
+        self.select_rows(self.page_model.shift_rows(rows, 1))
 
     def save_pdf(self):
-        if not self.input_file or not self.page_data: return
+        if not self.input_file or not self.page_model.rowCount(): return
         
         out, _ = QFileDialog.getSaveFileName(self, "Save Modified PDF", "", "PDF (*.pdf)")
         if out:
             from src.modules.pdf_ops import PDFOps
-            # Prepare config
-            config = [{'index': p['index'], 'rotate': p['rotate']} for p in self.page_data]
-            self.worker_callback(PDFOps.organize_pages, self.input_file, out, config)
\ No newline at end of file
+            from src.modules.input_ops import same_file
+            config = self.page_model.page_config()
+            if self.thumbs is not None and same_file(out, self.input_file):
+                # Thumbnail workers map the file, and Windows can't replace a mapped file.
+                # Rendering restarts on demand.
+                self.thumbs.close(wait=True)
+            self.worker_callback(PDFOps.organize_pages, self.input_file, out, config, password=self.password)
\ No newline at end of file
@@ -1,4 +1,5 @@
-from PyQt6.QtWidgets import QListWidget, QAbstractItemView, QListWidgetItem
+from PyQt6.QtWidgets import (QListWidget, QAbstractItemView, QListWidgetItem, QWidget, QVBoxLayout, QHBoxLayout,
+                             QTableWidget, QTableWidgetItem, QPushButton, QFileDialog)
 from PyQt6.QtCore import Qt, QSize
 from PyQt6.QtGui import QIcon, QAction
 
@@ -59,3 +60,79 @@ class FileListWidget(QListWidget):
         for i in range(self.count()):
             files.append(self.item(i).text())
         return files
+
+class MetricsPanel(QWidget):
+    """
+    Recent operations as recorded by src.utils.metrics: one row per PDFOps/ImageOps
+    call with its time, pages, bytes in/out, peak memory and the time of each span.
+    Records are only collected while the panel is shown. Operations run in the
+    JobScheduler's pool reach it through metrics.relay in this process.
+    """
+    COLUMNS = ["Operation", "Result", "Seconds", "Pages", "In (MB)", "Out (MB)", "Peak RSS (MB)", "Spans"]
+    MAX_ROWS = 500
+
+    def __init__(self):
+        super().__init__()
+        from src.utils.workers import MetricsSignals
+        self.records = []
+        self.signals = MetricsSignals()
+        self.signals.record.connect(self.add_record)
+        self._sink = self.signals.record.emit # Kept: remove_sink needs the same object
+
+        layout = QVBoxLayout(self)
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+
+        buttons = QHBoxLayout()
+        btn_save = QPushButton("Save as JSON Lines...")
+        btn_save.clicked.connect(self.save_records)
+        btn_clear = QPushButton("Clear")
+        btn_clear.clicked.connect(self.clear)
+        buttons.addStretch()
+        buttons.addWidget(btn_save)
+        buttons.addWidget(btn_clear)
+        layout.addLayout(buttons)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        from src.utils import metrics
+        metrics.remove_sink(self._sink)
+        metrics.add_sink(self._sink)
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        from src.utils import metrics
+        metrics.remove_sink(self._sink)
+
+    def add_record(self, record):
+        self.records.append(record)
+        if len(self.records) > self.MAX_ROWS:
+            del self.records[0]
+            self.table.removeRow(self.table.rowCount() - 1)
+        counters = record["counters"]
+        spans = ", ".join(f"{name} {span['seconds']:.2f}s" for name, span in record["spans"].items())
+        megabytes = lambda key: f"{counters[key] / (1024 * 1024):.1f}" if key in counters else ""
+        values = [record["op"], "OK" if record["success"] else "Failed", f"{record['seconds']:.2f}",
+                  str(counters.get("pages", "")), megabytes("bytes_in"), megabytes("bytes_out"),
+                  "" if record["peak_rss_mb"] is None else f"{record['peak_rss_mb']:.0f}", spans]
+        self.table.insertRow(0) # Newest first
+        for column, value in enumerate(values):
+            item = QTableWidgetItem(value)
+            item.setToolTip(record["message"])
+            self.table.setItem(0, column, item)
+
+    def save_records(self):
+        import json
+        path, _ = QFileDialog.getSaveFileName(self, "Save Metrics", "metrics.jsonl", "JSON Lines (*.jsonl)")
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                for record in self.records:
+                    f.write(json.dumps(record) + "\n")
+
+    def clear(self):
+        self.records = []
+        self.table.setRowCount(0)
@@ -1,19 +1,36 @@
-from PyQt6.QtCore import QObject, pyqtSignal
+import threading
 
-class Signaller(QObject):
-    log_signal = pyqtSignal(str)
+# Kept free of Qt, so the ops modules and the CLI can log without a QApplication.
+# The GUI subscribes with add_listener and hops onto its own thread through a
+# signal (see LogSignals in src.utils.workers).
+
+LEVELS = ("info", "warning", "error")
 
 class Logger:
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(Logger, cls).__new__(cls)
-            cls._instance.signaller = Signaller()
+            cls._instance._listeners = []
+            cls._instance._lock = threading.Lock()
         return cls._instance
 
-    def log(self, message):
+    def add_listener(self, listener):
+        # listener(message, level); called on the logging thread
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def log(self, message, level="info"):
         print(message) # Console fallback
-        self.signaller.log_signal.emit(message)
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(message, level)
 
 logger = Logger()
@@ -0,0 +1,220 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# Kept free of Qt: the ops modules record into this from worker threads, pool
+# processes and the headless CLI.
+#
+# Every PDFOps/ImageOps call runs inside an operation(). Code below it adds timed
+# spans (parse, copy, compress stages, write, sync) and counters (bytes in/out,
+# pages) to whichever operation is current in its thread, without being passed
+# anything. Outside an operation, span() and count() do nothing. Finished
+# operations are handed to the registered sinks as plain dicts, e.g.
+#   {"op": "merge_pdfs", "success": true, "seconds": 1.42,
+#    "spans": {"parse": {"seconds": 0.3, "count": 12}, ...},
+#    "counters": {"bytes_in": 1048576, "bytes_out": 901120, "pages": 24},
+#    "peak_rss_mb": 212.4, ...}
+# peak_rss_mb is the peak of the whole process so far (the OS can't reset it per
+# operation), so it is exact for one operation per process (CLI, pool jobs).
+
+# Set to a file path to append every operation of this process (and of pool
+# processes started from it) to that file as JSON lines
+METRICS_ENV = "CLEANPDF_METRICS"
+
+_current = contextvars.ContextVar("cleanpdf_operation", default=None)
+_sinks = [] # (sink, pid of the process it belongs to or None)
+_sinks_lock = threading.Lock()
+
+def peak_rss_mb():
+    # Peak resident memory of this process so far (None where it can't be read)
+    try:
+        import resource
+    except ImportError:
+        return _windows_peak_rss_mb()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _windows_peak_rss_mb():
+    try:
+        import ctypes
+        from ctypes import wintypes
+    except ImportError:
+        return None
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+    try:
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+    except (AttributeError, OSError):
+        return None
+
+class OperationMetrics:
+    # Spans and counters of one running operation
+    def __init__(self, name):
+        self.name = name
+        self.started = time.time()
+        self.spans = {} # name -> [seconds, count]
+        self.counters = {}
+        self._lock = threading.Lock() # Pools report back on their own threads
+
+    def add_span(self, name, seconds):
+        with self._lock:
+            span = self.spans.setdefault(name, [0.0, 0])
+            span[0] += seconds
+            span[1] += 1
+
+    def count(self, **counters):
+        with self._lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def record(self, seconds, success, message):
+        with self._lock:
+            return {"op": self.name, "started": round(self.started, 3), "seconds": round(seconds, 4),
+                    "success": success, "message": message, "pid": os.getpid(),
+                    "spans": {name: {"seconds": round(s, 4), "count": n} for name, (s, n) in self.spans.items()},
+                    "counters": dict(self.counters), "peak_rss_mb": _rounded(peak_rss_mb())}
+
+def _rounded(value):
+    return None if value is None else round(value, 1)
+
+@contextmanager
+def operation(name):
+    """
+    Collect spans and counters of everything run inside the block; the finished
+    record goes to the sinks. Yields the OperationMetrics. An operation nested in
+    another (e.g. PDFOps called by PDFOps) is recorded separately.
+    Set op.result = (success, message) to record how it ended; an exception
+    records it as failed.
+    """
+    op = OperationMetrics(name)
+    op.result = None
+    token = _current.set(op)
+    start = time.perf_counter()
+    try:
+        yield op
+    except BaseException as e:
+        op.result = (False, f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        if _sinks:
+            success, message = op.result if op.result is not None else (True, "")
+            _emit(op.record(time.perf_counter() - start, bool(success), message))
+
+def instrumented(func):
+    # Decorator for PDFOps/ImageOps methods: one operation per call, ended by their (bool, str) result
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with operation(func.__name__) as op:
+            result = func(*args, **kwargs)
+            if isinstance(result, tuple) and len(result) == 2:
+                op.result = result
+            return result
+    return wrapper
+
+@contextmanager
+def span(name):
+    # Time the block under `name` in the current operation (summed if repeated)
+    op = _current.get()
+    if op is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        op.add_span(name, time.perf_counter() - start)
+
+def count(**counters):
+    # Add to counters of the current operation, e.g. count(pages=3, bytes_out=n)
+    op = _current.get()
+    if op is not None:
+        op.count(**counters)
+
+def add_sink(sink, inherited=False):
+    """
+    sink(record) is called on the thread that finished the operation.
+    inherited: Also call it in pool processes forked from this one. Sinks that
+               talk to this process (e.g. a Qt signal) must stay False.
+    """
+    with _sinks_lock:
+        _sinks.append((sink, None if inherited else os.getpid()))
+    return sink
+
+def remove_sink(sink):
+    with _sinks_lock:
+        _sinks[:] = [entry for entry in _sinks if entry[0] != sink] # == so bound methods match
+
+def _emit(record, owners=None):
+    pid = os.getpid()
+    owners = owners or (None, pid)
+    with _sinks_lock:
+        sinks = [sink for sink, owner in _sinks if owner in owners]
+    for sink in sinks:
+        try:
+            sink(record)
+        except Exception as e:
+            print(f"Metrics sink failed: {e}", file=sys.stderr)
+
+@contextmanager
+def collect():
+    """
+    Yield a list that receives the records of the operations finished in this
+    process during the block. Pool jobs return it with their result, so the
+    parent can relay() them to its own sinks (which never run in the pool).
+    """
+    records = []
+    sink = records.append
+    add_sink(sink)
+    try:
+        yield records
+    finally:
+        remove_sink(sink)
+
+def relay(records):
+    # Records collected in a pool process: hand them to this process's own sinks.
+    # Inherited sinks are skipped, they already ran in the pool process.
+    for record in records:
+        _emit(record, owners=(os.getpid(),))
+
+class JsonLinesSink:
+    """
+    Appends each record to a file as one JSON line. The file is opened per
+    record, so several processes can share it and it can be read while the
+    application runs.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def __call__(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+def export_jsonl(path):
+    """
+    Append every operation of this process to path, and of pool processes
+    started from it (they see the path through METRICS_ENV). Returns the sink.
+    """
+    os.environ[METRICS_ENV] = os.path.abspath(path)
+    return add_sink(JsonLinesSink(os.path.abspath(path)), inherited=True)
+
+if os.environ.get(METRICS_ENV):
+    # Profiling a run from outside (or a spawned pool process of an exporting parent)
+    add_sink(JsonLinesSink(os.environ[METRICS_ENV]), inherited=True)
@@ -0,0 +1,73 @@
+import inspect
+import threading
+import time
+
+# Kept free of Qt: the ops modules use this from worker threads and pool processes.
+
+class OperationCancelled(Exception):
+    def __init__(self, message="Cancelled"):
+        super().__init__(message)
+
+class ProgressToken:
+    """
+    Passed to long-running PDFOps/ImageOps calls as progress=. Their page loops
+    call update(done, total), which raises OperationCancelled once cancel() has
+    been called, so a job stops within one page. Reports to the callback are
+    throttled to one per min_interval seconds (the last one always goes through).
+
+    For jobs in another process, give it a multiprocessing/Manager event and a
+    picklable callback (see QueueReporter).
+    """
+    def __init__(self, callback=None, min_interval=0.1, cancel_event=None):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.cancel_event = cancel_event if cancel_event is not None else threading.Event()
+        self._last_report = 0.0
+
+    def __getstate__(self):
+        # threading.Event can't cross processes; callers pass a Manager event instead
+        state = self.__dict__.copy()
+        if isinstance(state["cancel_event"], threading.Event):
+            raise TypeError("ProgressToken needs a multiprocessing event to be sent to another process")
+        return state
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        if self.cancel_event.is_set():
+            raise OperationCancelled()
+
+    def update(self, done, total):
+        self.check()
+        if self.callback is None:
+            return
+        now = time.monotonic()
+        if done >= total or now - self._last_report >= self.min_interval:
+            self._last_report = now
+            self.callback(done, total)
+
+class QueueReporter:
+    # Picklable progress callback that forwards (tag, done, total) to a queue
+    def __init__(self, queue, tag):
+        self.queue = queue
+        self.tag = tag
+
+    def __call__(self, done, total):
+        self.queue.put((self.tag, done, total))
+
+def report(progress, done, total):
+    # Shorthand for the ops modules, where progress is optional
+    if progress is not None:
+        progress.update(done, total)
+
+def accepts_progress(func):
+    # True if func takes a progress= argument (so callers know to pass a token)
+    try:
+        return "progress" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
@@ -0,0 +1,279 @@
+import inspect
+import itertools
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, ThreadPoolExecutor
+from src.utils import metrics
+from src.utils.progress import ProgressToken, QueueReporter, accepts_progress
+
+# Kept free of Qt so it can drive headless/batch runs as well as the GUI.
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    FINISHED = (DONE, FAILED, CANCELLED)
+
+class Job:
+    def __init__(self, job_id, func, args, kwargs, label, in_process):
+        self.id = job_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.label = label or getattr(func, "__name__", "job")
+        self.in_process = in_process
+        self.status = JobStatus.QUEUED
+        self.result = None # (success, message) once finished
+        self.future = None
+        self.token = None # ProgressToken when func takes progress=
+        self.progress = None # Last (done, total) reported
+        self.done_event = threading.Event() # Set once status/result are final
+
+    @property
+    def finished(self):
+        return self.status in JobStatus.FINISHED
+
+def _normalize_result(result):
+    # Ops return (bool, str); anything else is treated like WorkerThread does
+    if isinstance(result, tuple) and len(result) == 2:
+        return result
+    return True, "Operation completed (No standard return detected)"
+
+def _run_job(func, args, kwargs):
+    return _normalize_result(func(*args, **kwargs))
+
+# Processes an operation may start in this process; set in JobScheduler pool processes
+_worker_budget = None
+
+def worker_budget():
+    """
+    Processes an operation running here may use for its own pool: all cores, or in a
+    JobScheduler pool process (which runs up to max_workers operations side by side)
+    its share of them, so nested pools never start cores x cores processes.
+    """
+    return _worker_budget or os.cpu_count() or 1
+
+def _init_pool_process(budget, initializer):
+    global _worker_budget
+    _worker_budget = budget
+    if initializer is not None:
+        initializer()
+
+def warm_up_imports():
+    # Imports every operation needs (pypdf, Pillow, the ops modules), so the first
+    # job doesn't pay for them. Used as the pool initializer by the GUI.
+    import pypdf # noqa: F401
+    from PIL import Image
+    import src.modules.pdf_ops # noqa: F401
+    import src.modules.img_ops # noqa: F401
+    import src.modules.compress_ops # noqa: F401
+    Image.init() # Registers the image plugins (normally done on first open)
+
+def _hold_worker(barrier):
+    # Keeps its worker busy until every worker has taken one, so each runs exactly one
+    try:
+        barrier.wait(timeout=60)
+    except Exception:
+        pass # A worker was busy with a real job; it has started all the same
+
+def _accepts_pool(func):
+    try:
+        return "pool" in inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return False
+
+def _run_process_job(func, args, kwargs):
+    # The operation's metrics records travel back with its result (see metrics.relay)
+    from src.modules.doc_cache import document_cache
+    try:
+        with metrics.collect() as records:
+            result = _run_job(func, args, kwargs)
+    finally:
+        # A map kept by this worker would stop the GUI from saving over the file (Windows)
+        document_cache.release_maps()
+    return result, records
+
+class JobScheduler:
+    """
+    Bounded job queue over a process pool (CPU-heavy PDFOps/ImageOps calls) and a
+    thread pool (anything that can't be pickled). Every job gets an id, a status
+    and a (success, message) result; listeners are called when a job finishes,
+    from a pool callback thread. Functions that take progress= get a ProgressToken,
+    so running jobs report progress and can be cancelled too. Thread jobs that
+    take pool= get the process pool, so work they fan out shares its processes.
+    """
+    def __init__(self, max_workers=None, max_queue=32, initializer=None):
+        """
+        initializer: Called once in every pool process when it starts (e.g. warm_up_imports).
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self.jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._progress_listeners = []
+        self._processes = None # Created on first use: spawning workers is not free
+        self._threads = ThreadPoolExecutor(max_workers=self.max_workers)
+        # Cancel events and the progress queue for process jobs, also created on first use
+        self._manager = None
+        self._progress_queue = None
+
+    def add_listener(self, callback):
+        # callback(job) once the job is done, failed or cancelled
+        self._listeners.append(callback)
+
+    def add_progress_listener(self, callback):
+        # callback(job, done, total), throttled, from a pool or drain thread
+        self._progress_listeners.append(callback)
+
+    def _on_progress(self, job, done, total):
+        job.progress = (done, total)
+        for callback in self._progress_listeners:
+            callback(job, done, total)
+
+    def _drain_progress(self):
+        while True:
+            item = self._progress_queue.get()
+            if item is None:
+                break
+            job_id, done, total = item
+            job = self.jobs.get(job_id)
+            if job is not None:
+                self._on_progress(job, done, total)
+
+    def _make_token(self, job):
+        if not job.in_process:
+            return ProgressToken(callback=lambda done, total: self._on_progress(job, done, total))
+        manager = self._get_manager()
+        return ProgressToken(callback=QueueReporter(self._progress_queue, job.id),
+                             cancel_event=manager.Event())
+
+    def _get_manager(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = multiprocessing.Manager()
+                self._progress_queue = self._manager.Queue()
+                threading.Thread(target=self._drain_progress, daemon=True).start()
+            return self._manager
+
+    def _executor(self, in_process):
+        if not in_process:
+            return self._threads
+        with self._lock: # start_workers() may race the first submit
+            if self._processes is None:
+                budget = max(1, (os.cpu_count() or 1) // self.max_workers)
+                self._processes = ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_pool_process,
+                                                      initargs=(budget, self.initializer))
+            return self._processes
+
+    def start_workers(self):
+        """
+        Start the pool processes now (they otherwise start with the first jobs), so
+        they are initialized before the user starts an operation. Blocks until every
+        worker has run its initializer; call it off the GUI thread.
+        """
+        barrier = self._get_manager().Barrier(self.max_workers)
+        pool = self._executor(True)
+        # Workers are started per submitted call (spawn) or all at once (fork)
+        for future in [pool.submit(_hold_worker, barrier) for _ in range(self.max_workers)]:
+            future.result()
+
+    def active_count(self):
+        with self._lock:
+            return sum(1 for job in self.jobs.values() if not job.finished)
+
+    def submit(self, func, *args, label=None, in_process=True, **kwargs):
+        """
+        Queue func(*args, **kwargs) and return its job id.
+        Raises queue.Full when max_queue jobs are already queued or running.
+        """
+        with self._lock:
+            active = sum(1 for job in self.jobs.values() if not job.finished)
+            if active >= self.max_queue:
+                raise queue.Full(f"Job queue is full ({self.max_queue} jobs pending)")
+            job = Job(next(self._ids), func, args, kwargs, label, in_process)
+            self.jobs[job.id] = job
+
+        if accepts_progress(func) and "progress" not in kwargs:
+            job.token = self._make_token(job)
+            kwargs = dict(kwargs, progress=job.token)
+        if not in_process and _accepts_pool(func) and kwargs.get("pool") is None:
+            # e.g. batch_ops.process_batch: its files run beside the other jobs, not on extra processes
+            kwargs = dict(kwargs, pool=self._executor(True))
+        runner = _run_process_job if in_process else _run_job
+        job.future = self._executor(in_process).submit(runner, func, args, kwargs)
+        # Process pool futures only report "running" once a worker picks them up
+        job.future.add_done_callback(lambda future, job=job: self._on_done(job, future))
+        return job.id
+
+    def _on_done(self, job, future):
+        try:
+            result = future.result()
+            if job.in_process:
+                result, records = result
+                metrics.relay(records)
+            if result[0]:
+                status = JobStatus.DONE
+            elif job.token is not None and job.token.cancelled:
+                status = JobStatus.CANCELLED
+            else:
+                status = JobStatus.FAILED
+        except CancelledError:
+            result, status = (False, "Cancelled"), JobStatus.CANCELLED
+        except Exception as e:
+            result, status = (False, str(e)), JobStatus.FAILED
+        with self._lock: # status() may be marking the job running right now
+            job.result, job.status = result, status
+        job.done_event.set()
+        for callback in self._listeners:
+            callback(job)
+
+    def status(self, job_id):
+        job = self.jobs[job_id]
+        # Under the lock, so a job finishing meanwhile can't be put back to RUNNING
+        with self._lock:
+            if job.status == JobStatus.QUEUED and job.future is not None and job.future.running():
+                job.status = JobStatus.RUNNING
+            return job.status
+
+    def result(self, job_id, timeout=None):
+        # Blocks until the job is finished; returns (success, message)
+        job = self.jobs[job_id]
+        # Waits for _on_done rather than the future, so status is final too
+        job.done_event.wait(timeout)
+        return job.result
+
+    def cancel(self, job_id):
+        # Queued jobs are dropped; running ones stop at their next page if they take progress=
+        job = self.jobs.get(job_id)
+        if job is None or job.future is None or job.finished:
+            return False
+        if job.future.cancel():
+            return True
+        if job.token is not None:
+            job.token.cancel()
+            return True
+        return False
+
+    def cancel_all(self):
+        return sum(1 for job_id in list(self.jobs) if self.cancel(job_id))
+
+    def forget_finished(self):
+        with self._lock:
+            for job_id in [j.id for j in self.jobs.values() if j.finished]:
+                del self.jobs[job_id]
+
+    def shutdown(self, wait=False):
+        self._threads.shutdown(wait=wait, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait, cancel_futures=True)
+        if self._manager is not None:
+            self._progress_queue.put(None)
+            self._manager.shutdown()
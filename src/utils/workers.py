@@ -1,13 +1,22 @@
-from PyQt6.QtCore import QThread, pyqtSignal
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from src.utils.progress import ProgressToken, accepts_progress
 
 class WorkerThread(QThread):
     finished = pyqtSignal(bool, str) # success, message
+    progress = pyqtSignal(int, int) # done, total (throttled)
     
     def __init__(self, func, *args, **kwargs):
         super().__init__()
         self.func = func
         self.args = args
         self.kwargs = kwargs
+        self.token = ProgressToken(callback=self.progress.emit)
+        if accepts_progress(func) and "progress" not in kwargs:
+            self.kwargs["progress"] = self.token
+    
+    def cancel(self):
+        # The operation stops at its next page and finishes with "Cancelled"
+        self.token.cancel()
     
     def run(self):
         try:
@@ -21,3 +30,52 @@ class WorkerThread(QThread):
                 self.finished.emit(True, "Operation completed (No standard return detected)")
         except Exception as e:
             self.finished.emit(False, str(e))
+
+class JobSignals(QObject):
+    # Bridges JobScheduler listeners (pool callback threads) onto the GUI thread
+    job_finished = pyqtSignal(int, bool, str) # job id, success, message
+    job_progress = pyqtSignal(int, int, int) # job id, done, total
+
+class LogSignals(QObject):
+    # Logger listeners may run on any thread; this hops onto the GUI thread
+    message = pyqtSignal(str, str) # message, level
+
+class MetricsSignals(QObject):
+    # Metrics sinks run on the thread that finished the operation
+    record = pyqtSignal(dict)
+
+class ThumbSignals(QObject):
+    # ThumbnailRenderer calls back from pool threads; this hops onto the GUI thread
+    thumbnail_ready = pyqtSignal(int, int) # load generation, page index
+
+class DocumentLoader(QThread):
+    # Opens a PDF for the Visual Editor off the GUI thread, page tree only
+    pages_found = pyqtSignal(list) # Next batch of (rotation, width, height), in page order
+    password_needed = pyqtSignal(str) # Reason ("Incorrect password." etc.)
+    loaded = pyqtSignal(bool, str) # success, file digest (or error message)
+
+    def __init__(self, path, password=None):
+        super().__init__()
+        self.path = path
+        self.password = password
+        self.token = ProgressToken()
+
+    def cancel(self):
+        self.token.cancel()
+
+    def run(self):
+        from src.modules.doc_cache import document_cache
+        from src.modules.pdf_ops import PasswordRequired, iter_page_info
+        from src.utils.progress import OperationCancelled
+        try:
+            for batch in iter_page_info(self.path, self.password, progress=self.token):
+                self.pages_found.emit(batch)
+            self.token.check()
+            # Thumbnail cache key: hashed only now, after the page list is on screen
+            self.loaded.emit(True, document_cache.digest(self.path))
+        except PasswordRequired as e:
+            self.password_needed.emit(str(e))
+        except OperationCancelled:
+            pass
+        except Exception as e:
+            self.loaded.emit(False, str(e))
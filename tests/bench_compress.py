@@ -0,0 +1,85 @@
+import io
+import os
+import sys
+import time
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.pdf_ops import PDFOps
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject, StreamObject
+
+# Letter page scanned at 200 DPI
+PAGE_W, PAGE_H = 612, 792
+SCAN_DPI = 200
+
+def jpeg_xobject(writer, img, quality=90):
+    buf = io.BytesIO()
+    img.save(buf, "JPEG", quality=quality)
+    stream = StreamObject.initialize_from_dictionary({
+        NameObject("/Type"): NameObject("/XObject"),
+        NameObject("/Subtype"): NameObject("/Image"),
+        NameObject("/Width"): NumberObject(img.width),
+        NameObject("/Height"): NumberObject(img.height),
+        NameObject("/ColorSpace"): NameObject("/DeviceGray" if img.mode == "L" else "/DeviceRGB"),
+        NameObject("/BitsPerComponent"): NumberObject(8),
+        NameObject("/Filter"): NameObject("/DCTDecode"),
+        "__streamdata__": buf.getvalue(),
+    })
+    return writer._add_object(stream)
+
+def make_scanned_pdf(path, pages):
+    # Every page: one unique grayscale scan plus the same letterhead logo
+    writer = PdfWriter()
+    logo = Image.new("RGB", (600, 200), "white")
+    ImageDraw.Draw(logo).rectangle([20, 20, 580, 180], fill="navy")
+    logo_ref = jpeg_xobject(writer, logo)
+
+    scan_w, scan_h = PAGE_W * SCAN_DPI // 72, PAGE_H * SCAN_DPI // 72
+    paper = Image.linear_gradient("L").resize((scan_w, scan_h))
+    for i in range(pages):
+        scan = Image.blend(paper, Image.effect_noise((scan_w, scan_h), 20 + i % 10).convert("L"), 0.1)
+        ImageDraw.Draw(scan).text((100, 100), f"Scanned page {i + 1}", fill=0)
+        scan_ref = jpeg_xobject(writer, scan)
+
+        page = writer.add_blank_page(PAGE_W, PAGE_H)
+        content = DecodedStreamObject()
+        content.set_data(f"q {PAGE_W} 0 0 {PAGE_H} 0 0 cm /Scan Do Q "
+                         f"q 150 0 0 50 40 730 cm /Logo Do Q".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/Scan"): scan_ref, NameObject("/Logo"): logo_ref})
+        })
+    writer.write(path)
+
+def run_bench(pages=300, level="medium"):
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+
+    src_path = f"tests_output/scanned_{pages}.pdf"
+    if not os.path.exists(src_path):
+        print(f"Generating {pages}-page scanned document...")
+        make_scanned_pdf(src_path, pages)
+    print(f"Source: {src_path} ({os.path.getsize(src_path)} bytes)")
+
+    cores = os.cpu_count() or 1
+    counts = sorted(set([1, 2, 4, 8, 16, cores]))
+    counts = [c for c in counts if c <= cores] or [1]
+
+    print(f"\nLevel: {level}")
+    print(f"{'workers':>8} {'wall (s)':>10} {'speedup':>8}")
+    baseline = None
+    for workers in counts:
+        out_path = f"tests_output/scanned_{pages}_{level}_w{workers}.pdf"
+        start = time.perf_counter()
+        success, msg = PDFOps.compress_pdf(src_path, out_path, level, workers=workers)
+        wall = time.perf_counter() - start
+        if not success:
+            print(f"FAIL ({workers} workers): {msg}")
+            return
+        baseline = baseline or wall
+        print(f"{workers:>8} {wall:>10.2f} {baseline / wall:>7.2f}x")
+    print(f"\nLast run: {msg}")
+
+if __name__ == "__main__":
+    run_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,184 @@
+import json
+import os
+import random
+import shutil
+import sys
+import zlib
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, StreamObject
+from bench_compress import PAGE_H, PAGE_W, SCAN_DPI, jpeg_xobject
+from bench_merge import make_invoice
+
+# Synthetic documents for bench_suite.py. Every corpus is generated from a seed,
+# so two machines (or two checkouts) benchmark the same bytes' worth of work, and
+# is kept under CORPUS_ROOT between runs. A corpus is rebuilt when its spec or
+# CORPUS_VERSION changes; bump the version whenever a generator changes output.
+CORPUS_VERSION = 1
+CORPUS_ROOT = "tests_output/bench_corpus"
+SEED = 20240611
+
+# name -> (kind, size per scale); size is pages, files or images depending on the kind
+CORPORA = {
+    "text": ("text", {"quick": 200, "full": 2000}), # One long text-only document
+    "text_locked": ("locked", {"quick": 200, "full": 2000}), # The same, RC4-128 encrypted
+    "scans": ("scans", {"quick": 6, "full": 60}), # 200 DPI grayscale scans, JPEG
+    "small": ("small", {"quick": 300, "full": 3000}), # Many small, unrelated documents
+    "invoices": ("invoices", {"quick": 200, "full": 2000}), # One-page invoices sharing a font
+    "images": ("images", {"quick": 12, "full": 60}), # Photos (JPEG) and screenshots (PNG)
+}
+
+LOCKED_PASSWORD = "bench"
+
+WORDS = ("invoice total amount payable account balance statement period customer reference "
+         "delivery order quantity price discount tax net gross date due paid item service "
+         "contract clause section schedule annex party agreement term notice").split()
+
+def _helvetica(writer):
+    return writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+
+def _text_page(writer, font, rng, heading, lines=45):
+    # A page of flate-compressed body text, like a report exported from a word processor
+    ops = [f"BT /F1 14 Tf 50 750 Td ({heading}) Tj /F1 10 Tf 0 -24 Td 14 TL"]
+    for _ in range(lines):
+        ops.append(f"({' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 14)))}) '")
+    ops.append("ET")
+    content = StreamObject.initialize_from_dictionary({
+        NameObject("/Filter"): NameObject("/FlateDecode"),
+        "__streamdata__": zlib.compress("\n".join(ops).encode())})
+    page = writer.add_blank_page(PAGE_W, PAGE_H)
+    page[NameObject("/Contents")] = writer._add_object(content)
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+
+def make_text_pdf(path, pages, rng):
+    writer = PdfWriter()
+    font = _helvetica(writer)
+    for i in range(pages):
+        _text_page(writer, font, rng, f"Chapter {i // 20 + 1}, page {i + 1}")
+    writer.write(path)
+
+def make_locked_pdf(path, source_path):
+    writer = PdfWriter(clone_from=PdfReader(source_path))
+    writer.encrypt(LOCKED_PASSWORD, algorithm="RC4-128")
+    writer.write(path)
+
+def make_scans_pdf(path, pages, rng):
+    # Like bench_compress.make_scanned_pdf, but with seeded noise
+    writer = PdfWriter()
+    scan_w, scan_h = PAGE_W * SCAN_DPI // 72, PAGE_H * SCAN_DPI // 72
+    paper = Image.linear_gradient("L").resize((scan_w, scan_h))
+    for i in range(pages):
+        noise = Image.frombytes("L", (scan_w, scan_h), rng.randbytes(scan_w * scan_h))
+        scan = Image.blend(paper, noise, 0.1)
+        ImageDraw.Draw(scan).text((100, 100), f"Scanned page {i + 1}", fill=0)
+        page = writer.add_blank_page(PAGE_W, PAGE_H)
+        content = DecodedStreamObject()
+        content.set_data(f"q {PAGE_W} 0 0 {PAGE_H} 0 0 cm /Scan Do Q".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/Scan"): jpeg_xobject(writer, scan)})})
+    writer.write(path)
+
+def make_small_pdf(path, number, rng):
+    # Each file has its own font object, so merging them shares nothing
+    writer = PdfWriter()
+    font = _helvetica(writer)
+    for page in range(rng.randint(1, 3)):
+        _text_page(writer, font, rng, f"Letter {number}, page {page + 1}", lines=rng.randint(5, 30))
+    writer.write(path)
+
+def make_image(path, number, rng):
+    if number % 3 == 2:
+        # Screenshot: flat colours, transparency, stored as PNG
+        img = Image.new("RGBA", (1440, 900), (rng.randrange(256), rng.randrange(256), rng.randrange(256), 255))
+        draw = ImageDraw.Draw(img)
+        for _ in range(40):
+            x, y = rng.randrange(1300), rng.randrange(800)
+            draw.rectangle([x, y, x + rng.randint(20, 140), y + rng.randint(10, 100)],
+                           fill=(rng.randrange(256), rng.randrange(256), rng.randrange(256), rng.choice((128, 255))))
+        img.save(path, "PNG")
+    else:
+        # Photo: smooth gradient plus sensor noise, baseline JPEG
+        width, height = 2400, 1800
+        base = Image.merge("RGB", [Image.linear_gradient("L").resize((width, height)).rotate(angle, expand=False)
+                                   for angle in (0, 90, 180)])
+        noise = Image.frombytes("L", (width, height), rng.randbytes(width * height)).convert("RGB")
+        Image.blend(base, noise, 0.08).save(path, "JPEG", quality=88)
+
+def _build(kind, size, scale, directory, rng):
+    # Returns the corpus paths, relative to CORPUS_ROOT
+    if kind == "text":
+        paths = [os.path.join(directory, "text.pdf")]
+        make_text_pdf(paths[0], size, rng)
+    elif kind == "locked":
+        source = corpus_paths("text", scale)[0]
+        paths = [os.path.join(directory, "text_locked.pdf")]
+        make_locked_pdf(paths[0], source)
+    elif kind == "scans":
+        paths = [os.path.join(directory, "scans.pdf")]
+        make_scans_pdf(paths[0], size, rng)
+    elif kind == "small":
+        paths = [os.path.join(directory, f"letter_{i:05d}.pdf") for i in range(size)]
+        for i, path in enumerate(paths):
+            make_small_pdf(path, i, rng)
+    elif kind == "invoices":
+        paths = [os.path.join(directory, f"invoice_{i:05d}.pdf") for i in range(size)]
+        for i, path in enumerate(paths):
+            make_invoice(path, i)
+    elif kind == "images":
+        paths = [os.path.join(directory, f"image_{i:03d}.{'png' if i % 3 == 2 else 'jpg'}") for i in range(size)]
+        for i, path in enumerate(paths):
+            make_image(path, i, rng)
+    else:
+        raise ValueError(f"Unknown corpus kind: {kind}")
+    return [os.path.relpath(path, CORPUS_ROOT) for path in paths]
+
+def spec(name, scale):
+    # Everything the corpus content depends on; stored in its manifest and in benchmark results
+    kind, sizes = CORPORA[name]
+    return {"corpus": name, "kind": kind, "size": sizes[scale], "seed": SEED, "version": CORPUS_VERSION}
+
+def corpus_paths(name, scale, log=print):
+    """
+    Paths of corpus name at scale ("quick" or "full"), generating it first if it
+    is missing or was generated from a different spec.
+    """
+    directory = os.path.join(CORPUS_ROOT, f"{name}_{scale}")
+    manifest_path = os.path.join(directory, "manifest.json")
+    wanted = spec(name, scale)
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest["spec"] == wanted and all(os.path.exists(os.path.join(CORPUS_ROOT, p)) for p in manifest["files"]):
+            return [os.path.join(CORPUS_ROOT, p) for p in manifest["files"]]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    log(f"Generating corpus {name} ({scale}: {wanted['size']} {'pages' if wanted['kind'] in ('text', 'locked', 'scans') else 'files'})...")
+    if os.path.exists(directory):
+        shutil.rmtree(directory)
+    os.makedirs(directory)
+    # One generator per corpus, so adding a corpus doesn't change the others
+    rng = random.Random(f"{SEED}:{name}")
+    files = _build(wanted["kind"], wanted["size"], scale, directory, rng)
+    size = sum(os.path.getsize(os.path.join(CORPUS_ROOT, p)) for p in files)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"spec": wanted, "files": files, "bytes": size}, f, indent=1)
+    return [os.path.join(CORPUS_ROOT, p) for p in files]
+
+def corpus_bytes(name, scale):
+    with open(os.path.join(CORPUS_ROOT, f"{name}_{scale}", "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)["bytes"]
+
+if __name__ == "__main__":
+    # Pre-generate every corpus, e.g. before timing on a CI machine
+    scale = sys.argv[1] if len(sys.argv) > 1 else "quick"
+    for corpus in CORPORA:
+        paths = corpus_paths(corpus, scale)
+        print(f"{corpus:<12} {len(paths):>5} file(s) {corpus_bytes(corpus, scale) / (1024 * 1024):>9.1f} MB")
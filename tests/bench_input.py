@@ -0,0 +1,88 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules import input_ops
+from src.modules.pdf_ops import PDFOps
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+# Per page: a scanned-looking image, stored unfiltered so the file has the requested size
+IMAGE_BYTES = 1024 * 1024
+
+def make_document(path, size_mb):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    pixels = os.urandom(IMAGE_BYTES)
+    for i in range(size_mb):
+        page = writer.add_blank_page(612, 792)
+        image = DecodedStreamObject()
+        image.set_data(pixels[i % 256:] + pixels[:i % 256]) # Distinct, so pages share nothing
+        image.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+                      NameObject("/Width"): NumberObject(1024), NameObject("/Height"): NumberObject(1024),
+                      NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                      NameObject("/BitsPerComponent"): NumberObject(8)})
+        content = DecodedStreamObject()
+        content.set_data(f"q 612 0 0 792 0 0 cm /Im0 Do Q BT /F1 12 Tf 50 700 Td (Scan {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font}),
+            NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): writer._add_object(image)})})
+    writer.write(path)
+
+def peak_rss_mb(who="self"):
+    try:
+        import resource
+    except ImportError:
+        return float("nan") # Windows: no getrusage
+    usage = resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN
+    peak = resource.getrusage(usage).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def timed_op(args):
+    # Runs in a freshly spawned process so each mode gets its own peak RSS (and its own document cache)
+    use_mmap, op, path, kwargs = args
+    input_ops.USE_MMAP = use_mmap
+    start = time.perf_counter()
+    if op == "split":
+        success, msg = PDFOps.split_pdf(path, "tests_output/input_bench_split", **kwargs)
+    else:
+        success, msg = PDFOps.extract_text(path, "tests_output/input_bench.txt", **kwargs)
+    # Pool processes inherit USE_MMAP through the fork; their peak is reported separately
+    return success, msg, time.perf_counter() - start, peak_rss_mb(), peak_rss_mb("children")
+
+def run_bench(size_mb=256):
+    if not os.path.exists("tests_output/input_bench_split"):
+        os.makedirs("tests_output/input_bench_split")
+    path = f"tests_output/input_bench_{size_mb}.pdf"
+    if not os.path.exists(path):
+        print(f"Generating a {size_mb} MB document ({size_mb} pages)...")
+        make_document(path, size_mb)
+
+    workers = os.cpu_count() or 1
+    ops = [
+        ("split 10 pages", "split", {"page_range": "1-10", "workers": 1}),
+        ("extract", "extract", {"workers": 1}),
+    ]
+    if workers > 1:
+        ops.append((f"extract, {workers} procs", "extract", {"workers": workers}))
+    print(f"\n{os.path.getsize(path) / (1024 * 1024):.0f} MB input (page cache warm)")
+    print(f"{'operation':<22} {'input':<9} {'wall (s)':>10} {'peak RSS (MB)':>14} {'pool peak (MB)':>15}")
+    for label, op, kwargs in ops:
+        for mode, use_mmap in (("buffered", False), ("mapped", True)):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                success, msg, wall, rss, pool_rss = pool.submit(timed_op, (use_mmap, op, path, kwargs)).result()
+            if not success:
+                print(f"{label:<22} {mode:<9} FAIL: {msg}")
+                continue
+            pool_text = f"{pool_rss:>15.1f}" if kwargs["workers"] > 1 else f"{'-':>15}"
+            print(f"{label:<22} {mode:<9} {wall:>10.2f} {rss:>14.1f} {pool_text}")
+
+if __name__ == "__main__":
+    run_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 256)
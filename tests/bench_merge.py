@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.pdf_ops import PDFOps
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject, StreamObject
+
+# Stand-in for an embedded font shared by every invoice
+FONT_BYTES = bytes(range(256)) * 160
+
+def make_invoice(path, number):
+    writer = PdfWriter()
+    font_file = writer._add_object(StreamObject.initialize_from_dictionary({
+        NameObject("/Length1"): NumberObject(len(FONT_BYTES)), "__streamdata__": FONT_BYTES}))
+    descriptor = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/FontDescriptor"),
+        NameObject("/FontName"): NameObject("/InvoiceSans"),
+        NameObject("/FontFile2"): font_file}))
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/TrueType"),
+        NameObject("/BaseFont"): NameObject("/InvoiceSans"),
+        NameObject("/FontDescriptor"): descriptor}))
+
+    page = writer.add_blank_page(612, 792)
+    content = DecodedStreamObject()
+    content.set_data(f"BT /F1 12 Tf 50 700 Td (Invoice {number}) Tj ET".encode())
+    page[NameObject("/Contents")] = writer._add_object(content)
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.write(path)
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return float("nan") # Windows: no getrusage
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def timed_merge(args):
+    # Runs in a fresh process so each mode gets its own peak RSS
+    paths, out_path, kwargs = args
+    start = time.perf_counter()
+    success, msg = PDFOps.merge_pdfs(paths, out_path, **kwargs)
+    return success, msg, time.perf_counter() - start, peak_rss_mb()
+
+def run_bench(count=10000):
+    corpus_dir = f"tests_output/merge_corpus_{count}"
+    if not os.path.exists(corpus_dir):
+        os.makedirs(corpus_dir)
+    paths = [os.path.join(corpus_dir, f"invoice_{i:05d}.pdf") for i in range(count)]
+    missing = [(i, p) for i, p in enumerate(paths) if not os.path.exists(p)]
+    if missing:
+        print(f"Generating {len(missing)} one-page PDFs...")
+        for i, p in missing:
+            make_invoice(p, i)
+
+    modes = [
+        ("append (in memory)", {}),
+        ("batched", {"batch_size": 200}),
+        ("batched + dedup", {"batch_size": 200, "dedup": True}),
+    ]
+    print(f"\nMerging {count} files")
+    print(f"{'mode':<22} {'wall (s)':>10} {'peak RSS (MB)':>14} {'output (MB)':>12}")
+    for label, kwargs in modes:
+        out_path = f"tests_output/merged_{count}_{label.split()[0]}{'_dedup' if kwargs.get('dedup') else ''}.pdf"
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            success, msg, wall, rss = pool.submit(timed_merge, (paths, out_path, kwargs)).result()
+        if not success:
+            print(f"{label:<22} FAIL: {msg}")
+            continue
+        size = os.path.getsize(out_path) / (1024 * 1024)
+        print(f"{label:<22} {wall:>10.2f} {rss:>14.1f} {size:>12.1f}")
+
+if __name__ == "__main__":
+    run_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.pdf_ops import PDFOps
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ArrayObject, DecodedStreamObject, DictionaryObject, NameObject, NumberObject, StreamObject
+
+def make_document(path, count):
+    # Worst case for copying: one /Resources dictionary (a font and an image per page)
+    # shared by every page, and a link on every page to the last page
+    writer = PdfWriter()
+    fonts = DictionaryObject()
+    images = DictionaryObject()
+    for i in range(count):
+        images[NameObject(f"/Im{i}")] = writer._add_object(StreamObject.initialize_from_dictionary({
+            NameObject("/Type"): NameObject("/XObject"),
+            NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(64),
+            NameObject("/Height"): NumberObject(64),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+            NameObject("/BitsPerComponent"): NumberObject(8),
+            "__streamdata__": bytes((i * 7 + k) % 256 for k in range(4096))}))
+        fonts[NameObject(f"/F{i}")] = writer._add_object(DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    resources = writer._add_object(DictionaryObject({NameObject("/Font"): fonts, NameObject("/XObject"): images}))
+
+    pages = []
+    for i in range(count):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"q 100 0 0 100 50 50 cm /Im{i} Do Q BT /F{i} 12 Tf 50 700 Td (Page {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = resources
+        pages.append(page)
+    for page in pages:
+        link = DictionaryObject({
+            NameObject("/Type"): NameObject("/Annot"),
+            NameObject("/Subtype"): NameObject("/Link"),
+            NameObject("/Rect"): ArrayObject([NumberObject(0)] * 4),
+            NameObject("/Dest"): ArrayObject([pages[-1].indirect_reference, NameObject("/Fit")])})
+        page[NameObject("/Annots")] = ArrayObject([writer._add_object(link)])
+    writer.write(path)
+
+def naive_organize(input_path, output_path, page_config):
+    # What organize_pages used to do: add_page() each kept page and rotate it in place
+    reader = PdfReader(input_path)
+    writer = PdfWriter()
+    for item in page_config:
+        page = reader.pages[item['index']]
+        if item['rotate']:
+            page.rotate(item['rotate'])
+        writer.add_page(page)
+    writer.write(output_path)
+
+def run_bench(count=3000, keep=10):
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    input_path = f"tests_output/organize_{count}.pdf"
+    if not os.path.exists(input_path):
+        print(f"Generating a {count}-page PDF...")
+        make_document(input_path, count)
+
+    # Every 300th page rotated by 90, the first one listed twice, plus the link target
+    step = max(1, count // keep)
+    config = [{'index': i, 'rotate': 90} for i in range(0, count, step)][:keep - 1]
+    config.append({'index': count - 1, 'rotate': 0})
+    config.append(dict(config[0]))
+
+    print(f"\nKeeping {len(config)} of {count} pages (one duplicated)")
+    print(f"{'mode':<22} {'wall (s)':>10} {'output (KB)':>12}")
+    results = {}
+    for label, func in (("add_page (old)", naive_organize), ("organize_pages", PDFOps.organize_pages)):
+        out_path = f"tests_output/organized_{count}_{label.split()[0]}.pdf"
+        start = time.perf_counter()
+        func(input_path, out_path, config)
+        wall = time.perf_counter() - start
+        results[label] = out_path
+        print(f"{label:<22} {wall:>10.2f} {os.path.getsize(out_path) / 1024:>12.1f}")
+
+    reader = PdfReader(results["organize_pages"])
+    rotations = [page.rotation for page in reader.pages]
+    expected = [item['rotate'] for item in config]
+    if rotations == expected:
+        print("PASS: Duplicated page rotated once")
+    else:
+        print(f"FAIL: Rotations {rotations}, expected {expected}")
+
+    fonts = set()
+    for page in reader.pages:
+        fonts.update(page["/Resources"]["/Font"].keys())
+    if len(fonts) <= len(config):
+        print(f"PASS: Resources pruned to {len(fonts)} fonts")
+    else:
+        print(f"FAIL: {len(fonts)} fonts copied for {len(config)} pages")
+
+    last = reader.pages[len(config) - 2].indirect_reference
+    dest = reader.pages[0]["/Annots"][0].get_object()["/Dest"][0]
+    if dest.idnum == last.idnum:
+        print("PASS: Links point at the kept pages")
+    else:
+        print("FAIL: Link not remapped")
+
+if __name__ == "__main__":
+    run_bench(*(int(a) for a in sys.argv[1:3]))
@@ -0,0 +1,64 @@
+import importlib.util
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Startup budget (seconds from interpreter start to the first painted window)
+BUDGET = 1.5
+
+# Runs in a fresh interpreter: same import chain as main.py, stops after the first paint
+CHILD = r"""
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, sys.argv[1])
+from PyQt6.QtWidgets import QApplication
+from PyQt6.QtCore import QTimer
+from src.ui.main_window import MainWindow
+imported = time.perf_counter()
+app = QApplication([])
+window = MainWindow()
+window.show()
+def first_paint():
+    shown = time.perf_counter()
+    heavy = [m for m in ("pypdf", "PIL.Image") if m in sys.modules]
+    print(json.dumps({"imports": imported - start, "shown": shown - start, "heavy_loaded": heavy}))
+    app.quit()
+QTimer.singleShot(0, first_paint)
+app.exec()
+"""
+
+def measure_once():
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    out = subprocess.run([sys.executable, "-c", CHILD, ROOT], capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def run_bench(repeats=5):
+    if importlib.util.find_spec("PyQt6") is None:
+        print("SKIP: PyQt6 is not installed")
+        return
+
+    print("Warm-up run (fills the OS file cache)...")
+    measure_once()
+    runs = [measure_once() for _ in range(repeats)]
+    shown = statistics.median(r["shown"] for r in runs)
+    imports = statistics.median(r["imports"] for r in runs)
+    print(f"{'run':>4} {'imports (s)':>12} {'first paint (s)':>16}")
+    for i, r in enumerate(runs, 1):
+        print(f"{i:>4} {r['imports']:>12.3f} {r['shown']:>16.3f}")
+    print(f"median: imports {imports:.3f}s, first window shown {shown:.3f}s")
+
+    if runs[-1]["heavy_loaded"]:
+        print(f"FAIL: {', '.join(runs[-1]['heavy_loaded'])} imported before the first paint")
+    else:
+        print("PASS: pypdf/Pillow deferred until after the first paint")
+    if shown <= BUDGET:
+        print(f"PASS: Startup within {BUDGET:.1f}s budget")
+    else:
+        print(f"FAIL: Startup {shown:.3f}s exceeds {BUDGET:.1f}s budget")
+
+if __name__ == "__main__":
+    run_bench(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,296 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from bench_corpus import LOCKED_PASSWORD, corpus_bytes, corpus_paths, spec
+
+# Times every PDFOps/ImageOps operation on the synthetic corpora of bench_corpus.py
+# and compares the results with a stored baseline:
+#   python tests/bench_suite.py --save-baseline        # on the commit to compare against
+#   python tests/bench_suite.py                        # later: exits with 1 on a regression
+# Each case runs in its own freshly spawned process (its own imports, document
+# cache and peak RSS): warm-up runs first, then the timed repeats. The document
+# cache is cleared before every run, so each run parses its inputs like a new CLI
+# process would. Peak RSS covers the runs only (on Linux; elsewhere it is the
+# peak of the whole case process). Baselines are only meaningful on the machine
+# that recorded them.
+
+OUTPUT_DIR = "tests_output/bench_suite"
+
+# name -> (corpus, operation, options). Operations that take workers get the
+# --workers value (default 1, so timings don't depend on the core count).
+CASES = {
+    "merge.small": ("small", "merge", {}),
+    "merge.small.batched": ("small", "merge", {"batch_size": 100}),
+    "merge.invoices.dedup": ("invoices", "merge", {"dedup": True}),
+    "split.text.pages": ("text", "split", {}),
+    "split.text.range": ("text", "split", {"page_range": "1-20, 100-120"}),
+    "compress.text.low": ("text", "compress", {"level": "low"}),
+    "compress.scans.medium": ("scans", "compress", {"level": "medium"}),
+    "extract.text": ("text", "extract", {}),
+    "extract.text.stream": ("text", "extract", {"stream": True}),
+    "encrypt.text": ("text", "encrypt", {"password": "s3cret", "algorithm": "RC4-128"}),
+    "decrypt.text_locked": ("text_locked", "decrypt", {"password": LOCKED_PASSWORD}),
+    "organize.text.reverse": ("text", "organize", {}), # page_config built from the page count
+    "img2pdf.images": ("images", "img2pdf", {}),
+    "img2pdf.images.stream_a4": ("images", "img2pdf", {"stream": True, "page_size": "A4", "dpi": 150}),
+}
+
+WORKER_OPS = ("split", "compress", "extract", "encrypt", "decrypt", "img2pdf")
+
+# A case regresses when its median is slower than the baseline by more than the
+# tolerance and by more than the noise floor (short cases jitter by milliseconds)
+TIME_TOLERANCE = 0.15
+MIN_TIME_DELTA = 0.02
+MEMORY_TOLERANCE = 0.10
+MIN_MEMORY_DELTA_MB = 8
+
+def _call(op, paths, out_path, options):
+    from src.modules.img_ops import ImageOps
+    from src.modules.pdf_ops import PDFOps
+    if op == "merge":
+        return PDFOps.merge_pdfs(paths, out_path, **options)
+    if op == "img2pdf":
+        return ImageOps.images_to_pdf(paths, out_path, **options)
+    if op == "split":
+        os.makedirs(out_path, exist_ok=True)
+        return PDFOps.split_pdf(paths[0], out_path, **options)
+    if op == "compress":
+        return PDFOps.compress_pdf(paths[0], out_path, **options)
+    if op == "extract":
+        return PDFOps.extract_text(paths[0], out_path, **options)
+    if op == "encrypt":
+        return PDFOps.encrypt_pdf(paths[0], out_path, **options)
+    if op == "decrypt":
+        return PDFOps.decrypt_pdf(paths[0], out_path, **options)
+    if op == "organize":
+        return PDFOps.organize_pages(paths[0], out_path, **options)
+    raise ValueError(f"Unknown operation: {op}")
+
+def case_options(name, workers, page_count=None):
+    corpus, op, options = CASES[name]
+    options = dict(options)
+    if op in WORKER_OPS:
+        options["workers"] = workers
+    if op == "organize":
+        # Every page in reverse order, every other one rotated
+        options["page_config"] = [{'index': i, 'rotate': 90 * (i % 2)} for i in reversed(range(page_count))]
+    return options
+
+def _reset_peak_rss():
+    # Linux: restart this process's high-water mark, so it covers only what follows.
+    # (ru_maxrss can't be reset and even carries over from the parent through exec.)
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+def _peak_rss_mb(since_reset):
+    from src.utils import metrics
+    if since_reset:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    peak = metrics.peak_rss_mb()
+    return None if peak is None else round(peak, 1)
+
+def prepare_corpora(names, scale):
+    # Runs in its own process: generating a corpus must not raise the peak RSS of the cases
+    for corpus in sorted(set(CASES[n][0] for n in names)):
+        corpus_paths(corpus, scale)
+
+def run_case(args):
+    # Runs in a freshly spawned process; returns the summary of one case
+    name, scale, warmups, repeats, workers = args
+    from pypdf import PdfReader
+    from src.modules.doc_cache import document_cache
+    from src.utils import metrics
+
+    corpus, op, _ = CASES[name]
+    paths = corpus_paths(corpus, scale)
+    page_count = len(PdfReader(paths[0]).pages) if op == "organize" else None
+    options = case_options(name, workers, page_count)
+    extension = {"split": "", "extract": ".txt"}.get(op, ".pdf")
+    out_path = os.path.join(OUTPUT_DIR, f"{name}{extension}")
+
+    records = []
+    metrics.add_sink(records.append)
+    walls, runs = [], []
+    reset = _reset_peak_rss()
+    for i in range(warmups + repeats):
+        document_cache.clear()
+        start = time.perf_counter()
+        success, msg = _call(op, paths, out_path, options)
+        wall = time.perf_counter() - start
+        if not success:
+            return {"error": msg}
+        if i >= warmups:
+            walls.append(wall)
+            runs.append(records[-1])
+
+    # Per span: median over the repeats of its total time in one run
+    span_names = sorted(set(s for run in runs for s in run["spans"]))
+    spans = {s: round(statistics.median(run["spans"].get(s, {}).get("seconds", 0.0) for run in runs), 4)
+             for s in span_names}
+    return {
+        "corpus": spec(corpus, scale),
+        "options": {k: v for k, v in options.items() if k != "page_config"},
+        "runs": [round(w, 4) for w in walls],
+        "median": round(statistics.median(walls), 4),
+        "min": round(min(walls), 4),
+        "max": round(max(walls), 4),
+        "peak_rss_mb": _peak_rss_mb(reset),
+        "spans": spans,
+        "counters": runs[-1]["counters"],
+        "message": msg,
+    }
+
+def environment():
+    import PIL
+    import pypdf
+    return {"python": platform.python_version(), "platform": platform.platform(), "machine": platform.machine(),
+            "cpus": os.cpu_count(), "pypdf": pypdf.__version__, "pillow": PIL.__version__}
+
+def compare(results, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Status of every case against baseline: {name: (status, time change or None)}.
+    status: "ok", "faster", "SLOWER", "MORE MEMORY", "new" (not in the baseline)
+            or "changed" (different corpus or options, not comparable).
+    """
+    verdicts = {}
+    for name, case in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            verdicts[name] = ("new", None)
+            continue
+        if base["corpus"] != case["corpus"] or base["options"] != case["options"]:
+            verdicts[name] = ("changed", None)
+            continue
+        change = case["median"] / base["median"] - 1 if base["median"] else 0.0
+        status = "ok"
+        if change > time_tolerance and case["median"] - base["median"] > MIN_TIME_DELTA:
+            status = "SLOWER"
+        elif base["peak_rss_mb"] and case["peak_rss_mb"] \
+                and case["peak_rss_mb"] > base["peak_rss_mb"] * (1 + memory_tolerance) \
+                and case["peak_rss_mb"] - base["peak_rss_mb"] > MIN_MEMORY_DELTA_MB:
+            status = "MORE MEMORY"
+        elif change < -time_tolerance and base["median"] - case["median"] > MIN_TIME_DELTA:
+            status = "faster"
+        verdicts[name] = (status, change)
+    return verdicts
+
+def load_json(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_json(path, data):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=1)
+
+def run_bench(scale="quick", repeats=5, warmups=1, workers=1, only=None, baseline_path=None, save_baseline=False,
+              time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    """
+    Returns the number of regressions against the baseline (0 without one).
+    only: Substrings; run the cases whose name contains any of them.
+    """
+    names = [n for n in CASES if not only or any(part in n for part in only)]
+    if not names:
+        print(f"No case matches {only}; cases: {', '.join(CASES)}")
+        return 0
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    baseline_path = baseline_path or f"tests_output/bench_baseline_{scale}.json"
+
+    # Generated up front, so no case times (or counts the memory of) generating its input
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        pool.submit(prepare_corpora, names, scale).result()
+
+    results = {"environment": environment(), "scale": scale, "repeats": repeats, "warmups": warmups,
+               "recorded": time.strftime("%Y-%m-%d %H:%M:%S"), "cases": {}}
+    baseline = None if save_baseline else load_json(baseline_path)
+    if baseline and baseline.get("environment") != results["environment"]:
+        print(f"Note: {baseline_path} was recorded in a different environment, changes may not be regressions")
+    elif baseline is None and not save_baseline:
+        print(f"No baseline at {baseline_path} (record one with --save-baseline)")
+
+    print(f"\nScale: {scale}, {warmups} warm-up + {repeats} timed run(s) per case, workers={workers}")
+    print(f"{'case':<26} {'input (MB)':>10} {'median (s)':>11} {'min (s)':>8} {'max (s)':>8} "
+          f"{'peak RSS (MB)':>14} {'baseline (s)':>13} {'change':>8}  status")
+    failed = 0
+    for name in names:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            case = pool.submit(run_case, (name, scale, warmups, repeats, workers)).result()
+        if "error" in case:
+            failed += 1
+            print(f"{name:<26} FAIL: {case['error']}")
+            continue
+        results["cases"][name] = case
+        line = (f"{name:<26} {corpus_bytes(CASES[name][0], scale) / (1024 * 1024):>10.1f} {case['median']:>11.3f} "
+                f"{case['min']:>8.3f} {case['max']:>8.3f} {case['peak_rss_mb'] or float('nan'):>14.1f}")
+        if baseline:
+            status, change = compare({"cases": {name: case}}, baseline, time_tolerance, memory_tolerance)[name]
+            base = baseline["cases"].get(name)
+            base_text = f"{base['median']:>13.3f}" if base else f"{'-':>13}"
+            change_text = f"{change:>+8.1%}" if change is not None else f"{'-':>8}"
+            line += f" {base_text} {change_text}  {status}"
+        print(line)
+
+    save_json(os.path.join(OUTPUT_DIR, f"results_{scale}.json"), results)
+    if save_baseline:
+        # --only updates just those cases of an existing baseline
+        stored = load_json(baseline_path) or {}
+        if stored.get("environment") == results["environment"] and stored.get("scale") == scale:
+            stored["cases"].update(results["cases"])
+            results = dict(results, cases=stored["cases"])
+        save_json(baseline_path, results)
+        print(f"\nBaseline saved to {baseline_path}")
+        return failed
+
+    regressions = []
+    if baseline:
+        verdicts = compare(results, baseline, time_tolerance, memory_tolerance)
+        regressions = [n for n, (status, _) in verdicts.items() if status in ("SLOWER", "MORE MEMORY")]
+        if regressions:
+            print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+        else:
+            print("\nNo regressions against the baseline")
+    return len(regressions) + failed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDFOps/ImageOps on synthetic corpora.")
+    parser.add_argument("--full", action="store_true", help="Large corpora (default: quick ones)")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--warmups", type=int, default=1, help="Untimed runs before them")
+    parser.add_argument("--workers", type=int, default=1, help="Passed to operations that take workers")
+    parser.add_argument("--only", action="append", default=None, metavar="TEXT",
+                        help="Only cases whose name contains TEXT (repeatable)")
+    parser.add_argument("--baseline", default=None, metavar="FILE",
+                        help="Baseline to compare with or save (default: tests_output/bench_baseline_<scale>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=TIME_TOLERANCE,
+                        help="Allowed slowdown of the median, e.g. 0.15 = 15%%")
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE,
+                        help="Allowed growth of the peak RSS")
+    args = parser.parse_args(argv)
+    if args.repeats < 1 or args.warmups < 0:
+        parser.error("--repeats must be at least 1 and --warmups at least 0")
+    problems = run_bench("full" if args.full else "quick", args.repeats, args.warmups, args.workers, args.only,
+                         args.baseline, args.save_baseline, args.tolerance, args.memory_tolerance)
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,44 @@
 import os
+import random
+import re
 import sys
 from PIL import Image
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.modules.pdf_ops import PDFOps
 from src.modules.img_ops import ImageOps
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject, StreamObject
+
+# Stand-in for an embedded font file (incompressible, like a real subset font)
+FONT_BYTES = bytes(random.Random(9).randbytes(40000))
+
+def count_objects(path):
+    # Objects actually written ("N 0 obj"); the xref /Size also counts freed numbers
+    with open(path, "rb") as f:
+        return len(re.findall(rb"\d+ 0 obj", f.read()))
+
+def make_invoice(path, number):
+    # One-page invoice embedding its own copy of the shared font
+    writer = PdfWriter()
+    font_file = writer._add_object(StreamObject.initialize_from_dictionary({
+        NameObject("/Length1"): NumberObject(len(FONT_BYTES)), "__streamdata__": FONT_BYTES}))
+    descriptor = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/FontDescriptor"),
+        NameObject("/FontName"): NameObject("/InvoiceSans"),
+        NameObject("/FontFile2"): font_file}))
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/TrueType"),
+        NameObject("/BaseFont"): NameObject("/InvoiceSans"),
+        NameObject("/FontDescriptor"): descriptor}))
+    page = writer.add_blank_page(612, 792)
+    content = DecodedStreamObject()
+    content.set_data(f"BT /F1 12 Tf 50 700 Td (Invoice {number}) Tj ET".encode())
+    page[NameObject("/Contents")] = writer._add_object(content)
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.write(path)
 
 def run_tests():
     print("Starting Setup...")
@@ -34,6 +68,12 @@ def run_tests():
         print("FAIL: PDFs not created")
         return
 
+    stream_path = "tests_output/img_stream.pdf"
+    success, msg = ImageOps.images_to_pdf([img1_path, img2_path], stream_path, stream=True)
+    print(f"Img->PDF (streaming): {success}, {msg}")
+    if not os.path.exists(stream_path):
+        print("FAIL: Streaming PDF not created")
+
     # 2. Test Merge
     print("\n[2] Testing Merge PDF...")
     merged_path = "tests_output/merged.pdf"
@@ -44,6 +84,29 @@ def run_tests():
         print("FAIL: Merged PDF not created")
         return
 
+    # Invoices from one template each embed the same font file: dedup must store it once
+    invoices = []
+    for i in range(4):
+        path = f"tests_output/invoice_{i}.pdf"
+        make_invoice(path, i)
+        invoices.append(path)
+    plain_path = "tests_output/merged_invoices.pdf"
+    dedup_path = "tests_output/merged_invoices_dedup.pdf"
+    success, msg = PDFOps.merge_pdfs(invoices, plain_path)
+    success2, msg2 = PDFOps.merge_pdfs(invoices, dedup_path, dedup=True)
+    print(f"Merge (dedup): {success2}, {msg2}")
+    if success and success2:
+        sizes = os.path.getsize(plain_path), os.path.getsize(dedup_path)
+        objects = [count_objects(p) for p in (plain_path, dedup_path)]
+        print(f"Without dedup: {sizes[0]} bytes, {objects[0]} objects; with: {sizes[1]} bytes, {objects[1]} objects")
+        # Four font copies of FONT_BYTES each vs one: at least three of them must be gone
+        if sizes[0] - sizes[1] >= 3 * len(FONT_BYTES) * 0.9 and objects[1] < objects[0]:
+            print("PASS: Shared font stored once")
+        else:
+            print("FAIL: Shared font was not deduplicated")
+    else:
+        print(f"FAIL: {msg} / {msg2}")
+
     # 3. Test Split
     print("\n[3] Testing Split PDF...")
     split_dir = "tests_output/split"
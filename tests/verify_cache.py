@@ -0,0 +1,150 @@
+import os
+import sys
+import time
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.doc_cache import DocumentCache, document_cache, file_digest
+from src.modules.input_ops import MMAP_MIN_BYTES
+from src.modules.pdf_ops import PDFOps, iter_page_info
+from src.utils.scheduler import JobScheduler
+from verify_input import make_pdf as make_large_pdf
+
+def make_pdf(path, pages, label="Page"):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 50 700 Td ({label} {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.write(path)
+
+def run_tests():
+    print("Starting Setup...")
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    path = "tests_output/cache_doc.pdf"
+    make_pdf(path, 300)
+    document_cache.clear()
+    start = dict(document_cache.stats())
+
+    print("\n[1] One parse for split, extract, open and organize...")
+    PDFOps.split_pdf(path, "tests_output", page_range="1-2", workers=1)
+    PDFOps.extract_text(path, "tests_output/cache_doc.txt", workers=1)
+    pages = sum(len(batch) for batch in iter_page_info(path))
+    success, msg = PDFOps.organize_pages(path, "tests_output/cache_organized.pdf",
+                                         [{'index': 2, 'rotate': 90}, {'index': 0, 'rotate': 0}])
+    stats = document_cache.stats()
+    misses = stats["misses"] - start["misses"]
+    hits = stats["hits"] - start["hits"]
+    if success and pages == 300 and misses == 1 and hits == 3:
+        print(f"PASS: 1 miss, 3 hits ({stats['documents']} cached, {stats['bytes'] // 1024} KB)")
+    else:
+        print(f"FAIL: {misses} misses, {hits} hits, {msg}")
+    texts = [p.extract_text() for p in PdfReader("tests_output/cache_organized.pdf").pages]
+    if texts == ["Page 3", "Page 1"]:
+        print("PASS: Cached reader left untouched by earlier operations")
+    else:
+        print(f"FAIL: {texts}")
+
+    print("\n[2] Changed file is parsed again...")
+    time.sleep(0.01)
+    make_pdf(path, 5, label="Edited")
+    PDFOps.extract_text(path, "tests_output/cache_doc.txt", workers=1)
+    with open("tests_output/cache_doc.txt", encoding="utf-8") as f:
+        text = f.read()
+    if "Edited 5" in text and document_cache.stats()["misses"] == start["misses"] + 2:
+        print("PASS: New contents picked up")
+    else:
+        print("FAIL: Stale reader served")
+
+    print("\n[3] Same file merged twice...")
+    success, msg = PDFOps.merge_pdfs([path, path], "tests_output/cache_merged.pdf")
+    texts = [p.extract_text() for p in PdfReader("tests_output/cache_merged.pdf").pages]
+    if success and texts == [f"Edited {i}" for i in range(1, 6)] * 2:
+        print("PASS: 10 pages")
+    else:
+        print(f"FAIL: {msg} {texts}")
+
+    print("\n[4] Memory budget...")
+    paths = []
+    for i in range(4):
+        paths.append(f"tests_output/cache_small_{i}.pdf")
+        make_pdf(paths[-1], 5, label=f"Doc{i}")
+    probe = DocumentCache()
+    with probe.open(paths[0]) as reader:
+        len(reader.pages)
+    cache = DocumentCache(max_bytes=3 * probe.total_bytes + probe.total_bytes // 2) # Room for 3 documents
+    for p in paths:
+        with cache.open(p) as reader:
+            len(reader.pages)
+    with cache.open(paths[0]) as reader:
+        pass # Evicted
+    with cache.open(paths[3]) as reader:
+        pass
+    if cache.total_bytes <= cache.max_bytes and cache.hits == 1 and cache.misses == 5:
+        print(f"PASS: Oldest evicted, {cache.stats()['documents']} documents within budget")
+    else:
+        print(f"FAIL: {cache.stats()}")
+
+    print("\n[5] Passwords are part of the key...")
+    locked = "tests_output/cache_locked.pdf"
+    PDFOps.encrypt_pdf(path, locked, "s3cret")
+    PDFOps.organize_pages(locked, "tests_output/cache_locked_out.pdf", [{'index': 0, 'rotate': 0}], password="s3cret")
+    success, msg = PDFOps.organize_pages(locked, "tests_output/cache_locked_bad.pdf",
+                                         [{'index': 0, 'rotate': 0}], password="wrong")
+    if not success and "Incorrect password" in msg:
+        print("PASS: Cached unlocked reader not handed out for a wrong password")
+    else:
+        print(f"FAIL: {msg}")
+
+    print("\n[6] Opening never hashes the file...")
+    cache = DocumentCache()
+    with cache.open(path) as reader:
+        len(reader.pages)
+    hashed_on_open = len(cache._digests)
+    if hashed_on_open == 0 and cache.digest(path) == file_digest(path) and len(cache._digests) == 1:
+        print("PASS: Keyed by file state, digest computed on request")
+    else:
+        print(f"FAIL: {hashed_on_open} digests after open")
+
+    print("\n[7] Large (memory-mapped) files are cached too...")
+    large = "tests_output/cache_large.pdf"
+    make_large_pdf(large, 20, padding=MMAP_MIN_BYTES // 10)
+    start = dict(document_cache.stats())
+    PDFOps.split_pdf(large, "tests_output", page_range="1", workers=1)
+    PDFOps.extract_text(large, "tests_output/cache_large.txt", workers=1)
+    success, msg = PDFOps.organize_pages(large, "tests_output/cache_large_organized.pdf", [{'index': 1, 'rotate': 0}])
+    stats = document_cache.stats()
+    misses = stats["misses"] - start["misses"]
+    hits = stats["hits"] - start["hits"]
+    if success and os.path.getsize(large) >= MMAP_MIN_BYTES and misses == 1 and hits == 2:
+        print(f"PASS: 1 miss, 2 hits for a {os.path.getsize(large) // 1024} KB file")
+    else:
+        print(f"FAIL: {misses} misses, {hits} hits, {msg}")
+
+    print("\n[8] Thread jobs reuse the reader the Visual Editor loaded...")
+    pages = sum(len(batch) for batch in iter_page_info(large)) # What DocumentLoader does
+    start = dict(document_cache.stats())
+    scheduler = JobScheduler(max_workers=1)
+    try:
+        job_id = scheduler.submit(PDFOps.organize_pages, large, "tests_output/cache_large_saved.pdf",
+                                  [{'index': i, 'rotate': 0} for i in reversed(range(pages))], in_process=False)
+        success, msg = scheduler.result(job_id)
+    finally:
+        scheduler.shutdown(wait=True)
+    stats = document_cache.stats()
+    if success and stats["hits"] == start["hits"] + 1 and stats["misses"] == start["misses"]:
+        print("PASS: Saved from the cached reader, no second parse")
+    else:
+        print(f"FAIL: {stats}, {msg}")
+
+if __name__ == "__main__":
+    run_tests()
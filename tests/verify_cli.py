@@ -0,0 +1,115 @@
+import io
+import json
+import os
+import shutil
+import sys
+from contextlib import redirect_stderr, redirect_stdout
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.cli import main
+from src.modules.batch_ops import process_batch
+from src.modules.pdf_ops import PDFOps
+from src.utils.scheduler import JobScheduler
+
+def report_pid(input_path, output_path):
+    # Batch operation that fails on purpose, so the summary lists where each file ran
+    return False, f"pid {os.getpid()}"
+
+def pool_pid():
+    return True, str(os.getpid())
+
+def run_cli(*argv):
+    buf = io.StringIO()
+    with redirect_stdout(buf):
+        code = main(list(argv))
+    return code, [json.loads(line) for line in buf.getvalue().splitlines()]
+
+def run_tests():
+    print("Starting Setup...")
+    in_dir = "tests_output/cli_in"
+    out_dir = "tests_output/cli_out"
+    shutil.rmtree(in_dir, ignore_errors=True) # Outputs of an earlier run would become inputs
+    os.makedirs(in_dir)
+    
+    images = []
+    for i, color in enumerate(['red', 'green', 'blue']):
+        path = f"{in_dir}/img_{i}.png"
+        Image.new('RGB', (100, 100), color=color).save(path)
+        images.append(path)
+    
+    print("\n[1] img2pdf + merge...")
+    code, lines = run_cli("img2pdf", *images, "-o", f"{in_dir}/doc.pdf")
+    print(lines[-1]["message"])
+    code2, lines = run_cli("merge", f"{in_dir}/*.pdf", f"{in_dir}/doc.pdf", "-o", f"{in_dir}/merged.pdf")
+    if code == 0 and code2 == 0 and lines[0]["inputs"] == 1:
+        print("PASS: Globs expanded without duplicates")
+    else:
+        print(f"FAIL: {code} {code2} {lines}")
+
+    print("\n[2] Batch compress over a folder...")
+    code, lines = run_cli("compress", in_dir, "-o", out_dir, "--level", "high", "-j", "2")
+    summary = lines[-1]
+    if code == 0 and summary["summary"] and summary["succeeded"] == 2 and len(lines) == 3:
+        print("PASS: One JSON line per file plus summary")
+    else:
+        print(f"FAIL: {code} {lines}")
+
+    print("\n[3] Manifest with a missing file...")
+    manifest = f"{in_dir}/list.txt"
+    with open(manifest, "w") as f:
+        f.write("# inputs\ndoc.pdf\nmissing.pdf\n")
+    code, lines = run_cli("split", "--manifest", manifest, "-o", f"{out_dir}/split")
+    failed = [r for r in lines if not r.get("summary") and not r["success"]]
+    if code == 1 and len(failed) == 1 and failed[0]["input"].endswith("missing.pdf"):
+        print("PASS: Failure reported per file with non-zero exit")
+    else:
+        print(f"FAIL: {code} {lines}")
+
+    print("\n[4] Headless import...")
+    if "PyQt6" not in sys.modules:
+        print("PASS: PyQt6 not imported")
+    else:
+        print("FAIL: PyQt6 was imported")
+
+    # GUI batch mode: one scheduler job, one summary
+    print("\n[5] Batch job through the scheduler...")
+    scheduler = JobScheduler(max_workers=1)
+    files = [f"{in_dir}/doc.pdf", f"{in_dir}/merged.pdf", f"{in_dir}/missing.pdf"]
+    job_id = scheduler.submit(process_batch, PDFOps.compress_pdf, files, f"{out_dir}/batch",
+                              "{index}_{name}", ".pdf", ("high",), in_process=False)
+    success, msg = scheduler.result(job_id)
+    scheduler.shutdown(wait=True)
+    print(msg)
+    if success and msg.startswith("2 of 3 files succeeded") and os.path.exists(f"{out_dir}/batch/1_doc.pdf"):
+        print("PASS: Combined summary with the failed file listed")
+    else:
+        print("FAIL: Unexpected batch result")
+
+    print("\n[6] Invalid name template...")
+    err = io.StringIO()
+    try:
+        with redirect_stderr(err):
+            run_cli("compress", in_dir, "-o", out_dir, "--name", "{nme}")
+        code = 0
+    except SystemExit as e:
+        code = e.code
+    if code == 2 and "--name" in err.getvalue():
+        print("PASS: Usage error instead of a traceback")
+    else:
+        print(f"FAIL: {code} {err.getvalue()}")
+
+    print("\n[7] Batch files run on the scheduler's own processes...")
+    scheduler = JobScheduler(max_workers=1)
+    _, worker = scheduler.result(scheduler.submit(pool_pid))
+    job_id = scheduler.submit(process_batch, report_pid, files[:2], f"{out_dir}/pids", workers=2, in_process=False)
+    success, msg = scheduler.result(job_id)
+    scheduler.shutdown(wait=True)
+    pids = [line.rsplit(" ", 1)[1] for line in msg.splitlines()[1:]]
+    if len(pids) == 2 and set(pids) == {worker} and worker != str(os.getpid()):
+        print(f"PASS: Both files ran in pool process {worker}, no second pool")
+    else:
+        print(f"FAIL: {pids} vs pool process {worker}")
+
+if __name__ == "__main__":
+    run_tests()
@@ -1,11 +1,39 @@
 import os
 import sys
+import zlib
 from PIL import Image
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject, StreamObject
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.modules.pdf_ops import PDFOps
 from src.modules.img_ops import ImageOps
 
+def make_masked_pdf(path):
+    # Two pages drawing the same pixels (separate objects) under different soft masks
+    writer = PdfWriter()
+    pixels = Image.effect_noise((1200, 1200), 40).convert('RGB').tobytes()
+    for alpha in (0, 255):
+        mask = StreamObject.initialize_from_dictionary({
+            NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(1200), NameObject("/Height"): NumberObject(1200),
+            NameObject("/ColorSpace"): NameObject("/DeviceGray"), NameObject("/BitsPerComponent"): NumberObject(8),
+            NameObject("/Filter"): NameObject("/FlateDecode"),
+            "__streamdata__": zlib.compress(bytes([alpha]) * 1200 * 1200)})
+        image = StreamObject.initialize_from_dictionary({
+            NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+            NameObject("/Width"): NumberObject(1200), NameObject("/Height"): NumberObject(1200),
+            NameObject("/ColorSpace"): NameObject("/DeviceRGB"), NameObject("/BitsPerComponent"): NumberObject(8),
+            NameObject("/Filter"): NameObject("/FlateDecode"), NameObject("/SMask"): writer._add_object(mask),
+            "__streamdata__": zlib.compress(pixels)})
+        page = writer.add_blank_page(288, 288) # 4 inches: the image is 300 DPI
+        content = DecodedStreamObject()
+        content.set_data(b"q 288 0 0 288 0 0 cm /Im0 Do Q")
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/XObject"): DictionaryObject({NameObject("/Im0"): writer._add_object(image)})})
+    writer.write(path)
+
 def run_tests():
     print("Starting Setup...")
     # Setup dummy assets
@@ -26,16 +54,45 @@ def run_tests():
     orig_size = os.path.getsize(pdf_path)
     print(f"Created PDF: {orig_size} bytes")
 
-    # Test Compression (Levels ignored in pypdf fallback, but API exists)
-    for level in ["low", "medium", "high"]:
-        out_path = f"tests_output/compressed_{level}.pdf"
-        success, msg = PDFOps.compress_pdf(pdf_path, out_path, level)
-        if success:
-            new_size = os.path.getsize(out_path)
-            ratio = 100 * (orig_size - new_size) / orig_size
-            print(f"[{level.upper()}] Success: {new_size} bytes (Reduced {ratio:.2f}%)")
+    # Saved as a 300 DPI scan so medium/high have something to downsample
+    scan_path = "tests_output/large_scan.pdf"
+    Image.effect_noise((2000, 2000), 40).convert('RGB').save(scan_path, resolution=300)
+
+    for src_path in [pdf_path, scan_path]:
+        orig_size = os.path.getsize(src_path)
+        print(f"\n{src_path}: {orig_size} bytes")
+        sizes = []
+        for level in ["low", "medium", "high"]:
+            out_path = src_path.replace(".pdf", f"_compressed_{level}.pdf")
+            success, msg = PDFOps.compress_pdf(src_path, out_path, level)
+            if success:
+                new_size = os.path.getsize(out_path)
+                sizes.append(new_size)
+                ratio = 100 * (orig_size - new_size) / orig_size
+                print(f"[{level.upper()}] Success: {new_size} bytes (Reduced {ratio:.2f}%)")
+                print(f"    {msg}")
+            else:
+                print(f"[{level.upper()}] Failed: {msg}")
+
+        if len(sizes) == 3 and sizes[0] <= orig_size and sizes[0] >= sizes[1] >= sizes[2]:
+            print("PASS: Higher levels never produce larger files")
         else:
-            print(f"[{level.upper()}] Failed: {msg}")
+            print("FAIL: Level sizes out of order")
+
+    print("\nSame image under different soft masks...")
+    masked_path = "tests_output/masked.pdf"
+    make_masked_pdf(masked_path)
+    out_path = "tests_output/masked_compressed_medium.pdf"
+    success, msg = PDFOps.compress_pdf(masked_path, out_path, "medium", workers=1)
+    alphas = []
+    if success:
+        for page in PdfReader(out_path).pages:
+            image = page["/Resources"]["/XObject"]["/Im0"].get_object()
+            alphas.append(set(image["/SMask"].get_object().get_data()))
+    if alphas == [{0}, {255}]:
+        print(f"PASS: Each page keeps its own mask ({msg})")
+    else:
+        print(f"FAIL: {success} {msg} masks {alphas}")
 
 if __name__ == "__main__":
     run_tests()
@@ -1,11 +1,28 @@
 import os
 import sys
-from PIL import Image
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 from src.modules.pdf_ops import PDFOps
-from src.modules.img_ops import ImageOps
+from src.utils import scheduler
 from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+TEXT_PAGES = 6
+
+def make_text_pdf(path, pages):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td (Hello World from page {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.write(path)
 
 def run_tests():
     print("Starting Setup...")
@@ -13,35 +30,11 @@ def run_tests():
     if not os.path.exists("tests_output"):
         os.makedirs("tests_output")
     
-    # Create a real text-based PDF for testing extraction
+    # A multi-page text PDF built with pypdf: every page draws its own line with the
+    # standard Helvetica font, so each extraction path has real text to agree on
     text_pdf_path = "tests_output/text_sample.pdf"
-    
-    # We can't easily create a text PDF with pypdf from scratch purely with text 
-    # (it mainly manipulates existing ones).
-    # But we can create a reportlab PDF or just accept that our 'images' pdf yields empty text.
-    # However, to be thorough, let's use reportlab if available, or just skip full text content verification 
-    # and check if the function runs without error using pdfplumber against our image PDF.
-    # pdfplumber should return empty string for images.
-    
-    # Let's try to import reportlab
-    try:
-        from reportlab.pdfgen import canvas
-        c = canvas.Canvas(text_pdf_path)
-        c.drawString(100, 750, "Hello World from PDFPlumber Test")
-        c.save()
-        print("Created Text PDF using ReportLab.")
-        has_text = True
-    except ImportError:
-        print("ReportLab not found. Using Image PDF (expect empty text).")
-        # Use our image PDF from previous steps
-        text_pdf_path = "tests_output/merged.pdf" 
-        # (Assuming verify.py ran before, or we recreate it)
-        if not os.path.exists(text_pdf_path):
-             # Create a quick dummy image pdf
-             img_path = "tests_output/dummy.jpg"
-             Image.new('RGB', (100, 100), color='white').save(img_path)
-             ImageOps.images_to_pdf([img_path], text_pdf_path)
-        has_text = False
+    make_text_pdf(text_pdf_path, TEXT_PAGES)
+    print(f"Created {TEXT_PAGES}-page text PDF.")
 
     txt_out = "tests_output/extracted_plumber.txt"
     success, msg = PDFOps.extract_text(text_pdf_path, txt_out)
@@ -52,12 +45,32 @@ def run_tests():
         with open(txt_out, "r", encoding="utf-8") as f:
             content = f.read()
             print(f"Extracted Content: '{content.strip()}'")
-            if has_text and "Hello World" in content:
+            if all(f"Hello World from page {i + 1}" in content for i in range(TEXT_PAGES)):
                 print("PASS: Found expected text.")
-            elif not has_text:
-                print("PASS: Ran successfully on image PDF.")
+            else:
+                print("FAIL: Expected text missing from output.")
     else:
         print("FAIL: Output file not found.")
 
+    # Parallel and streaming extraction must write exactly what the serial path writes.
+    # Workers are capped by the core budget; raise it so the pool runs on one core too.
+    scheduler._worker_budget = 2
+    variants = [
+        ("Parallel", "tests_output/extracted_parallel.txt", {"workers": 2}),
+        ("Streaming", "tests_output/extracted_stream.txt", {"stream": True, "flush_every": 1}),
+    ]
+    for label, variant_out, kwargs in variants:
+        success, msg = PDFOps.extract_text(text_pdf_path, variant_out, **kwargs)
+        print(f"{label} extraction result: {success}, {msg}")
+        if success and os.path.exists(variant_out):
+            with open(txt_out, "rb") as a, open(variant_out, "rb") as b:
+                expected, actual = a.read(), b.read()
+                if expected.strip() and expected == actual:
+                    print(f"PASS: {label} output matches serial output.")
+                else:
+                    print(f"FAIL: {label} output differs from serial output.")
+        else:
+            print(f"FAIL: {label} output file not found.")
+
 if __name__ == "__main__":
     run_tests()
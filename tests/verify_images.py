@@ -0,0 +1,121 @@
+import os
+import random
+import sys
+from PIL import Image
+from pypdf import PdfReader
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.img_ops import ImageOps
+
+def noisy_image(mode, size, seed):
+    # Noise so a re-encode can't reproduce the source bytes by accident
+    rng = random.Random(seed)
+    bands = len(mode)
+    return Image.frombytes(mode, size, rng.randbytes(size[0] * size[1] * bands))
+
+def read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def page_images(pdf_path):
+    # [(image XObject, page), ...] for every image drawn on a page
+    images = []
+    for page in PdfReader(pdf_path).pages:
+        for obj in page["/Resources"]["/XObject"].values():
+            images.append((obj.get_object(), page))
+    return images
+
+def run_tests():
+    print("Starting Setup...")
+    out_dir = "tests_output/images"
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+
+    photo = os.path.join(out_dir, "photo.jpg")
+    noisy_image("RGB", (320, 240), 1).save(photo, "JPEG", quality=90)
+    gray = os.path.join(out_dir, "gray.jpg")
+    noisy_image("L", (200, 300), 2).save(gray, "JPEG", quality=90)
+    progressive = os.path.join(out_dir, "progressive.jpg")
+    noisy_image("RGB", (160, 120), 3).save(progressive, "JPEG", quality=90, progressive=True)
+    screenshot = os.path.join(out_dir, "screenshot.png")
+    noisy_image("RGB", (160, 120), 4).save(screenshot, "PNG")
+
+    print("\n[1] Baseline JPEGs are embedded byte for byte...")
+    pdf_path = os.path.join(out_dir, "passthrough.pdf")
+    success, msg = ImageOps.images_to_pdf([photo, gray], pdf_path, stream=True)
+    print(f"Img->PDF: {success}, {msg}")
+    images = page_images(pdf_path) if success else []
+    sources = [read_bytes(p) for p in (photo, gray)]
+    if (len(images) == 2
+            and all(img["/Filter"] == "/DCTDecode" and img._data == src for (img, _), src in zip(images, sources))
+            and [img["/ColorSpace"] for img, _ in images] == ["/DeviceRGB", "/DeviceGray"]
+            and "2 JPEGs embedded" in msg):
+        print("PASS: Image streams are the source JPEGs, /DCTDecode, matching colorspace")
+    else:
+        print(f"FAIL: {[(img.get('/Filter'), img.get('/ColorSpace')) for img, _ in images]}")
+
+    print("\n[2] Progressive JPEGs and PNGs are re-encoded, in input order...")
+    pdf_path = os.path.join(out_dir, "fallback.pdf")
+    inputs = [progressive, photo, screenshot]
+    success, msg = ImageOps.images_to_pdf(inputs, pdf_path, stream=True)
+    print(f"Img->PDF: {success}, {msg}")
+    images = page_images(pdf_path) if success else []
+    sizes = [(img["/Width"], img["/Height"]) for img, _ in images]
+    if (sizes == [(160, 120), (320, 240), (160, 120)] and "1 JPEGs embedded" in msg
+            and images[0][0]._data != read_bytes(progressive)
+            and all(img["/Filter"] == "/DCTDecode" for img, _ in images)):
+        print("PASS: Only the baseline JPEG passed through, pages in input order")
+    else:
+        print(f"FAIL: {sizes}, {msg}")
+
+    print("\n[3] EXIF rotation is applied before the page is sized...")
+    rotated = os.path.join(out_dir, "rotated.jpg")
+    exif = Image.Exif()
+    exif[0x0112] = 6 # Stored landscape, displayed rotated 90 degrees clockwise (portrait)
+    noisy_image("RGB", (300, 200), 5).save(rotated, "JPEG", quality=90, exif=exif)
+    pdf_path = os.path.join(out_dir, "rotated.pdf")
+    success, msg = ImageOps.images_to_pdf([rotated], pdf_path, stream=True)
+    print(f"Img->PDF: {success}, {msg}")
+    images = page_images(pdf_path) if success else []
+    box = [round(float(v)) for v in images[0][1].mediabox] if images else None
+    if images and (images[0][0]["/Width"], images[0][0]["/Height"]) == (200, 300) and box == [0, 0, 200, 300]:
+        print("PASS: Rotated to 200x300 pixels on a 200x300 pt page")
+    else:
+        print(f"FAIL: page {box}, {msg}")
+
+    print("\n[4] Transparency is flattened onto white, without a soft mask...")
+    overlay = os.path.join(out_dir, "overlay.png")
+    rgba = Image.new("RGBA", (100, 100), (0, 0, 0, 0)) # Fully transparent...
+    rgba.paste((0, 0, 255, 255), (50, 0, 100, 100)) # ...except a blue right half
+    rgba.save(overlay, "PNG")
+    pdf_path = os.path.join(out_dir, "overlay.pdf")
+    success, msg = ImageOps.images_to_pdf([overlay], pdf_path, stream=True)
+    print(f"Img->PDF: {success}, {msg}")
+    images = page_images(pdf_path) if success else []
+    if images:
+        pixels = PdfReader(pdf_path).pages[0].images[0].image
+        left, right = pixels.getpixel((10, 50)), pixels.getpixel((90, 50))
+    if (images and "/SMask" not in images[0][0] and images[0][0]["/ColorSpace"] == "/DeviceRGB"
+            and pixels.mode == "RGB" and min(left) > 240 and right[2] > 200 and right[0] < 40):
+        print("PASS: RGB image, no /SMask, transparent half is white")
+    else:
+        print(f"FAIL: {msg}")
+
+    print("\n[5] A fixed page size fits, turns and downsamples images...")
+    large = os.path.join(out_dir, "large_landscape.jpg")
+    noisy_image("RGB", (2000, 1500), 6).save(large, "JPEG", quality=90)
+    pdf_path = os.path.join(out_dir, "a4.pdf")
+    success, msg = ImageOps.images_to_pdf([large, rotated], pdf_path, stream=True, page_size="A4", dpi=72)
+    print(f"Img->PDF: {success}, {msg}")
+    images = page_images(pdf_path) if success else []
+    boxes = [[round(float(v)) for v in page.mediabox] for _, page in images]
+    sizes = [(img["/Width"], img["/Height"]) for img, _ in images]
+    # 4:3 image on a landscape A4 page: fitted to the 595 pt height, so 794x595 pixels
+    # at 72 DPI. The 200x300 portrait image is already below 72 DPI and keeps its pixels.
+    if boxes == [[0, 0, 842, 595], [0, 0, 595, 842]] and sizes == [(794, 595), (200, 300)]:
+        print("PASS: Pages are A4 in the image's orientation, large image downsampled to 72 DPI")
+    else:
+        print(f"FAIL: pages {boxes}, images {sizes}")
+
+if __name__ == "__main__":
+    run_tests()
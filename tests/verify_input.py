@@ -0,0 +1,159 @@
+import os
+import sys
+import time
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject, NumberObject
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules import input_ops
+from src.modules.doc_cache import DocumentCache, document_cache
+from src.modules.input_ops import MMAP_MIN_BYTES, open_input
+from src.modules.output_ops import AtomicOutput
+from src.modules.pdf_ops import PDFOps, open_reader
+from src.utils.scheduler import JobScheduler
+
+def make_pdf(path, pages, label="Page", padding=0):
+    # padding: bytes of random image data per page, to get past MMAP_MIN_BYTES
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 50 700 Td ({label} {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        resources = DictionaryObject({NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+        if padding:
+            image = DecodedStreamObject()
+            image.set_data(os.urandom(padding))
+            image.update({NameObject("/Type"): NameObject("/XObject"), NameObject("/Subtype"): NameObject("/Image"),
+                          NameObject("/Width"): NumberObject(padding), NameObject("/Height"): NumberObject(1),
+                          NameObject("/ColorSpace"): NameObject("/DeviceGray"),
+                          NameObject("/BitsPerComponent"): NumberObject(8)})
+            resources[NameObject("/XObject")] = DictionaryObject({NameObject("/Im0"): writer._add_object(image)})
+        page[NameObject("/Resources")] = resources
+    writer.write(path)
+
+def maps_file(path):
+    # Runs in a pool worker: does this process still map path? (None: can't tell)
+    try:
+        with open("/proc/self/maps", encoding="utf-8") as f:
+            return any(line.rstrip().endswith(os.path.realpath(path)) for line in f)
+    except OSError:
+        return None
+
+def page_texts(path):
+    return [p.extract_text() for p in PdfReader(path).pages]
+
+def run_tests():
+    print("Starting Setup...")
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    big = "tests_output/input_big.pdf"
+    small = "tests_output/input_small.pdf"
+    make_pdf(big, 40, padding=MMAP_MIN_BYTES // 20)
+    make_pdf(small, 3)
+    document_cache.clear()
+
+    print("\n[1] Large files are mapped, small ones read...")
+    mapped = type(open_input(big)).__name__
+    copied = type(open_input(small)).__name__
+    if mapped == "mmap" and copied == "BytesIO":
+        print("PASS: mmap / BytesIO")
+    else:
+        print(f"FAIL: {mapped} / {copied}")
+
+    print("\n[2] Fallback when mapping is off or refused...")
+    empty = "tests_output/input_empty.pdf"
+    open(empty, "wb").close()
+    input_ops.USE_MMAP = False
+    try:
+        off = type(open_input(big)).__name__
+    finally:
+        input_ops.USE_MMAP = True
+    forced = type(open_input(big, allow_map=False)).__name__
+    try:
+        open_reader(empty)
+        empty_result = "opened"
+    except Exception as e:
+        empty_result = type(e).__name__
+    if off == "BytesIO" and forced == "BytesIO" and empty_result == "EmptyFileError":
+        print(f"PASS: Read into memory ({empty_result} for an empty file, as before)")
+    else:
+        print(f"FAIL: {off} {forced} {empty_result}")
+
+    print("\n[3] Same results from a mapped file...")
+    PDFOps.split_pdf(big, "tests_output", page_range="5-6", workers=1)
+    PDFOps.extract_text(big, "tests_output/input_big.txt", workers=2)
+    with open("tests_output/input_big.txt", encoding="utf-8") as f:
+        text = f.read()
+    split = page_texts("tests_output/input_big_page_5.pdf")
+    if split == ["Page 5"] and "Page 1" in text and "Page 40" in text:
+        print("PASS: Split and extract (with a pool) match")
+    else:
+        print(f"FAIL: {split} {text[:60]!r}")
+
+    print("\n[4] Mapped input overwritten in place...")
+    results = []
+    results.append(PDFOps.organize_pages(big, big, [{'index': 1, 'rotate': 0}, {'index': 0, 'rotate': 0}]))
+    results.append(PDFOps.encrypt_pdf(big, big, "s3cret"))
+    results.append(PDFOps.decrypt_pdf(big, big, "s3cret"))
+    texts = page_texts(big)
+    if all(ok for ok, _ in results) and texts == ["Page 2", "Page 1"]:
+        print("PASS: Organize, lock and unlock in place")
+    else:
+        print(f"FAIL: {results} {texts}")
+
+    print("\n[5] Mapped readers are cached and their map closed when dropped...")
+    document_cache.clear()
+    make_pdf(big, 40, padding=MMAP_MIN_BYTES // 20)
+    with document_cache.open(big) as reader:
+        stream = reader.stream
+        mapped = input_ops.is_mapped(reader)
+    cached = not stream.closed and document_cache.stats()["documents"] == 1
+    hits = document_cache.stats()["hits"]
+    PDFOps.extract_text(big, "tests_output/input_big.txt", workers=1)
+    hit = document_cache.stats()["hits"] == hits + 1
+    document_cache.forget(big)
+    forgotten = stream.closed and document_cache.stats()["documents"] == 0
+    other = "tests_output/input_big_2.pdf"
+    make_pdf(other, 40, padding=MMAP_MIN_BYTES // 20)
+    cache = DocumentCache()
+    with cache.open(big) as reader:
+        stream = reader.stream
+        len(reader.pages)
+    cache.max_bytes = cache.total_bytes * 3 // 2 # Room for one
+    with cache.open(other) as reader:
+        len(reader.pages)
+    evicted = stream.closed and cache.stats()["documents"] == 1
+    if mapped and cached and hit and forgotten and evicted:
+        print("PASS: Kept and hit, map closed when forgotten or evicted")
+    else:
+        print(f"FAIL: mapped {mapped}, cached {cached}, hit {hit}, forgotten {forgotten}, evicted {evicted}")
+
+    print("\n[6] An input opened in a pool process can be replaced...")
+    scheduler = JobScheduler(max_workers=1) # One worker: it lives on after each job
+    try:
+        scheduler.result(scheduler.submit(PDFOps.extract_text, big, "tests_output/input_worker.txt", workers=1))
+        held = scheduler._executor(True).submit(maps_file, big).result()
+        time.sleep(0.01)
+        make_pdf("tests_output/input_new.pdf", 2, label="Edited", padding=MMAP_MIN_BYTES)
+        with AtomicOutput(big) as f, open("tests_output/input_new.pdf", "rb") as src:
+            f.write(src.read())
+        job_id = scheduler.submit(PDFOps.extract_text, big, "tests_output/input_worker.txt", workers=1)
+        success, msg = scheduler.result(job_id)
+    finally:
+        scheduler.shutdown(wait=True)
+    with open("tests_output/input_worker.txt", encoding="utf-8") as f:
+        text = f.read()
+    if held is None:
+        print("SKIP: /proc/self/maps not available")
+    elif not held and success and "Edited 2" in text and "Page 40" not in text:
+        print("PASS: Worker holds no map after its job, reads the new file next time")
+    else:
+        print(f"FAIL: still mapped {held}, {msg} {text[:40]!r}")
+
+if __name__ == "__main__":
+    run_tests()
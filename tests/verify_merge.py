@@ -0,0 +1,105 @@
+import os
+import sys
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, IndirectObject, NameObject,
+                           NullObject, NumberObject, TextStringObject)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.merge_ops import StreamingMerger
+from src.modules.pdf_ops import PDFOps
+from verify import make_invoice
+
+def make_letter(path, number, pages):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    for i in range(pages):
+        page = writer.add_blank_page(300, 300)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 20 250 Td (Letter {number} page {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.write(path)
+
+def widget(field, **extra):
+    annot = DictionaryObject({
+        NameObject("/Type"): NameObject("/Annot"),
+        NameObject("/Subtype"): NameObject("/Widget"),
+        NameObject("/Rect"): ArrayObject([NumberObject(v) for v in (10, 10, 110, 30)]),
+        NameObject("/Parent"): field})
+    annot.update({NameObject(k): v for k, v in extra.items()})
+    return annot
+
+def form_writer():
+    # One page whose widget annotation sits inline in /Annots and points at its form
+    # field through /Parent, plus a reference to an object the file doesn't have
+    writer = PdfWriter()
+    page = writer.add_blank_page(300, 300)
+    field = writer._add_object(DictionaryObject({
+        NameObject("/FT"): NameObject("/Tx"),
+        NameObject("/T"): TextStringObject("customer")}))
+    page[NameObject("/Annots")] = ArrayObject([widget(field, **{"/Popup": IndirectObject(999, 0, writer)})])
+    return writer
+
+def page_texts(path):
+    return [page.extract_text().strip() for page in PdfReader(path).pages]
+
+def run_tests():
+    print("Starting Setup...")
+    out_dir = "tests_output/merge"
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    letters = []
+    for i in range(5):
+        path = os.path.join(out_dir, f"letter_{i}.pdf")
+        make_letter(path, i, 1 + i % 2)
+        letters.append(path)
+
+    print("\n[1] Batched merge keeps every page, in order...")
+    plain = os.path.join(out_dir, "letters.pdf")
+    batched = os.path.join(out_dir, "letters_batched.pdf")
+    success, msg = PDFOps.merge_pdfs(letters, plain)
+    success2, msg2 = PDFOps.merge_pdfs(letters, batched, batch_size=2)
+    print(f"Merge (batched): {success2}, {msg2}")
+    texts = page_texts(batched) if success2 else []
+    if success and texts and texts == page_texts(plain) and len(texts) == 7:
+        print("PASS: Same 7 pages as the in-memory merge")
+    else:
+        print(f"FAIL: {texts}")
+
+    print("\n[2] Batched dedup stores a font shared across batches once...")
+    invoices = []
+    for i in range(4):
+        path = os.path.join(out_dir, f"invoice_{i}.pdf")
+        make_invoice(path, i)
+        invoices.append(path)
+    sizes = []
+    for dedup in (False, True):
+        path = os.path.join(out_dir, f"invoices_batched{'_dedup' if dedup else ''}.pdf")
+        success, msg = PDFOps.merge_pdfs(invoices, path, dedup=dedup, batch_size=2)
+        print(f"Merge (batched, dedup={dedup}): {success}, {msg}")
+        sizes.append(os.path.getsize(path) if success else None)
+    if None not in sizes and sizes[1] < sizes[0] / 2 and len(PdfReader(path).pages) == 4:
+        print(f"PASS: {sizes[0]} -> {sizes[1]} bytes")
+    else:
+        print(f"FAIL: {sizes}")
+
+    print("\n[3] Form fields reached through a nested /Parent and broken references...")
+    path = os.path.join(out_dir, "form_batch.pdf")
+    try:
+        with StreamingMerger(path) as merger:
+            merger._write_batch(form_writer())
+        annot = PdfReader(path).pages[0]["/Annots"][0].get_object()
+        field = annot["/Parent"].get_object()
+        if field["/T"] == "customer" and isinstance(annot["/Popup"], NullObject):
+            print("PASS: Field copied along with its widget, unresolvable reference written as null")
+        else:
+            print(f"FAIL: {annot}")
+    except Exception as e:
+        print(f"FAIL: {type(e).__name__}: {e}")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,115 @@
+import json
+import os
+import sys
+from pypdf import PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.cli import main as cli_main
+from src.modules.pdf_ops import PDFOps
+from src.utils import metrics
+from src.utils.logger import logger
+from src.utils.scheduler import JobScheduler
+
+def make_pdf(path, pages):
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 50 700 Td (Page {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.write(path)
+
+def run_tests():
+    print("Starting Setup...")
+    out_dir = "tests_output/metrics"
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    path = os.path.join(out_dir, "doc.pdf")
+    make_pdf(path, 40)
+
+    print("\n[1] Logging and metrics without Qt...")
+    messages = []
+    logger.add_listener(lambda message, level: messages.append((message, level)))
+    logger.log("Disk almost full", level="warning")
+    if "PyQt6" not in sys.modules and messages == [("Disk almost full", "warning")]:
+        print("PASS: No PyQt6 import, listener called")
+    else:
+        print(f"FAIL: {messages} {'PyQt6' in sys.modules}")
+
+    print("\n[2] Spans and counters of one operation...")
+    records = []
+    metrics.add_sink(records.append)
+    PDFOps.split_pdf(path, out_dir, page_range="1-3", workers=1)
+    PDFOps.compress_pdf(path, os.path.join(out_dir, "small.pdf"), level="low")
+    split, compress = records[-2:]
+    expected = {"parse", "copy", "write", "sync"}
+    if split["op"] == "split_pdf" and expected <= set(split["spans"]) and split["spans"]["sync"]["count"] == 3 \
+            and split["counters"]["pages"] == 3 and split["counters"]["bytes_in"] == os.path.getsize(path) \
+            and split["counters"]["bytes_out"] > 0 and split["peak_rss_mb"] is not None:
+        print(f"PASS: split {sorted(split['spans'])}, {split['counters']}")
+    else:
+        print(f"FAIL: {split}")
+    if "compress.images" not in compress["spans"] and "compress.pack" in compress["spans"] \
+            and compress["counters"]["bytes_out"] == os.path.getsize(os.path.join(out_dir, "small.pdf")):
+        print(f"PASS: compress stages {sorted(compress['spans'])}")
+    else:
+        print(f"FAIL: {compress}")
+
+    print("\n[3] Failures are recorded...")
+    success, msg = PDFOps.organize_pages(os.path.join(out_dir, "missing.pdf"), os.path.join(out_dir, "o.pdf"),
+                                         [{'index': 0, 'rotate': 0}])
+    if not success and records[-1]["op"] == "organize_pages" and not records[-1]["success"] \
+            and records[-1]["message"] == msg:
+        print("PASS: success false, message kept")
+    else:
+        print(f"FAIL: {records[-1]}")
+    metrics.remove_sink(records.append)
+
+    print("\n[4] JSON lines from the CLI and its worker processes...")
+    jsonl = os.path.join(out_dir, "metrics.jsonl")
+    if os.path.exists(jsonl):
+        os.remove(jsonl)
+    copy = os.path.join(out_dir, "doc2.pdf")
+    make_pdf(copy, 10)
+    sys_stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        cli_main(["--metrics", jsonl, "extract", path, copy, "-o", os.path.join(out_dir, "cli"), "-j", "2"])
+    finally:
+        sys.stdout.close()
+        sys.stdout = sys_stdout
+    with open(jsonl, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    pages = sorted(line["counters"].get("pages") for line in lines)
+    if len(lines) == 2 and pages == [10, 40] and all(line["op"] == "extract_text" for line in lines):
+        print(f"PASS: {len(lines)} records from {len(set(line['pid'] for line in lines))} process(es)")
+    else:
+        print(f"FAIL: {lines}")
+
+    print("\n[5] Records of pooled jobs reach the GUI process's sinks...")
+    received = []
+    metrics.add_sink(received.append) # Like MetricsPanel: owned by this process, not inherited
+    scheduler = JobScheduler(max_workers=1)
+    try:
+        job_id = scheduler.submit(PDFOps.compress_pdf, path, os.path.join(out_dir, "pooled.pdf"), level="low")
+        success, msg = scheduler.result(job_id, timeout=120)
+    finally:
+        scheduler.shutdown(wait=True)
+        metrics.remove_sink(received.append)
+    with open(jsonl, encoding="utf-8") as f:
+        exported = [json.loads(line) for line in f]
+    if success and [r["op"] for r in received] == ["compress_pdf"] and received[0]["pid"] != os.getpid() \
+            and len(exported) == len(lines) + 1: # The inherited sink wrote it once, in the pool
+        print(f"PASS: Record from pool process {received[0]['pid']} relayed once")
+    else:
+        print(f"FAIL: {success} {msg} {received} {len(exported)}")
+
+if __name__ == "__main__":
+    run_tests()
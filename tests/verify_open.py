@@ -0,0 +1,85 @@
+import os
+import sys
+from pypdf import PdfWriter
+from pypdf.generic import ArrayObject, DictionaryObject, FloatObject, NameObject, NumberObject
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.pdf_ops import PDFOps, PasswordRequired, iter_page_info
+from src.utils.progress import ProgressToken
+
+def make_nested_pdf(path):
+    # Root -> [A (/Rotate 90, A4 box) -> 2 pages, B -> 1 page with its own box]
+    writer = PdfWriter()
+    for _ in range(3):
+        writer.add_blank_page(612, 792)
+    root = writer._root_object["/Pages"].get_object()
+    pages = [writer.pages[i].indirect_reference for i in range(3)]
+    a4 = ArrayObject([NumberObject(0), NumberObject(0), FloatObject(595.28), FloatObject(841.89)])
+    nodes = []
+    for kids, extra in ((pages[:2], {"/Rotate": NumberObject(90), "/MediaBox": a4}), (pages[2:], {})):
+        node = DictionaryObject({NameObject("/Type"): NameObject("/Pages"), NameObject("/Count"): NumberObject(len(kids)),
+                                 NameObject("/Kids"): ArrayObject(kids), NameObject("/Parent"): root.indirect_reference})
+        node.update({NameObject(k): v for k, v in extra.items()})
+        ref = writer._add_object(node)
+        for kid in kids:
+            page = kid.get_object()
+            page[NameObject("/Parent")] = ref
+            if extra:
+                del page["/MediaBox"]
+        nodes.append(ref)
+    root[NameObject("/Kids")] = ArrayObject(nodes)
+    with open(path, "wb") as f:
+        writer.write(f)
+
+def run_tests():
+    print("Starting Setup...")
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    
+    print("\n[1] Inherited rotation and size from the page tree...")
+    nested = "tests_output/open_nested.pdf"
+    make_nested_pdf(nested)
+    info = [page for batch in iter_page_info(nested, batch_size=2) for page in batch]
+    expected = [(90, 595, 842), (90, 595, 842), (0, 612, 792)]
+    if [(r, round(w), round(h)) for r, w, h in info] == expected:
+        print("PASS: Rotation and media box inherited")
+    else:
+        print(f"FAIL: {info}")
+
+    print("\n[2] Progressive batches...")
+    writer = PdfWriter()
+    for _ in range(1000):
+        writer.add_blank_page(200, 300)
+    big = "tests_output/open_1000.pdf"
+    writer.write(big)
+    reports = []
+    token = ProgressToken(callback=lambda done, total: reports.append((done, total)), min_interval=0)
+    batches = list(iter_page_info(big, batch_size=300, progress=token))
+    if [len(b) for b in batches] == [300, 300, 300, 100] and reports[-1] == (1000, 1000):
+        print("PASS: 4 batches, progress against /Count")
+    else:
+        print(f"FAIL: {[len(b) for b in batches]} {reports}")
+
+    print("\n[3] Encrypted files ask for a password...")
+    locked = "tests_output/open_locked.pdf"
+    PDFOps.encrypt_pdf(nested, locked, "secret")
+    reasons = []
+    for password in (None, "wrong"):
+        try:
+            list(iter_page_info(locked, password))
+        except PasswordRequired as e:
+            reasons.append(str(e))
+    info = [page for batch in iter_page_info(locked, "secret") for page in batch]
+    if len(reasons) == 2 and len(info) == 3:
+        print(f"PASS: {reasons}")
+    else:
+        print(f"FAIL: {reasons} {info}")
+    success, msg = PDFOps.organize_pages(locked, "tests_output/open_organized.pdf",
+                                         [{'index': 2, 'rotate': 0}], password="secret")
+    if success:
+        print("PASS: Organize with password")
+    else:
+        print(f"FAIL: {msg}")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,94 @@
+import os
+import sys
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import (ArrayObject, DecodedStreamObject, DictionaryObject, FloatObject, NameObject,
+                           NumberObject, TextStringObject)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.pdf_ops import PDFOps
+
+FONTS = ("/F1", "/F2", "/F3")
+
+def make_source(path):
+    """
+    Three pages sharing one resource dictionary with three fonts, each page using
+    only its own. Page 1 is already rotated 90 degrees and has a note plus a link to
+    page 3.
+    """
+    writer = PdfWriter()
+    fonts = DictionaryObject()
+    for name in FONTS:
+        fonts[NameObject(name)] = writer._add_object(DictionaryObject({
+            NameObject("/Type"): NameObject("/Font"),
+            NameObject("/Subtype"): NameObject("/Type1"),
+            NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    resources = writer._add_object(DictionaryObject({NameObject("/Font"): fonts}))
+    pages = []
+    for i, name in enumerate(FONTS):
+        page = writer.add_blank_page(300, 400)
+        content = DecodedStreamObject()
+        content.set_data(f"BT {name} 12 Tf 20 350 Td (Page {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = resources
+        pages.append(page)
+    pages[0][NameObject("/Rotate")] = NumberObject(90)
+
+    rect = ArrayObject([FloatObject(v) for v in (20, 20, 120, 60)])
+    note = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Annot"), NameObject("/Subtype"): NameObject("/Text"),
+        NameObject("/Rect"): rect, NameObject("/Contents"): TextStringObject("Check totals")}))
+    link = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Annot"), NameObject("/Subtype"): NameObject("/Link"),
+        NameObject("/Rect"): rect,
+        NameObject("/Dest"): ArrayObject([pages[2].indirect_reference, NameObject("/Fit")])}))
+    pages[0][NameObject("/Annots")] = ArrayObject([note, link])
+    writer.write(path)
+
+def run_tests():
+    print("Starting Setup...")
+    out_dir = "tests_output/organize"
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    source = os.path.join(out_dir, "source.pdf")
+    make_source(source)
+
+    # Page 1 twice (once turned a further 90 degrees, once as is), then page 3
+    out_path = os.path.join(out_dir, "organized.pdf")
+    config = [{'index': 0, 'rotate': 90}, {'index': 0, 'rotate': 0}, {'index': 2, 'rotate': 0}]
+    success, msg = PDFOps.organize_pages(source, out_path, config)
+    print(f"Organize: {success}, {msg}")
+    if not success:
+        print("FAIL: Organize failed")
+        return
+    pages = PdfReader(out_path).pages
+
+    print("\n[1] Rotation is applied once per output page...")
+    rotations = [int(page.get("/Rotate", 0)) for page in pages]
+    source_rotation = int(PdfReader(source).pages[0].get("/Rotate", 0))
+    if rotations == [180, 90, 0] and source_rotation == 90:
+        print("PASS: Source /Rotate plus the requested angle, source untouched")
+    else:
+        print(f"FAIL: Rotations {rotations}, source {source_rotation}")
+
+    print("\n[2] Only the resources a page uses are copied...")
+    fonts = [sorted(page["/Resources"]["/Font"].keys()) for page in pages]
+    if fonts == [["/F1"], ["/F1"], ["/F3"]]:
+        print("PASS: Each page keeps only its own font")
+    else:
+        print(f"FAIL: {fonts}")
+
+    print("\n[3] Every copy of a page keeps its annotations...")
+    annots = [[a.get_object() for a in page.get("/Annots", [])] for page in pages]
+    kinds = [[a["/Subtype"] for a in page_annots] for page_annots in annots]
+    owners_ok = all(a.raw_get("/P").idnum == page.indirect_reference.idnum
+                    for page, page_annots in zip(pages, annots) for a in page_annots)
+    distinct = len({a.indirect_reference.idnum for page_annots in annots for a in page_annots})
+    links_ok = all(a["/Dest"].get_object()[0].indirect_reference.idnum == pages[2].indirect_reference.idnum
+                   for page_annots in annots for a in page_annots if a["/Subtype"] == "/Link")
+    if kinds == [["/Text", "/Link"], ["/Text", "/Link"], []] and owners_ok and distinct == 4 and links_ok:
+        print("PASS: Both copies have their own note and link, links point at the output page")
+    else:
+        print(f"FAIL: {kinds}, owners ok {owners_ok}, {distinct} distinct annotations, links ok {links_ok}")
+
+if __name__ == "__main__":
+    run_tests()
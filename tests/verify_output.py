@@ -0,0 +1,122 @@
+import glob
+import os
+import stat
+import sys
+from PIL import Image
+from pypdf import PdfReader, PdfWriter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.img_ops import ImageOps
+from src.modules.output_ops import AtomicOutput, _WriteBehind
+from src.modules.pdf_ops import PDFOps
+from src.utils.progress import ProgressToken
+
+def leftovers(directory):
+    return glob.glob(os.path.join(directory, ".*.part"))
+
+def cancelling_token(at):
+    # ProgressToken that cancels itself once `at` items are done
+    token = ProgressToken(callback=lambda done, total: done >= at and token.cancel(), min_interval=0)
+    return token
+
+class FailingFile:
+    # Accepts the first few writes, then fails like a full disk
+    def __init__(self, allowed):
+        self.allowed = allowed
+        self.written = 0
+    def tell(self):
+        return 0
+    def write(self, data):
+        if self.written >= self.allowed:
+            raise OSError(28, "No space left on device")
+        self.written += 1
+        return len(data)
+    def flush(self):
+        pass
+
+def run_tests():
+    print("Starting Setup...")
+    out_dir = "tests_output/output"
+    if not os.path.exists(out_dir):
+        os.makedirs(out_dir)
+    pdf_path = os.path.join(out_dir, "pages.pdf")
+    writer = PdfWriter()
+    for _ in range(500):
+        writer.add_blank_page(width=200, height=200)
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+
+    print("\n[1] A failed operation keeps the previous output...")
+    target = os.path.join(out_dir, "merged_twice.pdf")
+    PDFOps.merge_pdfs([pdf_path], target, batch_size=1)
+    token = cancelling_token(3)
+    # Batches are written as they go: without the sink the cancel would leave half a merge behind
+    success, msg = PDFOps.merge_pdfs([pdf_path] * 6, target, batch_size=1, progress=token)
+    pages = len(PdfReader(target).pages)
+    if not success and pages == 500 and not leftovers(out_dir):
+        print("PASS: Old 500-page file intact, no temporary file left")
+    else:
+        print(f"FAIL: {msg}, {pages} pages, {leftovers(out_dir)}")
+
+    print("\n[2] Cancelled streaming extract writes nothing...")
+    text_path = os.path.join(out_dir, "cancelled.txt")
+    token = cancelling_token(100)
+    success, msg = PDFOps.extract_text(pdf_path, text_path, workers=1, stream=True, progress=token)
+    if not success and not os.path.exists(text_path) and not leftovers(out_dir):
+        print("PASS: No partial text file")
+    else:
+        print(f"FAIL: {msg} exists={os.path.exists(text_path)}")
+
+    print("\n[3] New outputs get the usual permissions...")
+    if os.name == "posix":
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = stat.S_IMODE(os.stat(target).st_mode)
+        if mode == 0o666 & ~umask:
+            print(f"PASS: {oct(mode)}")
+        else:
+            print(f"FAIL: {oct(mode)}, expected {oct(0o666 & ~umask)}")
+    else:
+        print("SKIP: POSIX permissions")
+
+    print("\n[4] Write-behind keeps offsets and order...")
+    images = []
+    for i in range(12):
+        path = os.path.join(out_dir, f"img_{i}.png")
+        Image.new("RGB", (300, 200), (i * 20, 100, 200 - i * 10)).save(path)
+        images.append(path)
+    image_pdf = os.path.join(out_dir, "images.pdf")
+    success, msg = ImageOps.images_to_pdf(images, image_pdf, stream=True, workers=1)
+    reader = PdfReader(image_pdf, strict=True)
+    sizes = [tuple(page.mediabox[2:]) for page in reader.pages]
+    merged = os.path.join(out_dir, "merged.pdf")
+    ok_merge, merge_msg = PDFOps.merge_pdfs([image_pdf, pdf_path], merged, batch_size=5)
+    if success and len(sizes) == 12 and ok_merge and len(PdfReader(merged, strict=True).pages) == 512:
+        print("PASS: Streamed image PDF and batched merge read back strictly")
+    else:
+        print(f"FAIL: {msg} {merge_msg}")
+
+    print("\n[5] Write errors from the writer thread surface...")
+    front = _WriteBehind(FailingFile(allowed=1), chunk_size=4)
+    error = None
+    try:
+        for _ in range(20):
+            front.write(b"12345")
+        front.finish()
+    except OSError as e:
+        error = e
+    sink = AtomicOutput(os.path.join(out_dir, "never.pdf"))
+    try:
+        with sink as f:
+            f.write(b"%PDF-")
+            raise ValueError("serializer failed")
+    except ValueError:
+        pass
+    if error is not None and error.errno == 28 and not os.path.exists(os.path.join(out_dir, "never.pdf")) \
+            and not leftovers(out_dir):
+        print("PASS: Disk full reported, failed output discarded")
+    else:
+        print(f"FAIL: {error} {leftovers(out_dir)}")
+
+if __name__ == "__main__":
+    run_tests()
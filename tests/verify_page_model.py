@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+def run_tests():
+    try:
+        from PyQt6.QtCore import QModelIndex
+        from src.ui.page_model import PageListModel
+    except ImportError:
+        print("SKIP: PyQt6 is not installed")
+        return
+
+    model = PageListModel()
+    model.load(5000)
+    changes = []
+    model.dataChanged.connect(lambda first, last: changes.append(last.row() - first.row() + 1))
+
+    print("\n[1] Rotate touches only the selected rows...")
+    model.rotate_rows([10, 11, 12, 400], 90)
+    if sum(changes) == 4 and list(model.rotations[10:13]) == [90] * 3 and model.rotations[13] == 0:
+        print("PASS: 4 rows repainted")
+    else:
+        print(f"FAIL: {changes}")
+
+    print("\n[2] Multi-select move up/down...")
+    rows = model.shift_rows([0, 1, 5, 6, 9], -1)
+    expected = [0, 1, 2, 3, 5, 6, 4, 7, 9, 8]
+    if rows == [0, 1, 4, 5, 8] and list(model.indices[:10]) == expected:
+        print("PASS: Runs moved up, the run at the top stayed")
+    else:
+        print(f"FAIL: {rows} {list(model.indices[:10])}")
+    rows = model.shift_rows([4999], 1)
+    if rows == [4999] and model.indices[4999] == 4999:
+        print("PASS: Last row stays at the bottom")
+    else:
+        print(f"FAIL: {rows}")
+
+    print("\n[3] Drag-reorder and delete...")
+    model.load(10)
+    rows = model.move_rows_to([1, 3], 6)
+    if rows == [4, 5] and list(model.indices) == [0, 2, 4, 5, 1, 3, 6, 7, 8, 9]:
+        print("PASS: Dragged rows inserted in order")
+    else:
+        print(f"FAIL: {rows} {list(model.indices)}")
+    model.moveRows(QModelIndex(), 0, 2, QModelIndex(), 10)
+    model.remove_rows([0, 1, 9])
+    if list(model.indices) == [1, 3, 6, 7, 8, 9, 0] and len(model.rotations) == 7:
+        print("PASS: moveRows/remove keep both arrays in sync")
+    else:
+        print(f"FAIL: {list(model.indices)}")
+
+    print("\n[4] Move cost on 5,000 pages...")
+    model.load(5000)
+    start = time.perf_counter()
+    for _ in range(100):
+        model.shift_rows(range(2000, 2050), 1)
+    print(f"100 moves of 50 rows: {time.perf_counter() - start:.3f}s")
+    print(f"Config: {model.page_config()[2000:2002]}")
+
+if __name__ == "__main__":
+    run_tests()
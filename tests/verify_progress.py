@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+from pypdf import PdfWriter
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.pdf_ops import PDFOps
+from src.utils.progress import ProgressToken
+from src.utils.scheduler import JobScheduler, JobStatus
+
+def run_tests():
+    print("Starting Setup...")
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    
+    pdf_path = "tests_output/progress_2000.pdf"
+    writer = PdfWriter()
+    for _ in range(2000):
+        writer.add_blank_page(width=200, height=200)
+    with open(pdf_path, "wb") as f:
+        writer.write(f)
+
+    # Progress is reported and ends at total
+    print("\n[1] Testing progress reports...")
+    reports = []
+    token = ProgressToken(callback=lambda done, total: reports.append((done, total)))
+    success, msg = PDFOps.extract_text(pdf_path, "tests_output/progress.txt", workers=1, progress=token)
+    if success and reports and reports[-1] == (2000, 2000):
+        print(f"PASS: {len(reports)} throttled reports, last {reports[-1]}")
+    else:
+        print(f"FAIL: {success} {msg} {reports[-1:] }")
+
+    # Cancelling from the callback stops within one page
+    print("\n[2] Testing cancel within one page...")
+    config = [{'index': i, 'rotate': 0} for i in range(2000)]
+    seen = []
+    def cancel_at_10(done, total):
+        seen.append(done)
+        if done >= 10:
+            token.cancel()
+    token = ProgressToken(callback=cancel_at_10, min_interval=0)
+    success, msg = PDFOps.organize_pages(pdf_path, "tests_output/progress_org.pdf", config, progress=token)
+    if not success and msg == "Cancelled" and seen[-1] == 10:
+        print("PASS: Organize stopped at page 10")
+    else:
+        print(f"FAIL: {success} {msg} last page {seen[-1]}")
+
+    # Running process-pool jobs can be cancelled through the scheduler
+    print("\n[3] Testing scheduler cancel of a running job...")
+    scheduler = JobScheduler(max_workers=1)
+    progress = []
+    scheduler.add_progress_listener(lambda job, done, total: progress.append(done))
+    split_dir = "tests_output/progress_split"
+    if not os.path.exists(split_dir):
+        os.makedirs(split_dir)
+    job_id = scheduler.submit(PDFOps.split_pdf, pdf_path, split_dir, workers=1)
+    deadline = time.monotonic() + 60
+    while not progress and time.monotonic() < deadline:
+        time.sleep(0.05)
+    scheduler.cancel(job_id)
+    success, msg = scheduler.result(job_id)
+    if scheduler.status(job_id) == JobStatus.CANCELLED and msg == "Cancelled":
+        print(f"PASS: Split cancelled after {progress[-1]} of 2000 files")
+    else:
+        print(f"FAIL: {scheduler.status(job_id)} {msg}")
+    scheduler.shutdown(wait=True)
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,170 @@
+import os
+import pickle
+import sys
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules import pdf_ops
+from src.modules.pdf_ops import PDFOps
+from src.modules.protect_ops import ALGORITHMS, LockKey, aes_available, default_algorithm
+
+# /Encrypt /V and /R pypdf must write for each algorithm
+HANDLER_VERSIONS = {"AES-256": (5, 6), "AES-128": (4, 4), "RC4-128": (2, 3)}
+
+def make_document(path, pages=40):
+    # Text pages with compressed content, an outline and metadata strings
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    for i in range(pages):
+        page = writer.add_blank_page(612, 792)
+        content = DecodedStreamObject()
+        content.set_data(f"BT /F1 12 Tf 50 700 Td (Confidential page {i + 1}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content.flate_encode())
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.add_outline_item("Chapter 2", 1)
+    writer.add_metadata({"/Title": "Quarterly report", "/Author": "Finance"})
+    writer.generate_file_identifiers()
+    writer.write(path)
+
+def document_state(path, password=None):
+    reader = PdfReader(path)
+    if password is not None:
+        reader.decrypt(password)
+    return ([page.extract_text() for page in reader.pages],
+            [item.title for item in reader.outline], reader.metadata.title)
+
+def run_tests():
+    print("Starting Setup...")
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    plain = "tests_output/protect_plain.pdf"
+    make_document(plain)
+    expected = document_state(plain)
+    algorithm = default_algorithm()
+    print(f"Default algorithm: {algorithm}")
+
+    print("\n[1] Lock and unlock round trip...")
+    locked = "tests_output/protect_locked.pdf"
+    success, msg = PDFOps.encrypt_pdf(plain, locked, "s3cret")
+    reader = PdfReader(locked)
+    if success and reader.is_encrypted and document_state(locked, "s3cret") == expected:
+        print(f"PASS: {msg}")
+    else:
+        print(f"FAIL: {msg}")
+    with open(locked, "rb") as f:
+        if b"Quarterly" in f.read():
+            print("FAIL: Metadata left in the clear")
+        else:
+            print("PASS: Strings encrypted")
+
+    unlocked = "tests_output/protect_unlocked.pdf"
+    success, msg = PDFOps.decrypt_pdf(locked, unlocked, "s3cret")
+    if success and not PdfReader(unlocked).is_encrypted and document_state(unlocked) == expected:
+        print("PASS: Unlocked, outline and metadata kept")
+    else:
+        print(f"FAIL: {msg}")
+
+    success, msg = PDFOps.decrypt_pdf(locked, unlocked + ".bad", "wrong")
+    if not success and "Incorrect password" in msg:
+        print("PASS: Wrong password rejected")
+    else:
+        print(f"FAIL: {msg}")
+
+    print("\n[2] Re-encrypt with a new password...")
+    relocked = "tests_output/protect_relocked.pdf"
+    success, msg = PDFOps.encrypt_pdf(locked, relocked, "n3w", current_password="s3cret")
+    reader = PdfReader(relocked)
+    if success and not reader.decrypt("s3cret") and document_state(relocked, "n3w") == expected:
+        print("PASS: Only the new password opens it")
+    else:
+        print(f"FAIL: {msg}")
+
+    print("\n[3] Parallel chunks and object streams...")
+    source = "tests_output/protect_600.pdf"
+    make_document(source, pages=600)
+    packed = "tests_output/protect_packed.pdf"
+    PDFOps.compress_pdf(source, packed, level="low", workers=1) # Object streams + xref stream
+    packed_expected = document_state(packed)
+    outputs = []
+    for workers in (1, 2):
+        out = f"tests_output/protect_packed_{workers}.pdf"
+        success, msg = PDFOps.encrypt_pdf(packed, out, "s3cret", algorithm="RC4-128", workers=workers)
+        outputs.append(out)
+        if not success or document_state(out, "s3cret") != packed_expected:
+            print(f"FAIL: workers={workers}: {msg}")
+            break
+    else:
+        # RC4 has no random IVs, so the chunked output must match byte for byte
+        with open(outputs[0], "rb") as a, open(outputs[1], "rb") as b:
+            if a.read() == b.read():
+                print("PASS: Serial and parallel output identical")
+            else:
+                print("FAIL: Parallel output differs")
+
+    print("\n[4] Batch with one key derivation...")
+    if aes_available():
+        key = pickle.loads(pickle.dumps(LockKey("batch", "AES-256")))
+        ids = set()
+        for i in range(3):
+            out = f"tests_output/protect_batch_{i}.pdf"
+            success, msg = PDFOps.encrypt_pdf(plain, out, None, lock_key=key)
+            ids.add(bytes(PdfReader(out).trailer["/Encrypt"]["/U"]))
+            if not success or document_state(out, "batch") != expected:
+                print(f"FAIL: {msg}")
+        if len(ids) == 1:
+            print("PASS: 3 files locked with one AES-256 key derivation")
+        else:
+            print("FAIL: Key derived per file")
+    else:
+        print("SKIP: AES needs the cryptography package")
+        success, msg = PDFOps.encrypt_pdf(plain, locked, "s3cret", algorithm="AES-256")
+        if not success and "cryptography" in msg:
+            print("PASS: Explicit AES-256 without the backend is refused")
+        else:
+            print(f"FAIL: {msg}")
+
+    # protect_ops drives pypdf's encryption internals: this is what must keep
+    # passing before the pypdf pin in requirements.txt is widened
+    print("\n[5] Lock and unlock with every algorithm...")
+    for algorithm in ALGORITHMS:
+        if algorithm.startswith("AES") and not aes_available():
+            print(f"SKIP: {algorithm} needs the cryptography package")
+            continue
+        out = f"tests_output/protect_{algorithm}.pdf"
+        success, msg = PDFOps.encrypt_pdf(plain, out, "r0und", algorithm=algorithm)
+        handler = PdfReader(out).trailer["/Encrypt"] if success else {}
+        versions = (handler.get("/V"), handler.get("/R"))
+        back = f"tests_output/protect_{algorithm}_unlocked.pdf"
+        success2, msg2 = PDFOps.decrypt_pdf(out, back, "r0und")
+        if (success and versions == HANDLER_VERSIONS[algorithm] and document_state(out, "r0und") == expected
+                and success2 and not PdfReader(back).is_encrypted and document_state(back) == expected):
+            print(f"PASS: {algorithm} round trip (V{versions[0]} R{versions[1]})")
+        else:
+            print(f"FAIL: {algorithm}: {msg} / {msg2} {versions}")
+
+    print("\n[6] Unlock cache is bounded and keeps no passwords...")
+    relocked = []
+    for i in range(3):
+        out = f"tests_output/protect_cache_{i}.pdf"
+        PDFOps.encrypt_pdf(plain, out, f"pw{i}", algorithm="RC4-128")
+        relocked.append(out)
+    saved = pdf_ops.MAX_UNLOCK_KEYS
+    pdf_ops.MAX_UNLOCK_KEYS = 2
+    try:
+        for i, out in enumerate(relocked):
+            PDFOps.decrypt_pdf(out, unlocked, f"pw{i}")
+    finally:
+        pdf_ops.MAX_UNLOCK_KEYS = saved
+    passwords = [part for key in pdf_ops._unlock_cache for part in key if isinstance(part, str)]
+    if len(pdf_ops._unlock_cache) == 2 and not passwords:
+        print("PASS: Oldest keys evicted, passwords only kept as hashes")
+    else:
+        print(f"FAIL: {len(pdf_ops._unlock_cache)} entries, passwords {passwords}")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,135 @@
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import Future
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.pdf_ops import PDFOps
+from src.modules.img_ops import ImageOps
+from src.utils.scheduler import Job, JobScheduler, JobStatus, warm_up_imports, worker_budget
+
+WORKERS_FILE = "tests_output/sched_workers.txt"
+
+def mark_started():
+    # Pool initializer: warm up like the GUI, then leave one line per worker process
+    warm_up_imports()
+    with open(WORKERS_FILE, "a") as f:
+        f.write(f"{os.getpid()}\n")
+
+def report_budget():
+    # Runs as a job: the processes an operation there may start
+    return True, str(worker_budget())
+
+class FinishingFuture(Future):
+    # Reports "running" while its job finishes on another thread, the moment
+    # JobScheduler.status() is between its check and its update
+    def __init__(self, scheduler, job):
+        super().__init__()
+        self.scheduler, self.job = scheduler, job
+        self.finisher = None
+
+    def running(self):
+        if self.finisher is None:
+            self.set_result((True, "done"))
+            self.finisher = threading.Thread(target=self.scheduler._on_done, args=(self.job, self))
+            self.finisher.start()
+            self.finisher.join(0.5) # Finishes unless status() holds the scheduler lock
+        return True
+
+def run_tests():
+    print("Starting Setup...")
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    
+    img_path = "tests_output/sched.jpg"
+    Image.new('RGB', (100, 100), color='green').save(img_path)
+    pdf_path = "tests_output/sched.pdf"
+    ImageOps.images_to_pdf([img_path, img_path, img_path], pdf_path)
+
+    scheduler = JobScheduler(max_workers=2, max_queue=3)
+    finished = []
+    scheduler.add_listener(lambda job: finished.append(job.id))
+
+    # Several operations at once, on the process pool
+    print("\n[1] Submitting concurrent jobs...")
+    split_dir = "tests_output/sched_split"
+    if not os.path.exists(split_dir):
+        os.makedirs(split_dir)
+    jobs = [
+        scheduler.submit(PDFOps.split_pdf, pdf_path, split_dir),
+        scheduler.submit(PDFOps.compress_pdf, pdf_path, "tests_output/sched_compressed.pdf", "high"),
+        scheduler.submit(PDFOps.merge_pdfs, [pdf_path, pdf_path], "tests_output/sched_merged.pdf"),
+    ]
+    
+    # The queue is bounded
+    try:
+        scheduler.submit(PDFOps.merge_pdfs, [pdf_path], "tests_output/never.pdf")
+        print("FAIL: Queue accepted more than max_queue jobs")
+    except queue.Full:
+        print("PASS: Full queue rejected the extra job")
+
+    for job_id in jobs:
+        success, msg = scheduler.result(job_id)
+        print(f"Job {job_id}: {scheduler.status(job_id)} - {msg}")
+        if not success:
+            print(f"FAIL: Job {job_id} failed")
+
+    # Failures come back as results, not exceptions
+    print("\n[2] Testing failing job...")
+    job_id = scheduler.submit(PDFOps.split_pdf, "tests_output/missing.pdf", split_dir)
+    scheduler.result(job_id)
+    if scheduler.status(job_id) == JobStatus.FAILED:
+        print("PASS: Failing job reported as failed")
+    else:
+        print("FAIL: Expected failed status")
+
+    scheduler.shutdown(wait=True)
+    if len(finished) == 4:
+        print("PASS: Listener called once per job")
+    else:
+        print(f"FAIL: Listener called {len(finished)} times")
+
+    print("\n[3] Workers started and initialized before the first job...")
+    if os.path.exists(WORKERS_FILE):
+        os.remove(WORKERS_FILE)
+    scheduler = JobScheduler(max_workers=2, initializer=mark_started)
+    scheduler.start_workers()
+    with open(WORKERS_FILE) as f:
+        started = f.read().split()
+    job_id = scheduler.submit(PDFOps.compress_pdf, pdf_path, "tests_output/sched_warm.pdf", "low")
+    success, msg = scheduler.result(job_id)
+    scheduler.shutdown(wait=True)
+    with open(WORKERS_FILE) as f:
+        after = f.read().split()
+    if len(set(started)) == 2 and after == started and success:
+        print("PASS: 2 workers initialized up front, the job reused one")
+    else:
+        print(f"FAIL: {started} {after} {msg}")
+
+    print("\n[4] Operations in the pool share the cores...")
+    scheduler = JobScheduler(max_workers=2)
+    success, budget = scheduler.result(scheduler.submit(report_budget))
+    scheduler.shutdown(wait=True)
+    cores = os.cpu_count() or 1
+    if success and int(budget) == max(1, cores // 2) and worker_budget() == cores:
+        print(f"PASS: {budget} process(es) per pooled operation, {cores} outside the pool")
+    else:
+        print(f"FAIL: {budget} in the pool, {worker_budget()} outside ({cores} cores)")
+
+    print("\n[5] A job finishing while its status is read stays finished...")
+    scheduler = JobScheduler(max_workers=1)
+    job = Job(1, report_budget, (), {}, "race", in_process=False)
+    job.future = FinishingFuture(scheduler, job)
+    scheduler.jobs[job.id] = job
+    seen = scheduler.status(job.id)
+    job.future.finisher.join()
+    scheduler.shutdown(wait=True)
+    if job.status == JobStatus.DONE and scheduler.active_count() == 0:
+        print(f"PASS: Read as {seen}, ended {job.status}")
+    else:
+        print(f"FAIL: Stuck as {job.status}, {scheduler.active_count()} active")
+
+if __name__ == "__main__":
+    run_tests()
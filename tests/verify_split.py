@@ -53,5 +53,55 @@ def run_tests():
     else:
         print("FAIL: Range split failed")
 
+    # Test Chunked Split (every 2 pages -> 1-2, 3-4, 5)
+    print("\n[3] Testing Chunked Split (2 pages per file)...")
+    split_dir_chunk = "tests_output/split_chunk"
+    if not os.path.exists(split_dir_chunk):
+        os.makedirs(split_dir_chunk)
+    
+    success, msg = PDFOps.split_pdf(merged_path, split_dir_chunk, chunk_size=2)
+    print(f"Split Chunks: {success}, {msg}")
+    files = sorted(os.listdir(split_dir_chunk))
+    print(f"Files: {files}")
+    if files == ["5pages_page_5.pdf", "5pages_pages_1-2.pdf", "5pages_pages_3-4.pdf"]:
+        print("PASS: Chunked split successful")
+    else:
+        print("FAIL: Chunked split failed")
+
+    # Test Split By Range "1-2, 4-5" as multi-page files, on a process pool
+    print("\n[4] Testing Split By Range '1-2, 4-5' (2 workers)...")
+    split_dir_by_range = "tests_output/split_by_range"
+    if not os.path.exists(split_dir_by_range):
+        os.makedirs(split_dir_by_range)
+    
+    success, msg = PDFOps.split_pdf(merged_path, split_dir_by_range, "1-2, 4-5", by_range=True, workers=2)
+    print(f"Split By Range: {success}, {msg}")
+    files = sorted(os.listdir(split_dir_by_range))
+    print(f"Files: {files}")
+    if files == ["5pages_pages_1-2.pdf", "5pages_pages_4-5.pdf"]:
+        print("PASS: By-range split successful")
+    else:
+        print("FAIL: By-range split failed")
+
+    # Repeated ranges get numbered files; chunks are named after the pages they hold
+    print("\n[5] Testing repeated ranges and chunks over non-contiguous pages...")
+    split_dir_names = "tests_output/split_names"
+    if not os.path.exists(split_dir_names):
+        os.makedirs(split_dir_names)
+    for name in os.listdir(split_dir_names):
+        os.remove(os.path.join(split_dir_names, name))
+    
+    success, msg = PDFOps.split_pdf(merged_path, split_dir_names, "1-3, 1-3", by_range=True)
+    print(f"Split Repeated Ranges: {success}, {msg}")
+    success2, msg2 = PDFOps.split_pdf(merged_path, split_dir_names, "1, 3-5", chunk_size=2)
+    print(f"Split Sparse Chunks: {success2}, {msg2}")
+    files = sorted(os.listdir(split_dir_names))
+    print(f"Files: {files}")
+    if (success and success2 and "2 files" in msg and
+            files == ["5pages_pages_1-3.pdf", "5pages_pages_1-3_2.pdf", "5pages_pages_1_3.pdf", "5pages_pages_4-5.pdf"]):
+        print("PASS: Output names are unique and match their pages")
+    else:
+        print("FAIL: Output names collide or misname their pages")
+
 if __name__ == "__main__":
     run_tests()
@@ -0,0 +1,129 @@
+import io
+import os
+import shutil
+import sys
+import threading
+from PIL import Image
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.modules.img_ops import ImageOps
+from src.modules.thumb_ops import ThumbnailCache, ThumbnailRenderer, render_page_thumbnail
+from src.utils.scheduler import worker_budget
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject, DictionaryObject, NameObject
+
+def make_text_page_pdf(path):
+    # Page 1: a heading and two body lines near the top left; page 2: empty
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")}))
+    page = writer.add_blank_page(612, 792)
+    content = DecodedStreamObject()
+    content.set_data(b"BT /F1 24 Tf 72 700 Td (Quarterly report) Tj /F1 12 Tf 0 -40 Td 14 TL "
+                     b"(Revenue grew in every region this quarter.) ' (Costs were flat.) ' ET")
+    page[NameObject("/Contents")] = writer._add_object(content)
+    page[NameObject("/Resources")] = DictionaryObject({
+        NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})})
+    writer.add_blank_page(612, 792)
+    writer.write(path)
+
+def grey_pixels(img, region):
+    # Pixels in region (left, top, right, bottom) clearly darker than white paper
+    return sum(1 for v in img.convert("L").crop(region).getdata() if v < 220)
+
+def render_all(renderer, indices):
+    done = threading.Event()
+    ready = []
+    def on_ready(index):
+        ready.append(index)
+        if len(ready) == len(indices):
+            done.set()
+    renderer.on_ready = on_ready
+    renderer.request(indices)
+    done.wait(60)
+    return ready
+
+def run_tests():
+    print("Starting Setup...")
+    if not os.path.exists("tests_output"):
+        os.makedirs("tests_output")
+    cache_dir = "tests_output/thumb_cache"
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    
+    images = []
+    for i, color in enumerate(['red', 'green', 'blue']):
+        path = f"tests_output/thumb_{i}.jpg"
+        Image.new('RGB', (400, 600), color=color).save(path)
+        images.append(path)
+    pdf_path = "tests_output/thumbs.pdf"
+    ImageOps.images_to_pdf(images, pdf_path, stream=True)
+
+    print("\n[1] Rendering on the pool...")
+    cache = ThumbnailCache(cache_dir)
+    renderer = ThumbnailRenderer(pdf_path, cache, None, workers=2)
+    ready = render_all(renderer, [0, 1, 2])
+    renderer.close()
+    path = cache.get(renderer.digest, 1)
+    with Image.open(path) as thumb:
+        size, pixel = thumb.size, thumb.getpixel((thumb.width // 2, thumb.height // 2))
+    if sorted(ready) == [0, 1, 2] and max(size) == 160 and pixel[1] > 100 > pixel[0]:
+        print(f"PASS: Thumbnails rendered from page images ({size[0]}x{size[1]})")
+    else:
+        print(f"FAIL: {ready} {size} {pixel}")
+
+    print("\n[2] Rotation from the cache...")
+    rotated = cache.get(renderer.digest, 1, 90)
+    with Image.open(rotated) as thumb:
+        if thumb.size == (size[1], size[0]):
+            print("PASS: Rotated thumbnail derived without re-render")
+        else:
+            print(f"FAIL: Rotated size {thumb.size}")
+
+    print("\n[3] Reopening hits the cache...")
+    reopened = ThumbnailRenderer(pdf_path, ThumbnailCache(cache_dir), None)
+    ready = render_all(reopened, [0, 1, 2])
+    if sorted(ready) == [0, 1, 2] and reopened._pool is None:
+        print("PASS: No rendering needed on reopen")
+    else:
+        print("FAIL: Reopen rendered again")
+
+    print("\n[4] Size bound...")
+    small = ThumbnailCache(cache_dir, max_bytes=cache.total_bytes // 2)
+    small.put(renderer.digest, 0, open(cache.get(renderer.digest, 0), "rb").read())
+    on_disk = sum(os.path.getsize(os.path.join(cache_dir, n)) for n in os.listdir(cache_dir))
+    if small.total_bytes <= small.max_bytes and on_disk == small.total_bytes:
+        print("PASS: Least recently used thumbnails evicted")
+    else:
+        print(f"FAIL: {small.total_bytes} > {small.max_bytes} (disk {on_disk})")
+
+    print("\n[5] Text-only pages show where their text is...")
+    text_pdf = "tests_output/thumbs_text.pdf"
+    make_text_page_pdf(text_pdf)
+    reader = PdfReader(text_pdf)
+    thumbs = []
+    for i, page in enumerate(reader.pages):
+        with Image.open(io.BytesIO(render_page_thumbnail(page, i + 1))) as img:
+            img.load()
+            thumbs.append(img)
+    text, blank = thumbs
+    w, h = text.size
+    # Text sits in the top quarter, left of the middle; the rest of the page is empty
+    top_left = grey_pixels(text, (0, 0, w // 2, h // 4))
+    bottom = grey_pixels(text, (0, h // 2, w, h))
+    if top_left > 20 and bottom == 0 and grey_pixels(blank, (2, 2, w - 2, h - 2)) > 0:
+        print(f"PASS: {top_left} grey pixels where the text is, empty page labelled as a placeholder")
+    else:
+        print(f"FAIL: {top_left} grey pixels top left, {bottom} in the bottom half")
+
+    print("\n[6] The thumbnail pool stays within the worker budget...")
+    capped = ThumbnailRenderer(pdf_path, cache, None, workers=64)
+    default = ThumbnailRenderer(pdf_path, cache, None)
+    if capped.workers == worker_budget() and default.workers == max(1, worker_budget() // 2):
+        print(f"PASS: {capped.workers} worker(s) at most, {default.workers} by default")
+    else:
+        print(f"FAIL: {capped.workers} / {default.workers} workers, budget {worker_budget()}")
+
+if __name__ == "__main__":
+    run_tests()